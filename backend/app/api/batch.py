@@ -0,0 +1,263 @@
+from fastapi import APIRouter, HTTPException, Request
+from app.models.batch import BatchExportItem, BatchExportRequest, BatchItemResult, BatchManifest
+from app.models.job import Job, JobStatus
+from app.models.subtitle import SubtitleResponse
+from app.models.video import VideoSession
+from app.services.job_queue import JobCancelled, JobTimedOut, job_queue, JOB_WORKERS
+from app.services.media_probe import ensure_media_profile
+from app.services.render_profiles import RENDER_PROFILES, get_render_profile
+from app.services.session_store import session_store
+from app.services.video_processor import burn_subtitle_variants
+from app.utils.range_response import ranged_file_response
+from app.api.chat import build_prompt_subtitles
+from app.api.export import render_export
+from app.api.upload import OUTPUT_DIR
+from collections import OrderedDict, deque
+from typing import Dict, List
+import os
+import threading
+import time
+import uuid
+
+router = APIRouter()
+
+# Default cap leaves half the job pool free for interactive chat and export jobs
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", str(max(1, JOB_WORKERS // 2))))
+
+# How many batches to remember for manifest polling
+BATCH_HISTORY_LIMIT = int(os.getenv("BATCH_HISTORY_LIMIT", "100"))
+
+
+class BatchRun:
+    """A batch's manifest plus the videos still waiting for a worker"""
+
+    def __init__(self, request: BatchExportRequest, manifest: BatchManifest):
+        self.request = request
+        self.manifest = manifest
+        self.output_paths: Dict[int, str] = {}
+        self.pending = deque()
+        self.running = 0
+        self.lock = threading.Lock()
+
+    def update_items(self, indices: List[int], **changes) -> None:
+        with self.lock:
+            for index in indices:
+                for field, value in changes.items():
+                    setattr(self.manifest.items[index], field, value)
+
+    def snapshot(self) -> BatchManifest:
+        with self.lock:
+            return self.manifest.model_copy(deep=True)
+
+
+_batches: "OrderedDict[str, BatchRun]" = OrderedDict()
+_batches_lock = threading.Lock()
+
+
+def _has_edit_spec(item: BatchExportItem) -> bool:
+    return item.subtitles is not None or bool(item.prompt) or item.style is not None
+
+
+def _item_subtitles(job: Job, session: VideoSession, item: BatchExportItem) -> List[SubtitleResponse]:
+    """The subtitles one batch item burns in; the session itself is left untouched"""
+    subtitles = list(item.subtitles) if item.subtitles is not None else session.subtitles
+    if item.prompt:
+        _, extra, _ = build_prompt_subtitles(job, session, item.prompt)
+        subtitles = subtitles + extra
+    if item.style is not None:
+        overrides = item.style.model_dump(exclude_none=True)
+        subtitles = [subtitle.model_copy(update=overrides) for subtitle in subtitles]
+    return subtitles
+
+
+def _dispatch(run: BatchRun) -> None:
+    """Hand waiting videos to the job queue until the batch's concurrency cap is reached"""
+    with run.lock:
+        while run.pending and run.running < run.manifest.max_concurrency:
+            video_id, indices = run.pending.popleft()
+            run.running += 1
+            job = job_queue.submit("batch_export", video_id, run_batch_group, run, video_id, indices,
+                                   on_cancelled=lambda job, indices=indices: _cancel_group(run, indices))
+            for index in indices:
+                run.manifest.items[index].job_id = job.job_id
+
+
+def _finish_group(run: BatchRun) -> None:
+    with run.lock:
+        run.running -= 1
+        items = run.manifest.items
+        if not run.pending and run.running == 0 and all(item.finished_at for item in items):
+            run.manifest.finished_at = time.time()
+            run.manifest.wall_seconds = run.manifest.finished_at - run.manifest.created_at
+            failed = all(item.status in (JobStatus.FAILED, JobStatus.CANCELLED) for item in items)
+            run.manifest.status = JobStatus.FAILED if failed else JobStatus.COMPLETED
+    _dispatch(run)
+
+
+def _cancel_group(run: BatchRun, indices: List[int]) -> None:
+    """A group's job was cancelled before it ran: settle its items and free its slot"""
+    run.update_items(indices, status=JobStatus.CANCELLED, error="Cancelled", finished_at=time.time())
+    _finish_group(run)
+
+
+def run_batch_group(job: Job, run: BatchRun, video_id: str, indices: List[int]) -> dict:
+    """Render every batch item for one video (runs inside a job worker)
+
+    Several items for the same video share one decode through ffmpeg's split filter.
+    """
+    batch_id = run.manifest.batch_id
+    started_at = time.time()
+    run.update_items(indices, status=JobStatus.RUNNING, started_at=started_at)
+    with run.lock:
+        run.manifest.status = JobStatus.RUNNING
+
+    try:
+        session = session_store.get(video_id)
+        if session is None:
+            raise ValueError("Video not found")
+
+        items = {index: run.request.items[index] for index in indices}
+        rendered = []
+
+        if len(items) == 1 and not _has_edit_spec(items[indices[0]]):
+            # A plain export: reuse the cached, incremental render path
+            index = indices[0]
+            if session.subtitles:
+                output_path = render_export(job, video_id, items[index].profile)["output_path"]
+            else:
+                output_path = session.source_path
+            run.output_paths[index] = output_path
+            rendered.append(index)
+        else:
+            variants = []
+            for index, item in items.items():
+                try:
+                    subtitles = _item_subtitles(job, session, item)
+                except (JobCancelled, JobTimedOut):
+                    raise
+                except Exception as e:
+                    run.update_items([index], status=JobStatus.FAILED, error=str(e), finished_at=time.time())
+                    continue
+                output_path = os.path.join(OUTPUT_DIR, f"{video_id}_batch_{batch_id[:8]}_{index}.mp4")
+                variants.append((subtitles, output_path, get_render_profile(item.profile)))
+                run.output_paths[index] = output_path
+                rendered.append(index)
+
+            if variants:
+                job_queue.report_progress(job, 0.2, "rendering")
+                print(f"🎬 Rendering {len(variants)} variants of {video_id} from one decode...")
+                media = ensure_media_profile(session)
+                burn_subtitle_variants(session.source_path, variants, media,
+                                       lambda fraction: job_queue.report_progress(job, 0.2 + 0.75 * fraction))
+
+        finished_at = time.time()
+        for index in rendered:
+            run.update_items(
+                [index],
+                status=JobStatus.COMPLETED,
+                shared_decode=len(rendered) > 1,
+                download_url=f"/batch/{batch_id}/items/{index}/download",
+                finished_at=finished_at,
+                render_seconds=finished_at - started_at
+            )
+        return {"batch_id": batch_id, "items": rendered}
+
+    except Exception as e:
+        unfinished = [index for index in indices if run.manifest.items[index].finished_at is None]
+        status = JobStatus.CANCELLED if isinstance(e, JobCancelled) else JobStatus.FAILED
+        run.update_items(unfinished, status=status, error=str(e) or "Cancelled", finished_at=time.time())
+        raise
+
+    finally:
+        _finish_group(run)
+
+
+@router.post("/batch/export", response_model=BatchManifest, status_code=202)
+async def batch_export(request: BatchExportRequest):
+    """Queue many renders at once: several videos, several variants of one video, or both
+
+    Items are grouped by video; each group is one job, and at most max_concurrency
+    groups of the batch run at a time. Poll GET /batch/{batch_id} for the manifest.
+    """
+
+    unknown = sorted({item.profile for item in request.items if item.profile not in RENDER_PROFILES})
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown profile(s) {', '.join(unknown)}; expected one of: {', '.join(RENDER_PROFILES)}"
+        )
+
+    now = time.time()
+    max_concurrency = min(request.max_concurrency or BATCH_MAX_CONCURRENCY, JOB_WORKERS)
+    manifest = BatchManifest(
+        batch_id=str(uuid.uuid4()),
+        max_concurrency=max_concurrency,
+        items=[
+            BatchItemResult(index=index, video_id=item.video_id, profile=item.profile)
+            for index, item in enumerate(request.items)
+        ],
+        created_at=now
+    )
+    run = BatchRun(request, manifest)
+
+    groups: "OrderedDict[str, List[int]]" = OrderedDict()
+    for index, item in enumerate(request.items):
+        if item.video_id not in session_store:
+            run.update_items([index], status=JobStatus.FAILED, error="Video not found", finished_at=now)
+            continue
+        groups.setdefault(item.video_id, []).append(index)
+    run.pending.extend(groups.items())
+
+    if not groups:
+        manifest.status = JobStatus.FAILED
+        manifest.finished_at = now
+        manifest.wall_seconds = 0.0
+
+    with _batches_lock:
+        _batches[manifest.batch_id] = run
+        while len(_batches) > BATCH_HISTORY_LIMIT:
+            _batches.popitem(last=False)
+
+    _dispatch(run)
+    return run.snapshot()
+
+
+def _get_run(batch_id: str) -> BatchRun:
+    with _batches_lock:
+        run = _batches.get(batch_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return run
+
+
+@router.get("/batch/{batch_id}", response_model=BatchManifest)
+async def get_batch(batch_id: str):
+    """Per-item status and timings of a batch export"""
+    return _get_run(batch_id).snapshot()
+
+
+@router.get("/batch/{batch_id}/items/{index}/download")
+async def download_batch_item(batch_id: str, index: int, request: Request):
+    """Download one finished batch output"""
+
+    run = _get_run(batch_id)
+    manifest = run.snapshot()
+    if index < 0 or index >= len(manifest.items):
+        raise HTTPException(status_code=404, detail="Batch item not found")
+    item = manifest.items[index]
+    if item.status != JobStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Batch item is {item.status.value}")
+
+    output_path = run.output_paths.get(index)
+    if output_path is None or not os.path.exists(output_path):
+        raise HTTPException(status_code=404, detail="Video file not found")
+
+    session = session_store.get(item.video_id)
+    original_filename = session.original_filename if session else os.path.basename(output_path)
+    return ranged_file_response(
+        request,
+        output_path,
+        media_type="video/mp4",
+        filename=f"{item.profile}_{index}_{original_filename}",
+        attachment=True
+    )
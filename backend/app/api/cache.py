@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from app.services.transcription_cache import transcription_cache
+from app.langgraph_flows.prompt_cache import prompt_cache
+
+router = APIRouter()
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit rates and sizes of the server-side caches"""
+
+    return {
+        "transcription": transcription_cache.stats(),
+        "prompt_parse": prompt_cache.stats()
+    }
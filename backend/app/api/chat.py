@@ -1,107 +1,214 @@
 from fastapi import APIRouter, HTTPException
-from app.models.video import ChatRequest, ChatResponse
+from app.models.video import ChatBatchRequest, ChatBatchResponse, ChatRequest, ChatResponse, SubtitleEdit, VideoSession
+from app.models.job import Job, JobSubmittedResponse
 from app.models.subtitle import SubtitleResponse
-from app.langgraph_flows.subtitle_flow import parse_subtitle_prompt
-from app.services.video_processor import burn_subtitles_to_video
+from app.langgraph_flows.subtitle_flow import parse_subtitle_prompt, parse_subtitle_prompts
 from app.services.transcription_service import auto_generate_subtitles
-from app.api.upload import video_sessions, OUTPUT_DIR
-import os
+from app.services.job_queue import JobCancelled, JobTimedOut, job_queue
+from app.services.render_profiles import RENDER_PROFILES
+from app.services.session_store import session_store
+from app.api.export import render_export, schedule_auto_render
+from typing import Dict, List, Tuple
 import traceback
+import uuid
 
 router = APIRouter()
 
 
-@router.post("/chat", response_model=ChatResponse)
+@router.post("/chat", response_model=JobSubmittedResponse, status_code=202)
 async def process_chat(request: ChatRequest):
-    """Process chat prompt and add subtitle to video"""
-    
+    """Queue a chat prompt that adds subtitles to the video"""
+
     print(f"📥 Received prompt: {request.prompt}")
-    
+
     # Check if video exists
-    if request.video_id not in video_sessions:
+    if request.video_id not in session_store:
         raise HTTPException(status_code=404, detail="Video not found")
-    
-    session = video_sessions[request.video_id]
-    print(f"📹 Video duration: {session.duration}s")
-    
+
+    # Parsing and transcription run in the worker pool
+    job = job_queue.submit("chat", request.video_id, run_chat_edit, request)
+
+    return JobSubmittedResponse(
+        job_id=job.job_id,
+        video_id=request.video_id,
+        status=job.status,
+        status_url=f"/jobs/{job.job_id}",
+        events_url=f"/jobs/{job.job_id}/events"
+    )
+
+
+def build_prompt_subtitles(job: Job, session: VideoSession, prompt: str) -> Tuple[dict, List[SubtitleResponse], str]:
+    """Parse a prompt and produce its subtitles, transcribing if it asks for auto-generation
+
+    Returns (parsed parameters, subtitles, message for the user).
+    """
+
     # Parse prompt using LangGraph + LLM
+    job_queue.report_progress(job, 0.05, "parsing")
     try:
-        subtitle_params = parse_subtitle_prompt(request.prompt, session.duration)
+        subtitle_params = parse_subtitle_prompt(prompt, session.duration)
         print(f"✅ Parsed params: {subtitle_params}")
     except Exception as e:
         print(f"❌ Parse error: {str(e)}")
         traceback.print_exc()
-        raise HTTPException(status_code=400, detail=f"Failed to parse prompt: {str(e)}")
-    
-    auto_subtitles = []
-    added_subtitles_count = 0
-    
+        raise ValueError(f"Failed to parse prompt: {str(e)}")
+
+    new_subtitles, message = subtitles_from_params(job, session, subtitle_params)
+    return subtitle_params, new_subtitles, message
+
+
+def subtitles_from_params(job: Job, session: VideoSession, subtitle_params: dict) -> Tuple[List[SubtitleResponse], str]:
+    """Turn one parsed edit into subtitles, transcribing the upload for auto-generation"""
+
     # Check if auto-generate is requested
     if subtitle_params.get("auto_generate"):
-        # Auto-generate subtitles from video audio
+        # Auto-generate subtitles from the original upload's audio
+        job_queue.report_progress(job, 0.15, "transcribing")
         try:
-            auto_subtitles = auto_generate_subtitles(
-                session.file_path,
+            new_subtitles = auto_generate_subtitles(
+                session.source_path,
                 font_size=subtitle_params["font_size"],
                 color=subtitle_params["color"],
-                position=subtitle_params["position"]
+                position=subtitle_params["position"],
+                media=session.media
             )
-            
-            # Add all generated subtitles to session
-            session.subtitles.extend(auto_subtitles)
-            added_subtitles_count = len(auto_subtitles)
-            
-            # Use first subtitle for response
-            new_subtitle = auto_subtitles[0] if auto_subtitles else SubtitleResponse(
-                text="(Auto-generated subtitles)",
-                start_time=0,
-                end_time=5,
-                font_size=subtitle_params["font_size"],
-                color=subtitle_params["color"],
-                position=subtitle_params["position"]
-            )
-            
-            message = f"Auto-generated {len(auto_subtitles)} subtitle segments from audio"
-            
+            message = f"Auto-generated {len(new_subtitles)} subtitle segments from audio"
+
+        except (JobCancelled, JobTimedOut):
+            raise
         except Exception as e:
             print(f"❌ Auto-generate error: {str(e)}")
             traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f"Failed to auto-generate subtitles: {str(e)}")
+            raise RuntimeError(f"Failed to auto-generate subtitles: {str(e)}")
     else:
         # Manual subtitle with provided text
         print(f"📝 Creating manual subtitle")
-        new_subtitle = SubtitleResponse(**subtitle_params)
-        session.subtitles.append(new_subtitle)
-        added_subtitles_count = 1
+        new_subtitles = [SubtitleResponse(**subtitle_params)]
         message = "Subtitle added successfully"
-    
-    # Generate output video with all subtitles
-    output_filename = f"{request.video_id}_output.mp4"
-    output_path = os.path.join(OUTPUT_DIR, output_filename)
-    
-    print(f"🎬 Burning {len(session.subtitles)} subtitles to video...")
-    try:
-        burn_subtitles_to_video(
-            session.file_path,
-            session.subtitles,
-            output_path
-        )
-        print(f"✅ Video processing complete!")
-    except Exception as e:
-        print(f"❌ Video processing error: {str(e)}")
-        traceback.print_exc()
-        # Remove the subtitles that failed
-        if added_subtitles_count > 0:
-            session.subtitles = session.subtitles[:-added_subtitles_count]
-        raise HTTPException(status_code=500, detail=f"Failed to process video: {str(e)}")
-    
-    # Update session with new output path
-    session.file_path = output_path
-    
+
+    return new_subtitles, message
+
+
+def run_chat_edit(job: Job, request: ChatRequest) -> dict:
+    """Apply one chat prompt to its video session (runs inside a job worker)"""
+
+    session = session_store.get(request.video_id)
+    if session is None:
+        raise ValueError("Video not found")
+    print(f"📹 Video duration: {session.duration}s")
+
+    subtitle_params, new_subtitles, message = build_prompt_subtitles(job, session, request.prompt)
+
+    # Use first subtitle for response
+    new_subtitle = new_subtitles[0] if new_subtitles else SubtitleResponse(
+        text="(Auto-generated subtitles)",
+        start_time=0,
+        end_time=5,
+        font_size=subtitle_params["font_size"],
+        color=subtitle_params["color"],
+        position=subtitle_params["position"]
+    )
+
+    edit = SubtitleEdit(
+        edit_id=str(uuid.uuid4()),
+        prompt=request.prompt,
+        auto_generated=bool(subtitle_params.get("auto_generate")),
+        subtitles=new_subtitles
+    )
+    session_store.update(request.video_id, lambda stored: stored.add_edit(edit))
+    schedule_auto_render(request.video_id)
+
+    # Previews play the source with a WebVTT track; burning waits for /export
     return ChatResponse(
         video_id=request.video_id,
         message=message,
         processed_video_url=f"/preview/{request.video_id}",
+        subtitles_url=f"/preview/{request.video_id}/subtitles.vtt",
         subtitle_added=new_subtitle
+    ).model_dump()
+
+
+@router.post("/chat/batch", response_model=JobSubmittedResponse, status_code=202)
+async def process_chat_batch(request: ChatBatchRequest):
+    """Queue several chat prompts that are parsed together and applied as one change
+
+    Every prompt may hold several edits ("add 'Hi' at 2s and add 'Bye' at 5s").
+    All of them are parsed in one graph invocation and validated together; if any
+    fails, none are applied. With render set, the result is burned in once.
+    """
+
+    print(f"📥 Received {len(request.prompts)} prompts")
+
+    if request.video_id not in session_store:
+        raise HTTPException(status_code=404, detail="Video not found")
+    if request.render is not None and request.render not in RENDER_PROFILES:
+        raise HTTPException(status_code=400, detail=f"render must be one of: {', '.join(RENDER_PROFILES)}")
+
+    job = job_queue.submit("chat_batch", request.video_id, run_chat_batch, request)
+
+    return JobSubmittedResponse(
+        job_id=job.job_id,
+        video_id=request.video_id,
+        status=job.status,
+        status_url=f"/jobs/{job.job_id}",
+        events_url=f"/jobs/{job.job_id}/events"
     )
 
+
+def run_chat_batch(job: Job, request: ChatBatchRequest) -> dict:
+    """Apply a batch of chat prompts to a video session (runs inside a job worker)"""
+
+    session = session_store.get(request.video_id)
+    if session is None:
+        raise ValueError("Video not found")
+
+    job_queue.report_progress(job, 0.05, "parsing")
+    try:
+        parsed = parse_subtitle_prompts(request.prompts, session.duration)
+    except Exception as e:
+        print(f"❌ Parse error: {str(e)}")
+        traceback.print_exc()
+        raise ValueError(f"Failed to parse prompts: {str(e)}")
+    if not parsed:
+        raise ValueError("No edits found in prompts")
+
+    # One edit per command, so each can still be undone on its own
+    job_queue.report_progress(job, 0.15, "building")
+    edits: Dict[str, SubtitleEdit] = {}
+    for subtitle_params in parsed:
+        subtitles, _ = subtitles_from_params(job, session, subtitle_params)
+        command = subtitle_params["command"]
+        if command not in edits:
+            edits[command] = SubtitleEdit(
+                edit_id=str(uuid.uuid4()),
+                prompt=command,
+                auto_generated=bool(subtitle_params.get("auto_generate")),
+                subtitles=[]
+            )
+        edits[command].subtitles.extend(subtitles)
+
+    def apply(stored):
+        # All edits land in one revision, so at most one render follows
+        stored.edits.extend(edits.values())
+        stored.revision += 1
+
+    session_store.update(request.video_id, apply)
+
+    export_url = None
+    if request.render:
+        render_export(job, request.video_id, request.render)
+        export_url = f"/export/{request.video_id}?profile={request.render}"
+    else:
+        schedule_auto_render(request.video_id)
+
+    added = [subtitle for edit in edits.values() for subtitle in edit.subtitles]
+    return ChatBatchResponse(
+        video_id=request.video_id,
+        message=f"Applied {len(added)} subtitles from {len(edits)} commands",
+        edit_ids=[edit.edit_id for edit in edits.values()],
+        commands=list(edits),
+        subtitles_added=added,
+        processed_video_url=f"/preview/{request.video_id}",
+        subtitles_url=f"/preview/{request.video_id}/subtitles.vtt",
+        export_url=export_url
+    ).model_dump()
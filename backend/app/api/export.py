@@ -1,53 +1,237 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
-from app.api.upload import video_sessions, OUTPUT_DIR
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, Response
+from app.models.job import Job, JobStatus
+from app.services.job_queue import job_queue
+from app.services.subtitle_generator import generate_vtt_content
+from app.services.video_processor import burn_subtitles_to_video, mux_soft_subtitles
+from app.services.segment_renderer import render_incremental
+from app.services.media_probe import ensure_media_profile
+from app.services.render_profiles import DEFAULT_RENDER_PROFILE, RENDER_PROFILES, get_render_profile
+from app.services.session_store import session_store
+from app.services.hls_packager import HLS_PLAYLIST, hls_dir, package_hls
+from app.services.render_scheduler import AUTO_RENDER_DEBOUNCE_SECONDS, AUTO_RENDER_PROFILE, RenderDebouncer
+from app.utils.range_response import ranged_file_response
+from app.api.upload import OUTPUT_DIR
 import os
+import re
 
 router = APIRouter()
 
+HLS_SEGMENT_RE = re.compile(r"^segment_\d+\.ts$")
 
-@router.get("/preview/{video_id}")
-async def preview_video(video_id: str):
-    """Get processed video for preview"""
-    
-    if video_id not in video_sessions:
+
+def soft_preview_path(video_id: str) -> str:
+    return os.path.join(OUTPUT_DIR, f"{video_id}_preview.mp4")
+
+
+def render_soft_preview(job: Job, video_id: str) -> dict:
+    """Mux the session's subtitles into the soft preview (runs inside a job worker)"""
+
+    session = session_store.get(video_id)
+    if session is None:
+        raise ValueError("Video not found")
+    preview_path = soft_preview_path(video_id)
+    revision = session.revision
+
+    # An earlier request in the queue may already have muxed this revision
+    if session.preview_revision == revision and os.path.exists(preview_path):
+        return {"output_path": preview_path}
+
+    job_queue.report_progress(job, 0.1, "muxing")
+    mux_soft_subtitles(session.source_path, session.subtitles, preview_path)
+    session_store.update(video_id, lambda stored: setattr(stored, "preview_revision", revision))
+
+    return {"output_path": preview_path}
+
+
+@router.api_route("/preview/{video_id}", methods=["GET", "HEAD"])
+async def preview_video(video_id: str, request: Request, mode: str = "source"):
+    """Get video for preview without burning subtitles in
+
+    mode=source returns the untouched upload (pair it with subtitles.vtt),
+    mode=soft returns the upload with a stream-copied subtitle track,
+    mode=hls redirects to a segmented HLS playlist of the upload.
+    """
+
+    session = session_store.get(video_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Video not found")
-    
-    session = video_sessions[video_id]
-    
-    if not os.path.exists(session.file_path):
+
+    if not os.path.exists(session.source_path):
         raise HTTPException(status_code=404, detail="Video file not found")
-    
-    return FileResponse(
-        session.file_path,
+
+    preview_path = session.source_path
+
+    if mode == "soft" and session.subtitles:
+        preview_path = soft_preview_path(video_id)
+        if session.preview_revision != session.revision or not os.path.exists(preview_path):
+            # Players fire several range requests at once; the queue muxes once per revision
+            job = job_queue.submit("preview", video_id, render_soft_preview, video_id)
+            job = await job_queue.wait(job, abandoned=request.is_disconnected)
+            if job.status == JobStatus.CANCELLED:
+                raise HTTPException(status_code=499, detail="Preview cancelled")
+            if job.status == JobStatus.FAILED:
+                raise HTTPException(status_code=500, detail=job.error)
+    elif mode == "hls":
+        return RedirectResponse(f"/api/preview/{video_id}/hls/{HLS_PLAYLIST}", status_code=307)
+    elif mode != "source":
+        raise HTTPException(status_code=400, detail="mode must be 'source', 'soft' or 'hls'")
+
+    # Range requests let the player seek without downloading the whole file
+    return ranged_file_response(
+        request,
+        preview_path,
         media_type="video/mp4",
         filename=f"preview_{session.original_filename}"
     )
 
 
+@router.get("/preview/{video_id}/hls/{name}")
+async def preview_hls(video_id: str, name: str, request: Request):
+    """HLS playlist and segments of the untouched upload, packaged on first request"""
+
+    if name == HLS_PLAYLIST:
+        session = session_store.get(video_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Video not found")
+        if not os.path.exists(session.source_path):
+            raise HTTPException(status_code=404, detail="Video file not found")
+        try:
+            playlist = await run_in_threadpool(package_hls, video_id, session.source_path)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        return ranged_file_response(request, playlist, media_type="application/vnd.apple.mpegurl")
+
+    if not HLS_SEGMENT_RE.match(name):
+        raise HTTPException(status_code=404, detail="Segment not found")
+    segment_path = os.path.join(hls_dir(video_id), name)
+    if not os.path.exists(segment_path):
+        raise HTTPException(status_code=404, detail="Segment not found")
+
+    # Segments of a given upload never change, so clients can keep them
+    return ranged_file_response(
+        request,
+        segment_path,
+        media_type="video/mp2t",
+        cache_control="public, max-age=31536000, immutable"
+    )
+
+
+@router.get("/preview/{video_id}/subtitles.vtt")
+async def preview_subtitles(video_id: str):
+    """Get the session's subtitles as a WebVTT track for the preview player"""
+
+    session = session_store.get(video_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    return Response(
+        content=generate_vtt_content(session.subtitles),
+        media_type="text/vtt",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+def render_output_path(video_id: str, profile_name: str) -> str:
+    # Renders get their own prefix so a profile can never collide with the soft preview mux
+    return os.path.join(OUTPUT_DIR, f"{video_id}_render_{profile_name}.mp4")
+
+
+def render_export(job: Job, video_id: str, profile_name: str = DEFAULT_RENDER_PROFILE) -> dict:
+    """Burn the session's edit list into the source (runs inside a job worker)"""
+
+    session = session_store.get(video_id)
+    if session is None:
+        raise ValueError("Video not found")
+    profile = get_render_profile(profile_name)
+    output_path = render_output_path(video_id, profile.name)
+    revision = session.revision
+
+    if session.rendered_revisions.get(profile.name) == revision and os.path.exists(output_path):
+        return {"output_path": output_path}
+
+    # Probed once per upload; the keyframe index is filled in on the first render
+    media = ensure_media_profile(session, keyframes=True)
+
+    job_queue.report_progress(job, 0.1, "rendering")
+    # Encoding is the bulk of the job: map it onto 10-95%
+    on_progress = lambda fraction: job_queue.report_progress(job, 0.1 + 0.85 * fraction)
+    print(f"🎬 Burning {len(session.subtitles)} subtitles to video ({profile.name} profile)...")
+    if media is not None and media.duration and media.keyframes is not None:
+        # Only segments whose overlapping subtitles changed get re-encoded
+        render_incremental(video_id, session.source_path, session.subtitles, output_path, media, profile,
+                           on_progress)
+    else:
+        burn_subtitles_to_video(session.source_path, session.subtitles, output_path, media, profile, on_progress)
+    print(f"✅ Video processing complete!")
+
+    def mark_rendered(stored):
+        stored.output_path = output_path
+        stored.rendered_revisions[profile.name] = revision
+
+    session_store.update(video_id, mark_rendered)
+
+    return {"output_path": output_path}
+
+
+def _submit_auto_render(video_id: str) -> None:
+    session = session_store.get(video_id)
+    if session is not None and session.subtitles:
+        job_queue.submit("auto_render", video_id, render_export, video_id, AUTO_RENDER_PROFILE)
+
+
+auto_render = RenderDebouncer(AUTO_RENDER_DEBOUNCE_SECONDS, _submit_auto_render)
+
+
+def schedule_auto_render(video_id: str) -> None:
+    """Render the auto-render profile once this video's edits stop arriving
+
+    Each new edit restarts the wait, so a burst of edits costs one render, and a
+    later /export of the same profile is served from that render.
+    """
+    if AUTO_RENDER_PROFILE:
+        auto_render.schedule(video_id)
+
+
 @router.get("/export/{video_id}")
-async def export_video(video_id: str):
-    """Export final video with all subtitles burned in"""
-    
-    if video_id not in video_sessions:
+async def export_video(video_id: str, request: Request, profile: str = DEFAULT_RENDER_PROFILE):
+    """Export final video with all subtitles burned in
+
+    profile picks the speed/quality trade-off: draft, preview or final.
+    """
+
+    session = session_store.get(video_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Video not found")
-    
-    session = video_sessions[video_id]
-    
-    # Check if processed video exists
-    output_path = os.path.join(OUTPUT_DIR, f"{video_id}_output.mp4")
-    
-    if not os.path.exists(output_path):
-        # If no processing done yet, return original
-        output_path = session.file_path
-    
+    if profile not in RENDER_PROFILES:
+        raise HTTPException(status_code=400, detail=f"profile must be one of: {', '.join(RENDER_PROFILES)}")
+
+    cached_path = render_output_path(video_id, profile)
+    if session.subtitles and session.rendered_revisions.get(profile) == session.revision and os.path.exists(cached_path):
+        # Already rendered at this revision: seeks and re-downloads skip the queue entirely
+        output_path = cached_path
+    elif session.subtitles:
+        # Burn-in only happens here, in the worker pool, and only when edits changed
+        job = job_queue.submit("export", video_id, render_export, video_id, profile)
+        # A client that hangs up mid-render cancels it instead of leaving the encode running
+        job = await job_queue.wait(job, abandoned=request.is_disconnected)
+        if job.status == JobStatus.CANCELLED:
+            raise HTTPException(status_code=499, detail="Export cancelled")
+        if job.status == JobStatus.FAILED:
+            raise HTTPException(status_code=500, detail=f"Failed to process video: {job.error}")
+        output_path = job.result["output_path"]
+    else:
+        # If there is nothing to burn, return original
+        output_path = session.source_path
+
     if not os.path.exists(output_path):
         raise HTTPException(status_code=404, detail="Video file not found")
-    
-    return FileResponse(
+
+    return ranged_file_response(
+        request,
         output_path,
         media_type="video/mp4",
-        filename=f"final_{session.original_filename}",
-        headers={"Content-Disposition": f"attachment; filename=final_{session.original_filename}"}
+        filename=f"{profile}_{session.original_filename}",
+        attachment=True
     )
-
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.models.job import Job
+from app.services.job_queue import job_queue
+import asyncio
+
+router = APIRouter()
+
+# How often the SSE stream checks a job for changes
+EVENT_POLL_INTERVAL = 0.5
+
+
+@router.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str):
+    """Get the current status of a background job"""
+
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job_queue.snapshot(job)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=Job, status_code=202)
+async def cancel_job(job_id: str):
+    """Stop a queued or running job
+
+    A running render's ffmpeg process is killed and its partial output removed; the
+    job ends as "cancelled" shortly after. Watch /jobs/{job_id}/events for the change.
+    """
+
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.is_finished or job_queue.cancel(job_id) is None:
+        raise HTTPException(status_code=409, detail=f"Job already {job_queue.snapshot(job).status.value}")
+
+    return job_queue.snapshot(job)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Stream job progress as Server-Sent Events until it finishes"""
+
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        last_version = -1
+        while True:
+            snapshot = job_queue.snapshot(job)
+            if snapshot.version != last_version:
+                last_version = snapshot.version
+                yield f"event: {snapshot.status.value}\ndata: {snapshot.model_dump_json()}\n\n"
+            if snapshot.is_finished:
+                break
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
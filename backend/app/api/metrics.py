@@ -0,0 +1,90 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.services.job_queue import job_queue
+from app.services.model_registry import model_registry
+from app.services.session_store import session_store
+from app.services.telemetry import metrics
+from app.services.transcription_cache import transcription_cache
+from app.langgraph_flows.prompt_cache import prompt_cache
+import time
+
+router = APIRouter()
+
+STARTED_AT = time.time()
+
+
+def _model_stats():
+    return model_registry.stats()["models"]
+
+
+metrics.gauge(
+    "video_editor_job_queue_depth", "Jobs queued or running",
+    collect=lambda: [({}, job_queue.depth())]
+)
+metrics.gauge(
+    "video_editor_job_workers", "Size of the job worker pool",
+    collect=lambda: [({}, job_queue.max_workers)]
+)
+metrics.gauge(
+    "video_editor_whisper_model_loaded_bytes", "Memory held by each warm Whisper model", ("model",),
+    collect=lambda: [({"model": model["name"]}, model["size_bytes"]) for model in _model_stats()]
+)
+metrics.gauge(
+    "video_editor_whisper_model_in_use", "Transcriptions currently borrowing each Whisper model", ("model",),
+    collect=lambda: [({"model": model["name"]}, model["in_use"]) for model in _model_stats()]
+)
+metrics.gauge(
+    "video_editor_whisper_memory_budget_bytes", "Budget for warm Whisper weights",
+    collect=lambda: [({}, model_registry.memory_budget_bytes)]
+)
+metrics.gauge(
+    "video_editor_cache_entries", "Entries in each server-side cache", ("cache",),
+    collect=lambda: [
+        ({"cache": "transcription"}, transcription_cache.stats()["entries"]),
+        ({"cache": "prompt_parse"}, prompt_cache.stats()["entries"]),
+    ]
+)
+metrics.gauge(
+    "video_editor_cache_hit_rate", "Hit rate of each server-side cache since start", ("cache",),
+    collect=lambda: [
+        ({"cache": "transcription"}, transcription_cache.stats()["hit_rate"]),
+        ({"cache": "prompt_parse"}, prompt_cache.stats()["hit_rate"]),
+    ]
+)
+metrics.gauge(
+    "video_editor_uptime_seconds", "Seconds since this worker started",
+    collect=lambda: [({}, time.time() - STARTED_AT)]
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Stage timings, ffmpeg encode rates, queue depth and model cache state in Prometheus text format"""
+
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/health")
+async def health_check():
+    """Liveness plus what the worker is busy with; 503 when the session store is unreachable"""
+
+    try:
+        # A blocking database round trip; keep it off the event loop
+        await run_in_threadpool(session_store.ping)
+        store_ok = True
+    except Exception as e:
+        print(f"❌ Session store health check failed: {str(e)}")
+        store_ok = False
+
+    models = model_registry.stats()
+    body = {
+        "status": "healthy" if store_ok else "unhealthy",
+        "uptime_seconds": round(time.time() - STARTED_AT, 1),
+        "session_store": "ok" if store_ok else "unreachable",
+        "jobs": {"queued_or_running": job_queue.depth(), "workers": job_queue.max_workers},
+        "whisper_models": [
+            {"name": model["name"], "in_use": model["in_use"]} for model in models["models"]
+        ],
+    }
+    return JSONResponse(body, status_code=200 if store_ok else 503)
@@ -0,0 +1,113 @@
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from app.models.subtitle import SubtitleImportResponse
+from app.models.video import SubtitleEdit
+from app.services.session_store import session_store
+from app.services.subtitle_generator import generate_ass_content, generate_srt_content, generate_vtt_content
+from app.services.subtitle_parser import SUBTITLE_FORMATS, SUBTITLE_MEDIA_TYPES, detect_format, parse_subtitles
+from app.services.timeline import build_timeline
+from app.api.export import schedule_auto_render
+from app.utils.range_response import content_disposition
+from typing import Optional
+import io
+import itertools
+import os
+import uuid
+
+router = APIRouter()
+
+
+def _read_subtitles(file, filename: Optional[str], subtitle_format: Optional[str],
+                    font_size: int, color: str, position: str):
+    """Stream-parse an uploaded subtitle file; returns (format, subtitles)"""
+    # utf-8-sig drops the BOM many subtitle editors write
+    lines = io.TextIOWrapper(file, encoding="utf-8-sig", errors="replace", newline="")
+    first_line = lines.readline()
+    subtitle_format = subtitle_format or detect_format(filename, first_line)
+    subtitles = list(parse_subtitles(
+        itertools.chain([first_line], lines), subtitle_format, font_size, color, position
+    ))
+    lines.detach()
+    return subtitle_format, subtitles
+
+
+@router.post("/subtitles/{video_id}/import", response_model=SubtitleImportResponse)
+async def import_subtitles(
+    video_id: str,
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    font_size: int = 24,
+    color: str = "white",
+    position: str = "bottom",
+    replace: bool = False
+):
+    """Add an existing SRT, WebVTT or ASS file to the session as one edit, skipping transcription
+
+    The format comes from the file extension unless given. font_size, color and
+    position style cues that carry no styling of their own. replace=true drops the
+    session's earlier edits first.
+    """
+
+    if session_store.get(video_id) is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    if format is not None and format not in SUBTITLE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(SUBTITLE_FORMATS)}")
+
+    try:
+        subtitle_format, subtitles = await run_in_threadpool(
+            _read_subtitles, file.file, file.filename, format, font_size, color, position
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse subtitles: {str(e)}")
+    if not subtitles:
+        raise HTTPException(status_code=400, detail="No subtitles found in file")
+
+    edit = SubtitleEdit(
+        edit_id=str(uuid.uuid4()),
+        prompt=f"(imported {file.filename or subtitle_format})",
+        subtitles=subtitles
+    )
+
+    def mutate(stored):
+        if replace:
+            stored.edits = []
+        stored.add_edit(edit)
+
+    if session_store.update(video_id, mutate) is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    schedule_auto_render(video_id)
+    print(f"📄 Imported {len(subtitles)} {subtitle_format} subtitles into {video_id}")
+
+    return SubtitleImportResponse(
+        video_id=video_id,
+        edit_id=edit.edit_id,
+        format=subtitle_format,
+        count=len(subtitles),
+        replaced=replace
+    )
+
+
+@router.get("/subtitles/{video_id}/export")
+async def export_subtitles(video_id: str, format: str = "srt"):
+    """Download the session's subtitles as SRT, WebVTT or ASS"""
+
+    session = session_store.get(video_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    if format not in SUBTITLE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(SUBTITLE_FORMATS)}")
+
+    if format == "srt":
+        content = generate_srt_content(session.subtitles)
+    elif format == "vtt":
+        content = generate_vtt_content(session.subtitles)
+    else:
+        content = generate_ass_content(build_timeline(session.subtitles), session.media)
+
+    filename = f"{os.path.splitext(session.original_filename)[0]}.{format}"
+    return Response(
+        content=content,
+        media_type=SUBTITLE_MEDIA_TYPES[format],
+        headers={"Content-Disposition": content_disposition(filename, attachment=True)}
+    )
@@ -0,0 +1,149 @@
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse
+from app.models.subtitle import SubtitleResponse, TimelineRetimeRequest, TimelineShiftRequest
+from app.models.video import VideoSession
+from app.services.session_store import session_store
+from app.services.timeline import SubtitleTimeline, build_timeline
+from app.services.timeline_assets import (
+    PEAKS_FILE, SPRITE_FILE, asset_dir, asset_key, load_meta, read_overview, retry_timeline_assets,
+    schedule_timeline_assets
+)
+from app.api.export import schedule_auto_render
+from typing import Callable, List, Optional, Tuple
+import os
+
+router = APIRouter()
+
+# A video's source never changes, so neither do its sprite and waveform
+ASSET_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+@router.get("/timeline/{video_id}", response_model=List[SubtitleResponse])
+async def get_timeline(video_id: str, start: Optional[float] = None, end: Optional[float] = None):
+    """Subtitles on screen at any point in [start, end), sorted by start time"""
+
+    session = session_store.get(video_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    timeline = build_timeline(session.subtitles)
+    if start is not None or end is not None:
+        timeline = timeline.overlapping(start or 0.0, end if end is not None else float("inf"))
+    return timeline.to_subtitles()
+
+
+def _transform_edits(video_id: str, transform: Callable[[SubtitleTimeline], SubtitleTimeline]) -> VideoSession:
+    """Apply a timeline transform to every edit, keeping the edit list intact"""
+
+    def mutate(stored: VideoSession):
+        for edit in stored.edits:
+            edit.subtitles = transform(SubtitleTimeline.from_subtitles(edit.subtitles)).to_subtitles()
+        stored.revision += 1
+
+    session = session_store.update(video_id, mutate)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    schedule_auto_render(video_id)
+    return session
+
+
+@router.post("/timeline/{video_id}/shift", response_model=List[SubtitleResponse])
+async def shift_timeline(video_id: str, request: TimelineShiftRequest):
+    """Move subtitles (optionally only those starting in [start, end)) by offset seconds"""
+    session = _transform_edits(video_id, lambda timeline: timeline.shift(request.offset, request.start, request.end))
+    return build_timeline(session.subtitles).to_subtitles()
+
+
+@router.post("/timeline/{video_id}/retime", response_model=List[SubtitleResponse])
+async def retime_timeline(video_id: str, request: TimelineRetimeRequest):
+    """Map every subtitle time t to t * scale + offset"""
+    session = _transform_edits(video_id, lambda timeline: timeline.retime(request.scale, request.offset))
+    return build_timeline(session.subtitles).to_subtitles()
+
+
+def _timeline_assets(video_id: str) -> Tuple[str, Optional[dict]]:
+    """(asset key, metadata) for a video; metadata is None while the assets are being built"""
+
+    session = session_store.get(video_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    key = asset_key(session.content_hash, video_id)
+    meta = load_meta(key)
+    if meta is not None:
+        return key, meta
+
+    # Normally started at upload; this covers restarts and sessions from before it existed
+    build = schedule_timeline_assets(key, session.source_path, session.media)
+    if build is None:
+        return key, load_meta(key)
+    if build.done() and build.exception() is not None:
+        retry_timeline_assets(key)
+        raise HTTPException(status_code=500, detail=str(build.exception()))
+    return key, None
+
+
+def _processing(video_id: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=202,
+        content={"video_id": video_id, "status": "processing"},
+        headers={"Retry-After": "1"}
+    )
+
+
+@router.get("/timeline/{video_id}/overview")
+async def get_timeline_overview(video_id: str):
+    """Sprite sheet, waveform peaks and their layout in one binary payload
+
+    The body starts with b"VETL" and a little-endian uint32 header length, then a
+    JSON header giving each part's offset and length after it. Answers 202 while
+    the assets are still being built.
+    """
+
+    key, meta = _timeline_assets(video_id)
+    if meta is None:
+        return _processing(video_id)
+    return Response(
+        content=await run_in_threadpool(read_overview, key),
+        media_type="application/octet-stream",
+        headers={"Cache-Control": ASSET_CACHE_CONTROL}
+    )
+
+
+@router.get("/timeline/{video_id}/sprite.jpg")
+async def get_timeline_sprite(video_id: str):
+    """Thumbnail sprite sheet; tile layout is in the X-Sprite-* headers"""
+
+    key, meta = _timeline_assets(video_id)
+    if meta is None:
+        return _processing(video_id)
+    sprite = meta["sprite"]
+    if sprite is None:
+        raise HTTPException(status_code=404, detail="Video has no picture")
+    return FileResponse(os.path.join(asset_dir(key), SPRITE_FILE), media_type="image/jpeg", headers={
+        "Cache-Control": ASSET_CACHE_CONTROL,
+        "X-Sprite-Interval": str(sprite["interval"]),
+        "X-Sprite-Count": str(sprite["count"]),
+        "X-Sprite-Columns": str(sprite["columns"]),
+        "X-Sprite-Rows": str(sprite["rows"]),
+        "X-Sprite-Tile-Width": str(sprite["tile_width"]),
+        "X-Sprite-Tile-Height": str(sprite["tile_height"])
+    })
+
+
+@router.get("/timeline/{video_id}/waveform")
+async def get_timeline_waveform(video_id: str):
+    """Waveform as interleaved int8 (min, max) pairs, X-Peaks-Per-Second pairs per second"""
+
+    key, meta = _timeline_assets(video_id)
+    if meta is None:
+        return _processing(video_id)
+    waveform = meta["waveform"]
+    if waveform is None:
+        raise HTTPException(status_code=404, detail="Video has no audio")
+    return FileResponse(os.path.join(asset_dir(key), PEAKS_FILE), media_type="application/octet-stream", headers={
+        "Cache-Control": ASSET_CACHE_CONTROL,
+        "X-Peaks-Per-Second": str(waveform["peaks_per_second"]),
+        "X-Peaks-Count": str(waveform["count"])
+    })
@@ -0,0 +1,115 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.models.job import Job, JobStatus
+from app.models.subtitle import TranscribeRequest
+from app.models.video import SubtitleEdit
+from app.services.transcription_service import stream_subtitles
+from app.services.job_queue import job_queue
+from app.services.session_store import session_store
+from app.api.export import schedule_auto_render
+import asyncio
+import json
+import queue
+import uuid
+
+router = APIRouter()
+
+# How often the NDJSON stream checks its job for new chunks
+CHUNK_POLL_INTERVAL = 0.1
+
+
+def run_stream_transcription(job: Job, video_id: str, request: TranscribeRequest, chunks: queue.SimpleQueue) -> dict:
+    """Transcribe a video chunk by chunk, handing each chunk to chunks (runs inside a job worker)"""
+
+    session = session_store.get(video_id)
+    if session is None:
+        raise ValueError("Video not found")
+
+    job_queue.report_progress(job, 0.05, "transcribing")
+    subtitles = []
+    for chunk in stream_subtitles(
+        session.source_path,
+        font_size=request.font_size,
+        color=request.color,
+        position=request.position,
+        media=session.media,
+        word_timestamps=request.word_timestamps,
+        karaoke=request.karaoke,
+        layout=request.layout
+    ):
+        # Audio decoding checks too, but a finished chunk is the natural place to stop
+        job_queue.raise_if_stopped(job)
+        subtitles.extend(chunk)
+        chunks.put(chunk)
+        if chunk and session.duration:
+            job_queue.report_progress(job, 0.05 + 0.9 * min(chunk[-1].end_time / session.duration, 1.0))
+
+    # Only a finished transcript becomes an edit on the session
+    edit = SubtitleEdit(
+        edit_id=str(uuid.uuid4()),
+        prompt="(streamed transcription)",
+        auto_generated=True,
+        subtitles=subtitles
+    )
+    session_store.update(video_id, lambda stored: stored.add_edit(edit))
+    schedule_auto_render(video_id)
+
+    return {"edit_id": edit.edit_id, "count": len(subtitles)}
+
+
+@router.post("/transcribe/{video_id}/stream")
+async def stream_transcription(video_id: str, request: TranscribeRequest):
+    """Auto-generate subtitles and stream them as NDJSON while Whisper is still running
+
+    With word_timestamps (or karaoke) captions are re-cut from word timings to fit
+    request.layout instead of using Whisper's raw segments. Transcription runs as a
+    job, queued behind other work on the same video; hanging up cancels it.
+
+    Each line is one of:
+      {"type": "job", "job_id": ..., "status_url": ..., "events_url": ...}  first
+      {"type": "subtitles", "subtitles": [...]}  for every transcribed chunk
+      {"type": "done", "edit_id": ..., "count": ...}  once the edit is saved
+      {"type": "error", "detail": ...}  if transcription fails or is cancelled part way
+    """
+
+    if video_id not in session_store:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    chunks: queue.SimpleQueue = queue.SimpleQueue()
+    job = job_queue.submit("transcribe", video_id, run_stream_transcription, video_id, request, chunks)
+
+    async def ndjson_stream():
+        try:
+            yield json.dumps({
+                "type": "job",
+                "job_id": job.job_id,
+                "status_url": f"/jobs/{job.job_id}",
+                "events_url": f"/jobs/{job.job_id}/events"
+            }) + "\n"
+
+            while True:
+                # Every chunk is queued before the job finishes, so drain once more after
+                finished = job.is_finished
+                while not chunks.empty():
+                    yield json.dumps({
+                        "type": "subtitles",
+                        "subtitles": [subtitle.model_dump() for subtitle in chunks.get()]
+                    }) + "\n"
+                if finished:
+                    break
+                await asyncio.sleep(CHUNK_POLL_INTERVAL)
+
+            snapshot = job_queue.snapshot(job)
+            if snapshot.status == JobStatus.COMPLETED:
+                yield json.dumps({"type": "done", **snapshot.result}) + "\n"
+            elif snapshot.status == JobStatus.CANCELLED:
+                yield json.dumps({"type": "error", "detail": "Transcription cancelled"}) + "\n"
+            else:
+                yield json.dumps({"type": "error", "detail": f"Failed to auto-generate subtitles: {snapshot.error}"}) + "\n"
+        finally:
+            # The client hung up: don't keep Whisper busy for nobody
+            if not job.is_finished:
+                print(f"🛑 Client gone; cancelling job {job.job_id}")
+                job_queue.cancel(job.job_id)
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
@@ -1,15 +1,27 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.models.video import VideoUploadResponse, VideoSession
-from app.services.video_processor import get_video_duration
+from fastapi import APIRouter, UploadFile, File, HTTPException, Header, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from app.models.video import (
+    MediaProfile, VideoUploadResponse, VideoSession, ResumableUploadRequest, ResumableUploadStatus
+)
+from app.services.media_probe import probe_media
+from app.services.session_store import session_store, SESSION_TTL_SECONDS
+from app.services.segment_renderer import clear_segment_cache
+from app.services.hls_packager import clear_hls
+from app.services.timeline_assets import asset_key, clear_timeline_assets, schedule_timeline_assets
+from app.services.transcription_cache import hash_file, remember_file_hash
+from contextlib import contextmanager
+from typing import Optional
+import asyncio
+import fcntl
+import glob
+import hashlib
+import json
+import time
 import uuid
 import os
-import shutil
 
 router = APIRouter()
 
-# In-memory storage for video sessions (for MVP)
-video_sessions = {}
-
 UPLOAD_DIR = "uploads"
 OUTPUT_DIR = "outputs"
 
@@ -17,10 +29,137 @@ OUTPUT_DIR = "outputs"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Uploads are written to disk in blocks of this size
+WRITE_BLOCK_BYTES = 1024 * 1024
+
+# Start ffprobe once this much of an upload is on disk, overlapping it with the rest
+PROBE_AFTER_BYTES = int(os.getenv("UPLOAD_PROBE_AFTER_BYTES", str(8 * 1024 * 1024)))
+
+# Build the timeline sprite and waveform as soon as an upload lands ("0" waits for the first request)
+TIMELINE_ASSETS_ON_UPLOAD = os.getenv("TIMELINE_ASSETS_ON_UPLOAD", "1") != "0"
+
+# Resumable uploads that received nothing for this long are deleted by the session GC
+RESUMABLE_UPLOAD_TTL_SECONDS = float(os.getenv("RESUMABLE_UPLOAD_TTL_SECONDS", str(SESSION_TTL_SECONDS)))
+
+# Running hash and early probe of in-progress resumable uploads handled by this worker
+_resumable_hashers = {}
+_resumable_probes = {}
+
+
+class _HashingWriter:
+    """Writes an upload straight to its final path, hashing the bytes on the way"""
+    
+    def __init__(self, path: str, append: bool = False, hasher=None):
+        self.file = open(path, "ab" if append else "wb")
+        self.hasher = hasher or hashlib.sha256()
+        self.bytes_written = 0
+    
+    def write(self, data: bytes) -> None:
+        self.file.write(data)
+        self.hasher.update(data)
+        self.bytes_written += len(data)
+    
+    def flush(self) -> None:
+        self.file.flush()
+    
+    def close(self) -> None:
+        self.file.close()
+
+
+async def _receive(chunks, writer: _HashingWriter, path: str, probe_task=None, limit: Optional[int] = None):
+    """Copy an async stream of body chunks into the writer in ~1 MB blocks
+
+    Once enough of the file is on disk, ffprobe is started in the background so it
+    runs concurrently with the rest of the upload. Returns the probe task, if any.
+    """
+    pending = []
+    pending_size = 0
+    
+    async def write_pending():
+        nonlocal pending, pending_size
+        block = b"".join(pending)
+        pending, pending_size = [], 0
+        await run_in_threadpool(writer.write, block)
+    
+    async for chunk in chunks:
+        if limit is not None and writer.bytes_written + pending_size + len(chunk) > limit:
+            raise HTTPException(status_code=413, detail="Upload is larger than declared")
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= WRITE_BLOCK_BYTES:
+            await write_pending()
+            if probe_task is None and writer.bytes_written >= PROBE_AFTER_BYTES:
+                await run_in_threadpool(writer.flush)
+                probe_task = asyncio.ensure_future(run_in_threadpool(probe_media, path))
+    
+    if pending:
+        await write_pending()
+    await run_in_threadpool(writer.flush)
+    return probe_task
+
+
+async def _probe(path: str, probe_task=None) -> Optional[MediaProfile]:
+    """Use the early probe if it worked, otherwise probe the finished file"""
+    if probe_task is not None:
+        try:
+            media = await probe_task
+            # Only MP4/MOV headers describe the whole file; other containers were estimated from a prefix
+            if media.duration and "mp4" in (media.format_name or ""):
+                return media
+        except Exception:
+            # e.g. the moov atom sits at the end of the file and wasn't there yet
+            pass
+    try:
+        return await run_in_threadpool(probe_media, path)
+    except Exception:
+        return None
+
+
+async def _create_session(video_id: str, filename: str, file_path: str, content_hash: str,
+                          probe_task=None) -> VideoUploadResponse:
+    """Create the session for a fully received upload, reusing an identical earlier upload"""
+    
+    duplicate = session_store.find_by_content_hash(content_hash)
+    if duplicate is not None and os.path.exists(duplicate.source_path):
+        # Same bytes already on disk: point at that file and skip probing
+        await run_in_threadpool(os.remove, file_path)
+        source_path = duplicate.source_path
+        media = duplicate.media
+        duration = duplicate.duration
+    else:
+        remember_file_hash(file_path, content_hash)
+        source_path = file_path
+        # The one probe of this upload; later stages read it from the session
+        media = await _probe(file_path, probe_task)
+        duration = media.duration if media else None
+    
+    # Create video session
+    session = VideoSession(
+        video_id=video_id,
+        original_filename=filename,
+        source_path=source_path,
+        duration=duration,
+        content_hash=content_hash,
+        media=media
+    )
+    
+    session_store.save(session)
+    
+    # Thumbnails and waveform build in the background so the editor's timeline is ready on open
+    if TIMELINE_ASSETS_ON_UPLOAD:
+        schedule_timeline_assets(asset_key(content_hash, video_id), source_path, media)
+    
+    return VideoUploadResponse(
+        video_id=video_id,
+        filename=filename,
+        message="Video uploaded successfully",
+        deduplicated=source_path != file_path
+    )
+
 
 @router.post("/upload", response_model=VideoUploadResponse)
 async def upload_video(file: UploadFile = File(...)):
-    """Upload a video file"""
+    """Upload a video file as multipart form data"""
     
     # Validate file type
     if not file.content_type.startswith("video/"):
@@ -33,39 +172,274 @@ async def upload_video(file: UploadFile = File(...)):
     file_extension = os.path.splitext(file.filename)[1]
     file_path = os.path.join(UPLOAD_DIR, f"{video_id}{file_extension}")
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    def save_upload():
+        writer = _HashingWriter(file_path)
+        try:
+            for block in iter(lambda: file.file.read(WRITE_BLOCK_BYTES), b""):
+                writer.write(block)
+        finally:
+            writer.close()
+        return writer.hasher.hexdigest()
     
-    # Get video duration
+    # Starlette has already spooled the body; use /upload/stream to avoid the second copy
+    content_hash = await run_in_threadpool(save_upload)
+    
+    return await _create_session(video_id, file.filename, file_path, content_hash)
+
+
+@router.post("/upload/stream", response_model=VideoUploadResponse)
+async def upload_video_stream(request: Request, filename: str):
+    """Upload a video as the raw request body, written straight to its final location"""
+    
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("video/"):
+        raise HTTPException(status_code=400, detail="File must be a video")
+    
+    video_id = str(uuid.uuid4())
+    file_extension = os.path.splitext(filename)[1]
+    file_path = os.path.join(UPLOAD_DIR, f"{video_id}{file_extension}")
+    
+    writer = await run_in_threadpool(_HashingWriter, file_path)
     try:
-        duration = get_video_duration(file_path)
-    except Exception as e:
-        duration = None
+        probe_task = await _receive(request.stream(), writer, file_path)
+    except BaseException:
+        await run_in_threadpool(writer.close)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    await run_in_threadpool(writer.close)
     
-    # Create video session
-    session = VideoSession(
-        video_id=video_id,
-        original_filename=file.filename,
-        file_path=file_path,
-        duration=duration,
-        subtitles=[]
+    return await _create_session(video_id, filename, file_path, writer.hasher.hexdigest(), probe_task)
+
+
+def _resumable_meta_path(upload_id: str) -> str:
+    return os.path.join(UPLOAD_DIR, f"{upload_id}.upload.json")
+
+
+def _load_resumable(upload_id: str) -> dict:
+    try:
+        with open(_resumable_meta_path(upload_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+
+def _resumable_status(upload_id: str, meta: dict) -> ResumableUploadStatus:
+    offset = os.path.getsize(meta["path"]) if os.path.exists(meta["path"]) else 0
+    return ResumableUploadStatus(
+        upload_id=upload_id,
+        filename=meta["filename"],
+        size=meta["size"],
+        offset=offset,
+        complete=offset >= meta["size"]
     )
+
+
+@router.post("/uploads", response_model=ResumableUploadStatus, status_code=201)
+async def create_resumable_upload(request: ResumableUploadRequest):
+    """Start a resumable upload; send the bytes with PATCH /uploads/{upload_id}"""
     
-    video_sessions[video_id] = session
+    # The upload id becomes the video id, so bytes land at their final path from the start
+    upload_id = str(uuid.uuid4())
+    file_extension = os.path.splitext(request.filename)[1]
+    meta = {
+        "filename": request.filename,
+        "size": request.size,
+        "path": os.path.join(UPLOAD_DIR, f"{upload_id}{file_extension}"),
+    }
     
-    return VideoUploadResponse(
-        video_id=video_id,
-        filename=file.filename,
-        message="Video uploaded successfully"
-    )
+    open(meta["path"], "wb").close()
+    with open(_resumable_meta_path(upload_id), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    
+    return _resumable_status(upload_id, meta)
+
+
+@router.head("/uploads/{upload_id}")
+async def get_resumable_upload_offset(upload_id: str):
+    """How many bytes the server has, so a client can resume after a failure"""
+    
+    status = _resumable_status(upload_id, _load_resumable(upload_id))
+    return Response(headers={
+        "Upload-Offset": str(status.offset),
+        "Upload-Length": str(status.size),
+        "Cache-Control": "no-store"
+    })
+
+
+@router.get("/uploads/{upload_id}", response_model=ResumableUploadStatus)
+async def get_resumable_upload(upload_id: str):
+    """Progress of a resumable upload"""
+    return _resumable_status(upload_id, _load_resumable(upload_id))
+
+
+@contextmanager
+def _locked_resumable(upload_id: str):
+    """Hold an exclusive lock on an upload's metadata file, shared by all worker processes
+
+    Without it two PATCHes at the same offset would both pass the offset check and
+    both append. Yields False instead of waiting when someone else holds it.
+    """
+    try:
+        f = open(_resumable_meta_path(upload_id), "r", encoding="utf-8")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    try:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+    finally:
+        # Closing the file releases the lock
+        f.close()
+
+
+@router.patch("/uploads/{upload_id}", response_model=ResumableUploadStatus)
+async def append_resumable_upload(upload_id: str, request: Request, upload_offset: int = Header(...)):
+    """Append the request body at Upload-Offset; the last chunk creates the video session"""
+    
+    with _locked_resumable(upload_id) as locked:
+        if not locked:
+            raise HTTPException(status_code=409, detail="Another chunk of this upload is still being received")
+        # Read under the lock: the previous chunk may have just completed the upload
+        meta = _load_resumable(upload_id)
+        status = _resumable_status(upload_id, meta)
+        if status.complete:
+            raise HTTPException(status_code=409, detail="Upload already complete")
+        if upload_offset != status.offset:
+            raise HTTPException(status_code=409, detail=f"Upload-Offset must be {status.offset}")
+        
+        # Keep hashing where the last chunk left off, unless another worker took that chunk
+        if status.offset == 0:
+            hasher = hashlib.sha256()
+        else:
+            hasher, hashed_offset = _resumable_hashers.pop(upload_id, (None, 0))
+            if hashed_offset != status.offset:
+                hasher = None
+        
+        writer = await run_in_threadpool(_HashingWriter, meta["path"], True, hasher)
+        try:
+            probe_task = await _receive(
+                request.stream(), writer, meta["path"],
+                probe_task=_resumable_probes.pop(upload_id, None),
+                limit=meta["size"] - status.offset
+            )
+        finally:
+            await run_in_threadpool(writer.close)
+            if hasher is not None:
+                # Also after a dropped connection: the bytes that reached the file were hashed,
+                # and the offset check on the next chunk catches any mismatch
+                _resumable_hashers[upload_id] = (writer.hasher, status.offset + writer.bytes_written)
+        
+        status = _resumable_status(upload_id, meta)
+        if not status.complete:
+            if probe_task is not None:
+                _resumable_probes[upload_id] = probe_task
+            return status
+        
+        _resumable_hashers.pop(upload_id, None)
+        if hasher is None:
+            # Lost the running hash (restart or a different worker): hash the finished file
+            content_hash = await run_in_threadpool(hash_file, meta["path"])
+        else:
+            content_hash = writer.hasher.hexdigest()
+        
+        os.remove(_resumable_meta_path(upload_id))
+    status.video = await _create_session(upload_id, meta["filename"], meta["path"], content_hash, probe_task)
+    return status
+
+
+def collect_abandoned_uploads(ttl_seconds: float = RESUMABLE_UPLOAD_TTL_SECONDS) -> int:
+    """Delete resumable uploads that stopped receiving data, with their partial files"""
+    
+    removed = 0
+    now = time.time()
+    for meta_path in glob.glob(os.path.join(UPLOAD_DIR, "*.upload.json")):
+        upload_id = os.path.basename(meta_path)[:-len(".upload.json")]
+        try:
+            with _locked_resumable(upload_id) as locked:
+                # A chunk arriving right now means the upload is alive
+                if not locked:
+                    continue
+                meta = _load_resumable(upload_id)
+                # The partial file's mtime moves with every chunk written
+                last_write = os.path.getmtime(meta["path"]) if os.path.exists(meta["path"]) else os.path.getmtime(meta_path)
+                if now - last_write < ttl_seconds:
+                    continue
+                if os.path.exists(meta["path"]):
+                    os.remove(meta["path"])
+                os.remove(meta_path)
+        except HTTPException:
+            # Completed or collected by another worker meanwhile
+            continue
+        _resumable_hashers.pop(upload_id, None)
+        _resumable_probes.pop(upload_id, None)
+        removed += 1
+    
+    if removed:
+        print(f"🧹 Removed {removed} abandoned resumable uploads")
+    return removed
 
 
 @router.get("/video/{video_id}")
 async def get_video_info(video_id: str):
     """Get video session information"""
     
-    if video_id not in video_sessions:
+    session = session_store.get(video_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Video not found")
     
-    return video_sessions[video_id]
+    return session
+
+
+@router.delete("/video/{video_id}")
+async def delete_video(video_id: str):
+    """Delete a video session and the files it owns"""
+    
+    session = session_store.get(video_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    session_store.delete(video_id)
+    await run_in_threadpool(delete_session_media, session)
+    
+    return {"video_id": video_id, "message": "Video deleted"}
+
+
+def delete_session_media(session: VideoSession) -> None:
+    """Remove renders, cached segments, HLS output and (if no other session uses it) the upload
+    along with its timeline assets"""
+    
+    paths = glob.glob(os.path.join(OUTPUT_DIR, f"{session.video_id}_*"))
+    # Call after the session row is gone, so only other sessions are counted
+    source_unused = session_store.count_by_source(session.source_path) == 0
+    if source_unused:
+        paths.append(session.source_path)
+    
+    for path in paths:
+        # Another worker's GC pass may have got there first
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    clear_segment_cache(session.video_id)
+    clear_hls(session.video_id)
+    if source_unused:
+        clear_timeline_assets(asset_key(session.content_hash, session.video_id))
+
+
+def collect_expired_sessions(ttl_seconds: float = SESSION_TTL_SECONDS) -> int:
+    """Delete sessions idle for longer than the TTL along with their media, and abandoned uploads"""
+    
+    expired = session_store.expired(ttl_seconds)
+    for session in expired:
+        session_store.delete(session.video_id)
+        delete_session_media(session)
+    
+    if expired:
+        print(f"🧹 Removed {len(expired)} expired sessions")
+    collect_abandoned_uploads()
+    return len(expired)
 
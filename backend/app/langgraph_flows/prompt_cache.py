@@ -0,0 +1,140 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from app.services.subtitle_generator import ASS_COLOR_MAP
+
+# Prompts for videos within the same bucket of duration share cache entries
+DURATION_BUCKET_SECONDS = float(os.getenv("PROMPT_CACHE_DURATION_BUCKET", "30"))
+
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "1024"))
+
+# Minimum trigram Jaccard similarity for a near match
+NEAR_MATCH_THRESHOLD = float(os.getenv("PROMPT_CACHE_NEAR_THRESHOLD", "0.8"))
+
+QUOTED_RE = re.compile(r"'[^']+'|\"[^\"]+\"|“[^”]+”|‘[^’]+’")
+SLOT_RE = re.compile(r"\d+(?:[.:]\d+)?|\b(?:" + "|".join(ASS_COLOR_MAP.keys()) + r"|top|center|centre|middle|bottom)\b")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase and collapse whitespace outside quotes; quoted text stays verbatim"""
+    parts = []
+    last = 0
+    for match in QUOTED_RE.finditer(prompt):
+        parts.append(prompt[last:match.start()].lower())
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(prompt[last:].lower())
+    return re.sub(r"\s+", " ", "".join(parts)).strip(" .!?")
+
+
+def prompt_slots(normalized: str) -> Tuple[str, ...]:
+    """The parts of a prompt that change its meaning: quoted text, numbers, colors, positions
+
+    Near matches are only allowed between prompts whose slots are identical.
+    """
+    quoted = QUOTED_RE.findall(normalized)
+    unquoted = QUOTED_RE.sub(" ", normalized)
+    return tuple(quoted) + tuple(SLOT_RE.findall(unquoted))
+
+
+def _trigrams(normalized: str) -> Set[str]:
+    text = SLOT_RE.sub(" ", QUOTED_RE.sub(" ", normalized))
+    text = f"  {re.sub(r'[^a-z ]+', ' ', text)}  "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class PromptParseCache:
+    """In-memory cache of LLM parse results with exact and near-duplicate lookup"""
+
+    def __init__(self, max_entries: int = PROMPT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], dict]" = OrderedDict()
+        # (slots, bucket) -> [(trigrams, exact key)] for near-match candidates
+        self._near_index: Dict[Tuple[Tuple[str, ...], int], List[Tuple[Set[str], Tuple[str, int]]]] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    @staticmethod
+    def _bucket(video_duration: float) -> int:
+        return int((video_duration or 0) // DURATION_BUCKET_SECONDS)
+
+    def get(self, prompt: str, video_duration: float) -> Optional[dict]:
+        normalized = normalize_prompt(prompt)
+        bucket = self._bucket(video_duration)
+        key = (normalized, bucket)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return dict(self._entries[key])
+
+            trigrams = _trigrams(normalized)
+            best_key, best_score = None, 0.0
+            for candidate_trigrams, candidate_key in self._near_index.get((prompt_slots(normalized), bucket), []):
+                score = _jaccard(trigrams, candidate_trigrams)
+                if score > best_score:
+                    best_key, best_score = candidate_key, score
+
+            if best_key is not None and best_score >= NEAR_MATCH_THRESHOLD:
+                self._entries.move_to_end(best_key)
+                self.near_hits += 1
+                return dict(self._entries[best_key])
+
+            self.misses += 1
+            return None
+
+    def put(self, prompt: str, video_duration: float, result: dict) -> None:
+        normalized = normalize_prompt(prompt)
+        bucket = self._bucket(video_duration)
+        key = (normalized, bucket)
+
+        with self._lock:
+            if key not in self._entries:
+                near_key = (prompt_slots(normalized), bucket)
+                self._near_index.setdefault(near_key, []).append((_trigrams(normalized), key))
+            self._entries[key] = dict(result)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                near_key = (prompt_slots(evicted_key[0]), evicted_key[1])
+                remaining = [item for item in self._near_index.get(near_key, []) if item[1] != evicted_key]
+                if remaining:
+                    self._near_index[near_key] = remaining
+                else:
+                    self._near_index.pop(near_key, None)
+
+    def record_llm_call(self, seconds: float) -> None:
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.near_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.near_hits) / lookups if lookups else 0.0,
+                "llm_calls": self.llm_calls,
+                "llm_avg_latency_seconds": self.llm_seconds / self.llm_calls if self.llm_calls else 0.0,
+            }
+
+
+# Shared cache for the whole worker process
+prompt_cache = PromptParseCache()
@@ -0,0 +1,150 @@
+import re
+from typing import List, Optional
+from app.services.subtitle_generator import ASS_COLOR_MAP
+
+# Quoted subtitle text: 'Hello', "Hello", “Hello” or ‘Hello’
+QUOTED_RE = re.compile(r"'([^']+)'|\"([^\"]+)\"|“([^”]+)”|‘([^’]+)’")
+
+# A time in seconds ("5", "5.5s", "8 seconds") or as mm:ss ("1:30")
+TIME = r"(\d{1,2}:\d{2}(?:\.\d+)?|\d+(?:\.\d+)?)\s*(?:s|secs?|seconds?)?\b"
+
+SIZE_RE = re.compile(r"\b(\d+)\s*(?:px|pt|pixels?)\b|\b(?:font\s+size|size)\s*(?:of\s+)?(\d+)\b")
+RANGE_RE = re.compile(rf"\b(?:from|between)\s+{TIME}\s*(?:to|and|until|-)\s*{TIME}|\b{TIME}\s*(?:-|to)\s*{TIME}")
+DURATION_RE = re.compile(rf"\bfor\s+{TIME}")
+START_RE = re.compile(rf"\b(?:starting\s+at|start\s+at|at|from)\s+{TIME}")
+COLOR_RE = re.compile(r"\b(" + "|".join(ASS_COLOR_MAP.keys()) + r")\b")
+POSITION_RE = re.compile(r"\b(top|center|centre|middle|bottom)\b")
+AUTO_RE = re.compile(
+    r"\b(?:generate[ds]?|auto(?:matic(?:ally)?)?(?:-generated?)?|transcribe|transcription|"
+    r"from\s+(?:the\s+)?(?:audio|speech)|make\s+(?:the\s+)?subtitles?)\b"
+)
+
+POSITION_ALIASES = {"centre": "center", "middle": "center"}
+
+# Where one prompt moves on to its next edit: a new line, a semicolon, "then", or
+# "and" followed by another command verb ("add 'Hi' at 2s and add 'Bye' at 5s").
+# "... and make it red" refers back to the same edit, so it is not a split.
+COMMAND_VERBS = (
+    r"(?:(?:add|show|display|put|place|write|insert|create|generate|transcribe)\b(?!\s+(?:it|them)\b)"
+    r"|make\s+(?:the\s+)?subtitles?\b)"
+)
+COMMAND_SPLIT_RE = re.compile(
+    rf"\s*(?:[;\n]+|,?\s*\bthen\b|,?\s+\band\s+(?:also\s+)?(?={COMMAND_VERBS}))\s*",
+    re.IGNORECASE
+)
+LIST_MARKER_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+
+# Filler words that may remain once every recognised phrase is removed.
+# Anything else means the prompt says something the rules don't understand.
+FILLER_WORDS = {
+    "a", "an", "the", "add", "show", "display", "put", "place", "write", "insert", "create",
+    "subtitle", "subtitles", "caption", "captions", "text", "title", "at", "in", "on", "with",
+    "of", "and", "to", "color", "colour", "colored", "coloured", "font", "size", "position",
+    "positioned", "please", "it", "them", "saying", "says", "that", "some", "me", "my", "video",
+    "screen", "px", "s", "sec", "secs", "second", "seconds", "for", "from",
+}
+
+
+def _seconds(value: str) -> float:
+    if ':' in value:
+        minutes, seconds = value.split(':', 1)
+        return int(minutes) * 60 + float(seconds)
+    return float(value)
+
+
+def _first_group(match: re.Match) -> Optional[str]:
+    return next((group for group in match.groups() if group is not None), None)
+
+
+def parse_prompt_with_rules(prompt: str, video_duration: float) -> Optional[dict]:
+    """Extract subtitle parameters from a plainly structured prompt
+
+    Returns None when the prompt isn't fully understood, so the caller can
+    fall back to the LLM.
+    """
+
+    quoted = list(QUOTED_RE.finditer(prompt))
+    if len(quoted) > 1:
+        return None
+    text = _first_group(quoted[0]) if quoted else None
+
+    # Recognised phrases are blanked out as they're consumed
+    remaining = QUOTED_RE.sub(" ", prompt).lower()
+
+    def consume(pattern: re.Pattern) -> Optional[re.Match]:
+        nonlocal remaining
+        match = pattern.search(remaining)
+        if match:
+            remaining = remaining[:match.start()] + " " + remaining[match.end():]
+        return match
+
+    auto_generate = consume(AUTO_RE) is not None
+    if auto_generate == (text is not None):
+        # Either both text and auto-generation, or neither: too ambiguous for rules
+        return None
+
+    size_match = consume(SIZE_RE)
+    font_size = int(_first_group(size_match)) if size_match else 24
+
+    color_match = consume(COLOR_RE)
+    color = color_match.group(1) if color_match else "white"
+
+    position_match = consume(POSITION_RE)
+    position = position_match.group(1) if position_match else "bottom"
+    position = POSITION_ALIASES.get(position, position)
+
+    start_time = 0.0
+    end_time = None
+    range_match = consume(RANGE_RE)
+    if range_match:
+        start_value, end_value = [group for group in range_match.groups() if group is not None]
+        start_time, end_time = _seconds(start_value), _seconds(end_value)
+    else:
+        start_match = consume(START_RE)
+        if start_match:
+            start_time = _seconds(start_match.group(1))
+        duration_match = consume(DURATION_RE)
+        if duration_match:
+            end_time = start_time + _seconds(duration_match.group(1))
+
+    leftover = re.findall(r"[a-z0-9]+", remaining)
+    if any(word not in FILLER_WORDS for word in leftover):
+        return None
+
+    if auto_generate:
+        if range_match or start_time:
+            # Partial-range transcription isn't something the rules should guess at
+            return None
+        start_time, end_time = 0, video_duration
+    elif end_time is None:
+        end_time = start_time + 5
+
+    return {
+        "text": text,
+        "auto_generate": auto_generate,
+        "start_time": start_time,
+        "end_time": end_time,
+        "font_size": font_size,
+        "color": color,
+        "position": position,
+    }
+
+
+def split_commands(prompt: str) -> List[str]:
+    """Split a prompt describing several edits into one command per edit
+
+    Separators inside quoted subtitle text are left alone. A prompt with a single
+    edit comes back as a one-item list.
+    """
+    # Blank out quoted text so "Hello; world" can't be split
+    masked = QUOTED_RE.sub(lambda match: "x" * len(match.group(0)), prompt)
+
+    commands = []
+    position = 0
+    for separator in COMMAND_SPLIT_RE.finditer(masked):
+        commands.append(prompt[position:separator.start()])
+        position = separator.end()
+    commands.append(prompt[position:])
+
+    commands = [LIST_MARKER_RE.sub("", command).strip(" ,.") for command in commands]
+    return [command for command in commands if command]
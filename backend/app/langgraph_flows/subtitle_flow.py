@@ -1,13 +1,44 @@
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, Optional
+from typing import Dict, List, TypedDict, Optional
 import json
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from app.langgraph_flows.rule_parser import parse_prompt_with_rules, split_commands
+from app.langgraph_flows.prompt_cache import prompt_cache
+from app.services.telemetry import span
 
 load_dotenv()
 
+# Fields the LLM extracts; these are what the prompt cache stores
+PARSED_FIELDS = ("text", "auto_generate", "start_time", "end_time", "font_size", "color", "position")
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """Chat model shared by every parse in this process"""
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                _llm = ChatOpenAI(
+                    model="gpt-3.5-turbo",
+                    temperature=0,
+                    api_key=os.getenv("OPENAI_API_KEY")
+                )
+    return _llm
+
+
+def set_llm(llm) -> None:
+    """Replace the shared chat model, e.g. with a local stub for tests or benchmarks"""
+    global _llm
+    _llm = llm
+
 
 class SubtitleState(TypedDict):
     prompt: str
@@ -19,21 +50,51 @@ class SubtitleState(TypedDict):
     color: Optional[str]
     position: Optional[str]
     auto_generate: Optional[bool]  # New field to indicate if subtitles should be auto-generated
+    parsed_by: Optional[str]  # "rules" or "llm", whichever node extracted the parameters
     error: Optional[str]
 
 
-def parse_prompt_with_llm(state: SubtitleState) -> SubtitleState:
-    """Use LLM to parse user prompt and extract subtitle parameters"""
+def parse_prompt_with_rules_node(state: SubtitleState) -> SubtitleState:
+    """Try the deterministic parser first; leave the state untouched if it isn't confident"""
     
-    llm = ChatOpenAI(
-        model="gpt-3.5-turbo",
-        temperature=0,
-        api_key=os.getenv("OPENAI_API_KEY")
-    )
+    result = parse_prompt_with_rules(state["prompt"], state["video_duration"])
+    if result is not None:
+        state.update(result)
+        state["parsed_by"] = "rules"
+        state["error"] = None
     
-    system_prompt = f"""You are a subtitle parameter extractor. 
-Extract subtitle information from the user's prompt and return a JSON object with these fields:
-- text: The subtitle text (if explicitly provided by user, otherwise null)
+    return state
+
+
+def route_after_rules(state: SubtitleState) -> str:
+    """Skip the LLM when the rules already understood the prompt"""
+    if state.get("parsed_by") == "rules":
+        return "parsed"
+    return "fallback"
+
+
+def lookup_prompt_cache(state: SubtitleState) -> SubtitleState:
+    """Reuse an earlier LLM parse of the same (or a near-identical) prompt"""
+    
+    cached = prompt_cache.get(state["prompt"], state["video_duration"])
+    if cached is not None:
+        state.update(cached)
+        state["parsed_by"] = "cache"
+        state["error"] = None
+    
+    return state
+
+
+def route_after_cache(state: SubtitleState) -> str:
+    """Only call the LLM on a cache miss"""
+    if state.get("parsed_by") == "cache":
+        return "hit"
+    return "miss"
+
+
+def _extraction_guide(video_duration: float) -> str:
+    """Field list and examples shared by the single and batch extraction prompts"""
+    return f"""- text: The subtitle text (if explicitly provided by user, otherwise null)
 - auto_generate: true if user wants auto-generated subtitles from audio, false otherwise
 - start_time: Start time in seconds (default: 0)
 - end_time: End time in seconds (default: video_duration or start_time + 5)
@@ -41,14 +102,38 @@ Extract subtitle information from the user's prompt and return a JSON object wit
 - color: Color name (default: "white")
 - position: Position - "top", "center", or "bottom" (default: "bottom")
 
-Video duration is: {state['video_duration']} seconds
+Video duration is: {video_duration} seconds
 
 Examples:
 - "add subtitle 'Hello World' at 5 seconds, 26px, red" -> {{"text": "Hello World", "auto_generate": false, "start_time": 5, "end_time": 10, "font_size": 26, "color": "red", "position": "bottom"}}
-- "make subtitle of green color in 36px" -> {{"text": null, "auto_generate": true, "start_time": 0, "end_time": {state['video_duration']}, "font_size": 36, "color": "green", "position": "bottom"}}
-- "generate subtitles in red, 30px" -> {{"text": null, "auto_generate": true, "start_time": 0, "end_time": {state['video_duration']}, "font_size": 30, "color": "red", "position": "bottom"}}
-- "add subtitles from audio, blue color" -> {{"text": null, "auto_generate": true, "start_time": 0, "end_time": {state['video_duration']}, "font_size": 24, "color": "blue", "position": "bottom"}}
-- "show 'Welcome' in blue, 30px at top" -> {{"text": "Welcome", "auto_generate": false, "start_time": 0, "end_time": 5, "font_size": 30, "color": "blue", "position": "top"}}
+- "make subtitle of green color in 36px" -> {{"text": null, "auto_generate": true, "start_time": 0, "end_time": {video_duration}, "font_size": 36, "color": "green", "position": "bottom"}}
+- "generate subtitles in red, 30px" -> {{"text": null, "auto_generate": true, "start_time": 0, "end_time": {video_duration}, "font_size": 30, "color": "red", "position": "bottom"}}
+- "add subtitles from audio, blue color" -> {{"text": null, "auto_generate": true, "start_time": 0, "end_time": {video_duration}, "font_size": 24, "color": "blue", "position": "bottom"}}
+- "show 'Welcome' in blue, 30px at top" -> {{"text": "Welcome", "auto_generate": false, "start_time": 0, "end_time": 5, "font_size": 30, "color": "blue", "position": "top"}}"""
+
+
+def _params_from_llm(result: dict) -> dict:
+    """Fill in defaults for one edit the LLM extracted"""
+    start_time = result.get("start_time", 0)
+    return {
+        "text": result.get("text"),
+        "auto_generate": result.get("auto_generate", False),
+        "start_time": start_time,
+        "end_time": result.get("end_time", start_time + 5),
+        "font_size": result.get("font_size", 24),
+        "color": result.get("color", "white"),
+        "position": result.get("position", "bottom"),
+    }
+
+
+def parse_prompt_with_llm(state: SubtitleState) -> SubtitleState:
+    """Use LLM to parse user prompt and extract subtitle parameters"""
+    
+    llm = get_llm()
+    
+    system_prompt = f"""You are a subtitle parameter extractor. 
+Extract subtitle information from the user's prompt and return a JSON object with these fields:
+{_extraction_guide(state['video_duration'])}
 
 Return ONLY valid JSON, nothing else."""
 
@@ -58,39 +143,48 @@ Return ONLY valid JSON, nothing else."""
             HumanMessage(content=state["prompt"])
         ]
         
-        response = llm.invoke(messages)
+        started = time.perf_counter()
+        with span("llm_call", commands=1):
+            response = llm.invoke(messages)
+        prompt_cache.record_llm_call(time.perf_counter() - started)
         result = json.loads(response.content)
         
-        state["text"] = result.get("text")
-        state["auto_generate"] = result.get("auto_generate", False)
-        state["start_time"] = result.get("start_time", 0)
-        state["end_time"] = result.get("end_time", state["start_time"] + 5)
-        state["font_size"] = result.get("font_size", 24)
-        state["color"] = result.get("color", "white")
-        state["position"] = result.get("position", "bottom")
+        state.update(_params_from_llm(result))
+        state["parsed_by"] = "llm"
         state["error"] = None
         
+        prompt_cache.put(state["prompt"], state["video_duration"], {field: state[field] for field in PARSED_FIELDS})
+        
     except Exception as e:
         state["error"] = f"Failed to parse prompt: {str(e)}"
     
     return state
 
 
-def validate_parameters(state: SubtitleState) -> SubtitleState:
-    """Validate extracted parameters"""
+def _check_params(params: dict, video_duration: float) -> Optional[str]:
+    """Fix up one edit's times in place; returns an error if the edit can't be used"""
     
     # If not auto-generate, text must be provided
-    if not state.get("auto_generate") and not state.get("text"):
-        state["error"] = "No subtitle text found in prompt and auto_generate is false"
-        return state
+    if not params.get("auto_generate") and not params.get("text"):
+        return "No subtitle text found in prompt and auto_generate is false"
     
     # Ensure end_time is after start_time
-    if state["end_time"] <= state["start_time"]:
-        state["end_time"] = state["start_time"] + 5
+    if params["end_time"] <= params["start_time"]:
+        params["end_time"] = params["start_time"] + 5
     
     # Clamp to video duration
-    if state["end_time"] > state["video_duration"]:
-        state["end_time"] = state["video_duration"]
+    if params["end_time"] > video_duration:
+        params["end_time"] = video_duration
+    
+    return None
+
+
+def validate_parameters(state: SubtitleState) -> SubtitleState:
+    """Validate extracted parameters"""
+    
+    error = _check_params(state, state["video_duration"])
+    if error:
+        state["error"] = error
     
     return state
 
@@ -107,11 +201,29 @@ def create_subtitle_parser_graph():
     workflow = StateGraph(SubtitleState)
     
     # Add nodes
+    workflow.add_node("rules", parse_prompt_with_rules_node)
+    workflow.add_node("cache", lookup_prompt_cache)
     workflow.add_node("parse", parse_prompt_with_llm)
     workflow.add_node("validate", validate_parameters)
     
-    # Define edges
-    workflow.set_entry_point("parse")
+    # Define edges: rules first, then the prompt cache, and the LLM only on a miss
+    workflow.set_entry_point("rules")
+    workflow.add_conditional_edges(
+        "rules",
+        route_after_rules,
+        {
+            "parsed": "validate",
+            "fallback": "cache"
+        }
+    )
+    workflow.add_conditional_edges(
+        "cache",
+        route_after_cache,
+        {
+            "hit": "validate",
+            "miss": "parse"
+        }
+    )
     workflow.add_edge("parse", "validate")
     workflow.add_conditional_edges(
         "validate",
@@ -142,10 +254,14 @@ def parse_subtitle_prompt(prompt: str, video_duration: float) -> dict:
         color=None,
         position=None,
         auto_generate=None,
+        parsed_by=None,
         error=None
     )
     
-    result = subtitle_parser.invoke(initial_state)
+    with span("prompt_parse") as attributes:
+        result = subtitle_parser.invoke(initial_state)
+        attributes["parsed_by"] = result.get("parsed_by") or "nothing"
+    print(f"🧭 Prompt parsed by {result.get('parsed_by') or 'nothing'}: {prompt}")
     
     if result.get("error"):
         raise ValueError(result["error"])
@@ -160,3 +276,200 @@ def parse_subtitle_prompt(prompt: str, video_duration: float) -> dict:
         "position": result["position"]
     }
 
+
+
+class BatchSubtitleState(TypedDict):
+    prompts: List[str]
+    video_duration: float
+    commands: List[str]  # prompts split into one command per edit
+    edits: List[Optional[List[dict]]]  # per command; None until some node parses it
+    parsed_by: List[Optional[str]]
+    errors: List[str]
+
+
+def split_prompts_node(state: BatchSubtitleState) -> BatchSubtitleState:
+    """Break every prompt into single-edit commands"""
+    
+    state["commands"] = [command for prompt in state["prompts"] for command in split_commands(prompt)]
+    state["edits"] = [None] * len(state["commands"])
+    state["parsed_by"] = [None] * len(state["commands"])
+    
+    return state
+
+
+def batch_rules_node(state: BatchSubtitleState) -> BatchSubtitleState:
+    """Run the deterministic parser over every command"""
+    
+    for index, command in enumerate(state["commands"]):
+        result = parse_prompt_with_rules(command, state["video_duration"])
+        if result is not None:
+            state["edits"][index] = [result]
+            state["parsed_by"][index] = "rules"
+    
+    return state
+
+
+def batch_cache_node(state: BatchSubtitleState) -> BatchSubtitleState:
+    """Fill commands the rules missed from the prompt cache"""
+    
+    for index, command in enumerate(state["commands"]):
+        if state["edits"][index] is None:
+            cached = prompt_cache.get(command, state["video_duration"])
+            if cached is not None:
+                state["edits"][index] = [dict(cached)]
+                state["parsed_by"][index] = "cache"
+    
+    return state
+
+
+def route_after_batch_cache(state: BatchSubtitleState) -> str:
+    """One LLM call covers every command still unparsed; skip it if there are none"""
+    if any(edits is None for edits in state["edits"]):
+        return "miss"
+    return "hit"
+
+
+def batch_parse_with_llm(state: BatchSubtitleState) -> BatchSubtitleState:
+    """Parse all remaining commands with a single LLM call
+    
+    A command may describe more than one edit, so the model returns a flat list of
+    edits, each tagged with the number of the command it came from.
+    """
+    
+    pending = [index for index, edits in enumerate(state["edits"]) if edits is None]
+    numbered = "\n".join(f"{number}. {state['commands'][index]}" for number, index in enumerate(pending, start=1))
+    
+    system_prompt = f"""You are a subtitle parameter extractor.
+The user gives a numbered list of commands. A command may ask for more than one subtitle.
+Return a JSON object {{"edits": [...]}} with one entry per subtitle. Each entry has a "command"
+field with the number of the command it came from, plus these fields:
+{_extraction_guide(state['video_duration'])}
+
+Return ONLY valid JSON, nothing else."""
+    
+    try:
+        started = time.perf_counter()
+        with span("llm_call", commands=len(pending)):
+            response = get_llm().invoke([
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=numbered)
+            ])
+        prompt_cache.record_llm_call(time.perf_counter() - started)
+        result = json.loads(response.content)
+        entries = result.get("edits", []) if isinstance(result, dict) else result
+        
+        grouped: Dict[int, List[dict]] = {}
+        for entry in entries:
+            number = int(entry.get("command", 1))
+            if 1 <= number <= len(pending):
+                grouped.setdefault(pending[number - 1], []).append(_params_from_llm(entry))
+        
+        for index, edits in grouped.items():
+            state["edits"][index] = edits
+            state["parsed_by"][index] = "llm"
+            if len(edits) == 1:
+                # Only single-edit answers fit the cache's one-parse-per-prompt shape
+                prompt_cache.put(state["commands"][index], state["video_duration"], edits[0])
+    
+    except Exception as e:
+        state["errors"].append(f"Failed to parse prompts: {str(e)}")
+    
+    return state
+
+
+def validate_batch(state: BatchSubtitleState) -> BatchSubtitleState:
+    """Validate every edit, then the batch as a whole
+    
+    The batch is all-or-nothing: any unparsed command or invalid edit is reported
+    and nothing is applied.
+    """
+    
+    seen = set()
+    auto_generated = 0
+    for index, command in enumerate(state["commands"]):
+        edits = state["edits"][index]
+        if not edits:
+            if not state["errors"]:
+                state["errors"].append(f"Could not understand command {index + 1}: {command}")
+            continue
+        
+        unique = []
+        for params in edits:
+            error = _check_params(params, state["video_duration"])
+            if error:
+                state["errors"].append(f"Command {index + 1} ({command}): {error}")
+                continue
+            # The same subtitle asked for twice is applied once
+            key = tuple(params.get(field) for field in PARSED_FIELDS)
+            if key not in seen:
+                seen.add(key)
+                unique.append(params)
+                auto_generated += bool(params.get("auto_generate"))
+        state["edits"][index] = unique
+    
+    if auto_generated > 1:
+        state["errors"].append("Only one command per batch can auto-generate subtitles")
+    
+    return state
+
+
+def create_batch_parser_graph():
+    """Variant of the parser graph that handles many commands in one invocation"""
+    workflow = StateGraph(BatchSubtitleState)
+    
+    workflow.add_node("split", split_prompts_node)
+    workflow.add_node("rules", batch_rules_node)
+    workflow.add_node("cache", batch_cache_node)
+    workflow.add_node("parse", batch_parse_with_llm)
+    workflow.add_node("validate", validate_batch)
+    
+    # Same order as the single graph: rules, then the cache, and the LLM once for the rest
+    workflow.set_entry_point("split")
+    workflow.add_edge("split", "rules")
+    workflow.add_edge("rules", "cache")
+    workflow.add_conditional_edges(
+        "cache",
+        route_after_batch_cache,
+        {
+            "hit": "validate",
+            "miss": "parse"
+        }
+    )
+    workflow.add_edge("parse", "validate")
+    workflow.add_edge("validate", END)
+    
+    return workflow.compile()
+
+
+batch_subtitle_parser = create_batch_parser_graph()
+
+
+def parse_subtitle_prompts(prompts: List[str], video_duration: float) -> List[dict]:
+    """Parse several prompts (each possibly holding several edits) in one graph invocation
+    
+    Returns the validated edits in order, each with its source "command".
+    """
+    
+    initial_state = BatchSubtitleState(
+        prompts=prompts,
+        video_duration=video_duration,
+        commands=[],
+        edits=[],
+        parsed_by=[],
+        errors=[]
+    )
+    
+    with span("prompt_parse_batch", prompts=len(prompts)) as attributes:
+        result = batch_subtitle_parser.invoke(initial_state)
+        attributes["commands"] = len(result["commands"])
+    sources = ", ".join(f"{source or 'nothing'}" for source in result["parsed_by"])
+    print(f"🧭 Parsed {len(result['commands'])} commands ({sources})")
+    
+    if result["errors"]:
+        raise ValueError("; ".join(result["errors"]))
+    
+    return [
+        dict({field: params[field] for field in PARSED_FIELDS}, command=command)
+        for command, edits in zip(result["commands"], result["edits"])
+        for params in edits
+    ]
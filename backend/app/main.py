@@ -1,6 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import upload, chat, export
+from app.api import upload, chat, export, jobs, cache, transcribe, batch, timeline, subtitles, metrics
+from app.services.model_registry import model_registry, DEFAULT_WHISPER_MODEL
+from app.services.telemetry import configure_tracing, metrics as metrics_registry, span
+import asyncio
+import os
+import time
 
 app = FastAPI(
     title="Video Editor API",
@@ -17,10 +22,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+HTTP_REQUEST_SECONDS = metrics_registry.histogram(
+    "video_editor_http_request_seconds", "Time to produce each response's headers", ("method", "route", "status")
+)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Open a root span per request so the stages it triggers share a trace id"""
+    started = time.perf_counter()
+    with span("http", method=request.method, path=request.url.path) as attributes:
+        response = await call_next(request)
+        attributes["status"] = response.status_code
+    # The route template (/api/export/{video_id}) keeps label cardinality bounded
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code
+    )
+    return response
+
+
 # Include routers
 app.include_router(upload.router, prefix="/api", tags=["Upload"])
 app.include_router(chat.router, prefix="/api", tags=["Chat"])
 app.include_router(export.router, prefix="/api", tags=["Export"])
+app.include_router(jobs.router, prefix="/api", tags=["Jobs"])
+app.include_router(transcribe.router, prefix="/api", tags=["Transcribe"])
+app.include_router(cache.router, prefix="/api", tags=["Cache"])
+app.include_router(batch.router, prefix="/api", tags=["Batch"])
+app.include_router(timeline.router, prefix="/api", tags=["Timeline"])
+app.include_router(subtitles.router, prefix="/api", tags=["Subtitles"])
+app.include_router(metrics.router, tags=["Monitoring"])
+
+
+@app.on_event("startup")
+async def start_tracing():
+    configure_tracing()
+
+
+@app.on_event("startup")
+async def preload_whisper_models():
+    """Warm the Whisper model pool so the first request doesn't pay the load"""
+    models = os.getenv("WHISPER_PRELOAD_MODELS", DEFAULT_WHISPER_MODEL)
+    names = [name.strip() for name in models.split(",") if name.strip()]
+    if names:
+        await asyncio.to_thread(model_registry.preload, names)
+
+
+@app.on_event("startup")
+async def start_session_gc():
+    """Periodically drop expired sessions and their media"""
+    interval = float(os.getenv("SESSION_GC_INTERVAL_SECONDS", "3600"))
+    
+    async def gc_loop():
+        while True:
+            try:
+                await asyncio.to_thread(upload.collect_expired_sessions)
+            except Exception as e:
+                print(f"❌ Session GC error: {str(e)}")
+            await asyncio.sleep(interval)
+    
+    asyncio.create_task(gc_loop())
 
 
 @app.get("/")
@@ -32,12 +97,14 @@ async def root():
             "upload": "/api/upload",
             "chat": "/api/chat",
             "preview": "/api/preview/{video_id}",
-            "export": "/api/export/{video_id}"
+            "export": "/api/export/{video_id}",
+            "batch_export": "/api/batch/export",
+            "subtitles_import": "/api/subtitles/{video_id}/import",
+            "subtitles_export": "/api/subtitles/{video_id}/export",
+            "timeline_overview": "/api/timeline/{video_id}/overview",
+            "jobs": "/api/jobs/{job_id}",
+            "metrics": "/metrics",
+            "health": "/health"
         }
     }
 
-
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
-
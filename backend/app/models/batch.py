@@ -0,0 +1,56 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from .job import JobStatus
+from .subtitle import SubtitleResponse
+
+
+class SubtitleStyle(BaseModel):
+    """Style override applied to every subtitle of a batch item"""
+    font_size: Optional[int] = None
+    color: Optional[str] = None
+    position: Optional[str] = None
+
+
+class BatchExportItem(BaseModel):
+    """One output to render; the edit spec defaults to the session's current subtitles
+
+    Batch items never change the session: prompts and overrides only shape this render.
+    """
+    video_id: str
+    subtitles: Optional[List[SubtitleResponse]] = Field(
+        default=None, description="Use these subtitles instead of the session's"
+    )
+    prompt: Optional[str] = Field(default=None, description="Extra chat prompt applied on top, not saved")
+    style: Optional[SubtitleStyle] = None
+    profile: str = "final"
+
+
+class BatchExportRequest(BaseModel):
+    items: List[BatchExportItem] = Field(min_length=1)
+    max_concurrency: Optional[int] = Field(
+        default=None, ge=1, description="How many videos of this batch render at once"
+    )
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    video_id: str
+    profile: str
+    status: JobStatus = JobStatus.QUEUED
+    job_id: Optional[str] = None
+    shared_decode: bool = Field(default=False, description="Rendered in one ffmpeg run with its video's other items")
+    download_url: Optional[str] = None
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    render_seconds: Optional[float] = None
+
+
+class BatchManifest(BaseModel):
+    batch_id: str
+    status: JobStatus = JobStatus.QUEUED
+    max_concurrency: int
+    items: List[BatchItemResult]
+    created_at: float
+    finished_at: Optional[float] = None
+    wall_seconds: Optional[float] = None
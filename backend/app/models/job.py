@@ -0,0 +1,51 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional
+from enum import Enum
+import time
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class EncodeProgress(BaseModel):
+    """Live stats of the ffmpeg run a job is waiting on, from ffmpeg's -progress output"""
+    operation: str
+    out_time: float = Field(default=0.0, description="Seconds of output written so far")
+    duration: Optional[float] = Field(default=None, description="Seconds of output expected, when known")
+    frame: Optional[int] = None
+    fps: Optional[float] = None
+    speed: Optional[float] = Field(default=None, description="Media seconds per wall second")
+
+
+class Job(BaseModel):
+    job_id: str
+    kind: str
+    video_id: str
+    status: JobStatus = JobStatus.QUEUED
+    progress: float = Field(default=0.0, description="Completion between 0 and 1")
+    stage: Optional[str] = None
+    encode: Optional[EncodeProgress] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = Field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    timeout_seconds: Optional[float] = Field(default=None, description="Running time after which the job is stopped")
+    version: int = Field(default=0, description="Bumped on every state change")
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class JobSubmittedResponse(BaseModel):
+    job_id: str
+    video_id: str
+    status: JobStatus
+    status_url: str
+    events_url: str
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class RenderProfile(BaseModel):
+    """x264 speed/quality trade-off for one kind of render"""
+    name: str
+    preset: str = Field(description="x264 preset, ultrafast..veryslow")
+    crf: int = Field(ge=0, le=51, description="Constant rate factor; lower is better quality")
+    threads: int = Field(default=0, ge=0, description="Encoder threads per render; 0 lets x264 decide")
+    tune: Optional[str] = None
+    max_height: Optional[int] = Field(default=None, description="Downscale taller sources to this many lines")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 
 class SubtitleRequest(BaseModel):
@@ -11,6 +11,12 @@ class SubtitleRequest(BaseModel):
     position: str = Field(default="bottom", description="Position: top, center, bottom")
 
 
+class WordTiming(BaseModel):
+    text: str
+    start: float
+    end: float
+
+
 class SubtitleResponse(BaseModel):
     text: str
     start_time: float
@@ -18,3 +24,43 @@ class SubtitleResponse(BaseModel):
     font_size: int
     color: str
     position: str
+    words: Optional[List[WordTiming]] = Field(default=None, description="Per-word timings, when transcribed with them")
+    karaoke: bool = Field(default=False, description="Highlight words as they are spoken in burned-in output")
+
+
+class CaptionLayout(BaseModel):
+    """Limits used to re-cut word-timed transcripts into readable captions"""
+    max_chars_per_line: int = Field(default=42, ge=8)
+    max_lines: int = Field(default=2, ge=1)
+    max_duration: float = Field(default=7.0, gt=0, description="Longest a caption may stay on screen")
+    min_duration: float = Field(default=1.0, ge=0, description="Shortest a caption may stay on screen")
+    max_chars_per_second: float = Field(default=17.0, gt=0, description="Reading speed captions are extended to meet")
+    max_pause: float = Field(default=0.8, ge=0, description="A silence longer than this starts a new caption")
+
+
+class TranscribeRequest(BaseModel):
+    font_size: int = Field(default=24, description="Font size in pixels")
+    color: str = Field(default="white", description="Font color")
+    position: str = Field(default="bottom", description="Position: top, center, bottom")
+    word_timestamps: bool = Field(default=False, description="Transcribe word timings and re-cut captions with layout")
+    karaoke: bool = Field(default=False, description="Highlight each word as it is spoken; implies word_timestamps")
+    layout: CaptionLayout = Field(default_factory=CaptionLayout)
+
+
+class TimelineShiftRequest(BaseModel):
+    offset: float = Field(description="Seconds to move subtitles by; negative moves them earlier")
+    start: Optional[float] = Field(default=None, description="Only move subtitles starting at or after this time")
+    end: Optional[float] = Field(default=None, description="Only move subtitles starting before this time")
+
+
+class TimelineRetimeRequest(BaseModel):
+    scale: float = Field(gt=0, description="Multiply every time by this, e.g. 25/23.976 after a frame rate change")
+    offset: float = Field(default=0.0, description="Then add this many seconds")
+
+
+class SubtitleImportResponse(BaseModel):
+    video_id: str
+    edit_id: str
+    format: str
+    count: int
+    replaced: bool = Field(default=False, description="Whether earlier edits were dropped")
@@ -1,20 +1,101 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field, computed_field
+from typing import Dict, List, Optional
 from .subtitle import SubtitleResponse
 
 
+class SubtitleEdit(BaseModel):
+    """One chat turn's worth of subtitles, applied on top of the source upload"""
+    edit_id: str
+    prompt: str
+    auto_generated: bool = False
+    subtitles: List[SubtitleResponse] = []
+
+
+class MediaStream(BaseModel):
+    index: int
+    codec_type: str
+    codec_name: Optional[str] = None
+
+
+class MediaProfile(BaseModel):
+    """What one probe of the upload found; renderers and the transcriber read this instead of re-probing"""
+    duration: Optional[float] = None
+    format_name: Optional[str] = None
+    bit_rate: Optional[int] = None
+    streams: List[MediaStream] = []
+    video_codec: Optional[str] = None
+    width: Optional[int] = Field(default=None, description="Display width, after rotation")
+    height: Optional[int] = Field(default=None, description="Display height, after rotation")
+    fps: Optional[float] = None
+    pix_fmt: Optional[str] = None
+    video_bit_rate: Optional[int] = None
+    audio_codec: Optional[str] = None
+    audio_channels: Optional[int] = None
+    audio_channel_layout: Optional[str] = None
+    audio_sample_rate: Optional[int] = None
+    audio_bit_rate: Optional[int] = None
+    keyframes: Optional[List[float]] = Field(
+        default=None, description="Keyframe times in seconds; indexed on first render"
+    )
+
+    @property
+    def has_video(self) -> bool:
+        return self.video_codec is not None
+
+    @property
+    def has_audio(self) -> bool:
+        return self.audio_codec is not None
+
+
 class VideoSession(BaseModel):
     video_id: str
     original_filename: str
-    file_path: str
+    source_path: str = Field(description="Original upload; never overwritten by renders")
     duration: Optional[float] = None
-    subtitles: List[SubtitleResponse] = []
+    content_hash: Optional[str] = Field(default=None, description="SHA-256 of the uploaded file")
+    media: Optional[MediaProfile] = None
+    edits: List[SubtitleEdit] = []
+    revision: int = Field(default=0, description="Bumped whenever the edit list changes")
+    output_path: Optional[str] = None
+    rendered_revisions: Dict[str, int] = Field(
+        default={}, description="Edit revision last rendered, per render profile"
+    )
+    preview_revision: Optional[int] = None
+
+    @computed_field
+    @property
+    def subtitles(self) -> List[SubtitleResponse]:
+        """All subtitles from the edit list, in the order they were added"""
+        return [subtitle for edit in self.edits for subtitle in edit.subtitles]
+
+    def add_edit(self, edit: SubtitleEdit) -> None:
+        self.edits.append(edit)
+        self.revision += 1
+
+    def remove_edit(self, edit_id: str) -> None:
+        self.edits = [edit for edit in self.edits if edit.edit_id != edit_id]
+        self.revision += 1
 
 
 class VideoUploadResponse(BaseModel):
     video_id: str
     filename: str
     message: str
+    deduplicated: bool = False
+
+
+class ResumableUploadRequest(BaseModel):
+    filename: str
+    size: int = Field(gt=0, description="Total upload size in bytes")
+
+
+class ResumableUploadStatus(BaseModel):
+    upload_id: str
+    filename: str
+    size: int
+    offset: int
+    complete: bool = False
+    video: Optional[VideoUploadResponse] = None
 
 
 class ChatRequest(BaseModel):
@@ -22,8 +103,28 @@ class ChatRequest(BaseModel):
     prompt: str
 
 
+class ChatBatchRequest(BaseModel):
+    video_id: str
+    prompts: List[str] = Field(min_length=1, description="Each prompt may itself describe several edits")
+    render: Optional[str] = Field(
+        default=None, description="Render profile to burn in right after the edits are applied"
+    )
+
+
+class ChatBatchResponse(BaseModel):
+    video_id: str
+    message: str
+    edit_ids: List[str]
+    commands: List[str] = Field(description="Command each added subtitle group came from")
+    subtitles_added: List[SubtitleResponse]
+    processed_video_url: str
+    subtitles_url: Optional[str] = None
+    export_url: Optional[str] = Field(default=None, description="Rendered output, when render was requested")
+
+
 class ChatResponse(BaseModel):
     video_id: str
     message: str
     processed_video_url: str
+    subtitles_url: Optional[str] = None
     subtitle_added: SubtitleResponse
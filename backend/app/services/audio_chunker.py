@@ -0,0 +1,247 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import get_context
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.caption_segmenter import words_from_whisper
+
+# Audio is always decoded to 16 kHz mono, which is what Whisper expects
+SAMPLE_RATE = 16000
+
+# Audio longer than this is split at silences and transcribed in parallel
+LONG_FORM_THRESHOLD_SECONDS = float(os.getenv("LONG_FORM_THRESHOLD_SECONDS", "600"))
+
+# Chunks aim for this length and never exceed the maximum
+CHUNK_TARGET_SECONDS = float(os.getenv("CHUNK_TARGET_SECONDS", "60"))
+CHUNK_MAX_SECONDS = float(os.getenv("CHUNK_MAX_SECONDS", "90"))
+
+# Context kept on both sides of a chunk so words at the cut aren't lost
+CHUNK_OVERLAP_SECONDS = 1.0
+
+# Every pool worker holds its own copy of the model, so by default the pool gets as many
+# workers as copies fit in WHISPER_MEMORY_BUDGET_MB (at most one per core)
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "0"))
+
+# Approximate float32 weights of each Whisper size, used to size the pool before loading
+WHISPER_MODEL_SIZES_MB = {"tiny": 151, "base": 290, "small": 967, "medium": 3055, "large": 6170, "turbo": 3235}
+
+FRAME_MS = 30
+MIN_SILENCE_MS = 300
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_model: Optional[str] = None
+_pool_workers = 0
+_pool_users = 0
+_pool_changed = threading.Condition()
+
+
+def frame_energies(samples: np.ndarray, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """RMS energy in dB per frame"""
+    frame_len = SAMPLE_RATE * frame_ms // 1000
+    usable = len(samples) // frame_len * frame_len
+    if usable == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:usable].reshape(-1, frame_len)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-10)
+    return 20 * np.log10(rms)
+
+
+def find_cut(
+    samples: np.ndarray,
+    target_seconds: float = CHUNK_TARGET_SECONDS,
+    max_seconds: float = CHUNK_MAX_SECONDS
+) -> int:
+    """Sample offset of the quietest stretch between half the target length and the maximum"""
+    energies = frame_energies(samples[:int(max_seconds * SAMPLE_RATE)])
+    frame_len = SAMPLE_RATE * FRAME_MS // 1000
+
+    # Moving average so a single quiet frame inside speech doesn't win
+    window = max(1, MIN_SILENCE_MS // FRAME_MS)
+    smoothed = np.convolve(energies, np.ones(window) / window, mode='same')
+
+    min_frame = int(target_seconds / 2 * 1000 / FRAME_MS)
+    if len(smoothed) <= min_frame:
+        return len(energies) * frame_len
+    return (min_frame + int(np.argmin(smoothed[min_frame:]))) * frame_len
+
+
+def iter_chunks(blocks: Iterable[np.ndarray]) -> Iterator[Tuple[int, int, int, np.ndarray]]:
+    """Cut a stream of PCM blocks at silences as it arrives
+
+    Yields (padded_start, core_start, core_end, audio) with positions in samples.
+    Only about one chunk of audio is buffered at any time.
+    """
+    overlap = int(CHUNK_OVERLAP_SECONDS * SAMPLE_RATE)
+    lookahead = int(CHUNK_MAX_SECONDS * SAMPLE_RATE) + overlap
+
+    buffer = np.zeros(0, dtype=np.float32)
+    buffer_start = 0   # stream position of buffer[0]
+    core_start = 0
+
+    for block in blocks:
+        buffer = np.concatenate([buffer, block])
+        while buffer_start + len(buffer) - core_start >= lookahead:
+            core_offset = core_start - buffer_start
+            core_end = core_start + find_cut(buffer[core_offset:])
+            padded_start = max(buffer_start, core_start - overlap)
+            audio = buffer[padded_start - buffer_start:core_end + overlap - buffer_start].copy()
+            yield padded_start, core_start, core_end, audio
+
+            # Keep just the overlap before the cut for the next chunk
+            drop = max(0, core_end - overlap - buffer_start)
+            buffer = buffer[drop:]
+            buffer_start += drop
+            core_start = core_end
+
+    core_end = buffer_start + len(buffer)
+    if core_end > core_start:
+        padded_start = max(buffer_start, core_start - overlap)
+        yield padded_start, core_start, core_end, buffer[padded_start - buffer_start:].copy()
+
+
+def _init_worker(threads: int, memory_budget_mb: float) -> None:
+    """Split the cores and the model budget between pool workers instead of each using all of them"""
+    import torch
+    torch.set_num_threads(threads)
+
+    from app.services.model_registry import model_registry
+    model_registry.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+
+
+def _transcribe_chunk(audio: np.ndarray, padded_start: int, core_start: int, core_end: int,
+                      model_name: str, options: dict) -> List[dict]:
+    """Transcribe one chunk in a pool worker and return segments in stream time"""
+    # Imported here so the parent process doesn't need the registry to start the pool
+    from app.services.model_registry import model_registry
+
+    with model_registry.acquire(model_name) as model:
+        result = model.transcribe(audio, **options)
+
+    offset = padded_start / SAMPLE_RATE
+    segments = []
+    for segment in result['segments']:
+        start = segment['start'] + offset
+        end = segment['end'] + offset
+        # Each segment belongs to the chunk whose core holds its midpoint
+        midpoint = (start + end) / 2
+        if core_start / SAMPLE_RATE <= midpoint < core_end / SAMPLE_RATE:
+            entry = {"text": segment['text'].strip(), "start": start, "end": end}
+            if options.get("word_timestamps"):
+                entry["words"] = words_from_whisper(segment, offset)
+            segments.append(entry)
+    return segments
+
+
+def model_size_mb(model_name: str) -> float:
+    """Approximate weights of a Whisper size; unknown names are assumed to be large"""
+    base = model_name.split("-")[0].replace(".en", "")
+    return WHISPER_MODEL_SIZES_MB.get(base, WHISPER_MODEL_SIZES_MB["large"])
+
+
+def transcribe_workers(model_name: str) -> int:
+    """Pool size for a model: TRANSCRIBE_WORKERS if set, else as many copies as the budget holds"""
+    if TRANSCRIBE_WORKERS > 0:
+        return TRANSCRIBE_WORKERS
+    # Imported lazily, like in _transcribe_chunk, so importing this module doesn't load Whisper
+    from app.services.model_registry import WHISPER_MEMORY_BUDGET_MB
+    fits = int(WHISPER_MEMORY_BUDGET_MB // model_size_mb(model_name))
+    return max(1, min(os.cpu_count() or 1, fits))
+
+
+@contextmanager
+def _leased_pool(model_name: str) -> Iterator[Tuple[ProcessPoolExecutor, int]]:
+    """Borrow the pool for one model, as (pool, worker count)
+
+    The pool only ever runs one model size, so its workers together stay within
+    the memory budget. A request for another size waits until the current pool's
+    users are done, then replaces it.
+    """
+    global _pool, _pool_model, _pool_workers, _pool_users
+    with _pool_changed:
+        while _pool is not None and _pool_model != model_name and _pool_users:
+            _pool_changed.wait()
+        if _pool is None or _pool_model != model_name:
+            if _pool is not None:
+                _pool.shutdown()
+            from app.services.model_registry import WHISPER_MEMORY_BUDGET_MB
+            _pool_workers = transcribe_workers(model_name)
+            _pool_model = model_name
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_workers,
+                mp_context=get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(max(1, (os.cpu_count() or 1) // _pool_workers), WHISPER_MEMORY_BUDGET_MB / _pool_workers)
+            )
+            print(f"🧵 Transcription pool: {_pool_workers} workers for Whisper '{model_name}'")
+        _pool_users += 1
+        pool, workers = _pool, _pool_workers
+    try:
+        yield pool, workers
+    finally:
+        with _pool_changed:
+            _pool_users -= 1
+            _pool_changed.notify_all()
+
+
+def stitch_segments(chunks: List[List[dict]]) -> List[dict]:
+    """Merge per-chunk segments, dropping duplicates transcribed in both overlaps"""
+    stitched: List[dict] = []
+    for segment in sorted((s for chunk in chunks for s in chunk), key=lambda s: s['start']):
+        if stitched:
+            previous = stitched[-1]
+            overlap = min(previous['end'], segment['end']) - max(previous['start'], segment['start'])
+            if overlap > 0 and segment['text'] == previous['text']:
+                previous['end'] = max(previous['end'], segment['end'])
+                continue
+            # Keep cues from running into each other at the seam
+            if segment['start'] < previous['end']:
+                previous['end'] = segment['start']
+                if previous.get('words'):
+                    previous['words'] = [word for word in previous['words'] if word['start'] < segment['start']]
+        stitched.append(segment)
+    return stitched
+
+
+def stitch_stream(chunks: Iterable[List[dict]]) -> Iterator[List[dict]]:
+    """Stitch chunk results as they arrive, holding back each chunk's last segment
+
+    The held segment may still be trimmed or merged by the next chunk's first one.
+    """
+    pending: List[dict] = []
+    for chunk in chunks:
+        stitched = stitch_segments([pending, chunk])
+        pending = stitched[-1:]
+        if stitched[:-1]:
+            yield stitched[:-1]
+    if pending:
+        yield pending
+
+
+def iter_long_form(blocks: Iterable[np.ndarray], model_name: str, options: dict) -> Iterator[List[dict]]:
+    """Split streamed audio at silences and transcribe the chunks across a process pool
+
+    Each chunk's segments are yielded in order as soon as that chunk is done.
+    """
+    with _leased_pool(model_name) as (pool, workers):
+        # Cap chunks in flight so decoded audio waiting for a worker stays bounded
+        max_in_flight = workers * 2
+        pending = []
+
+        def completed():
+            for padded_start, core_start, core_end, audio in iter_chunks(blocks):
+                pending.append(pool.submit(_transcribe_chunk, audio, padded_start, core_start, core_end,
+                                           model_name, options))
+                if len(pending) >= max_in_flight:
+                    yield pending.pop(0).result()
+                # Hand back finished chunks right away instead of waiting for the cap
+                while pending and pending[0].done():
+                    yield pending.pop(0).result()
+            while pending:
+                yield pending.pop(0).result()
+
+        yield from stitch_stream(completed())
+
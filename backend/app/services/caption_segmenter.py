@@ -0,0 +1,113 @@
+from typing import Iterable, List, Optional
+from app.models.subtitle import CaptionLayout
+
+# A word ending in one of these closes a sentence; captions prefer to end there
+SENTENCE_END = (".", "?", "!", "…")
+
+
+def words_from_whisper(segment: dict, offset: float = 0.0) -> List[dict]:
+    """Normalise a Whisper segment's word list to text/start/end dicts in stream time"""
+    words = []
+    for word in segment.get('words') or []:
+        text = word['word'].strip()
+        if text:
+            words.append({"text": text, "start": word['start'] + offset, "end": word['end'] + offset})
+    return words
+
+
+def _wrap(words: List[str], width: int, max_lines: int) -> Optional[List[List[str]]]:
+    """Greedily fill lines of at most width characters; None if more than max_lines are needed"""
+    lines: List[List[str]] = []
+    length = 0
+    for word in words:
+        if lines and length + 1 + len(word) <= width:
+            lines[-1].append(word)
+            length += 1 + len(word)
+        else:
+            if len(lines) == max_lines:
+                return None
+            lines.append([word])
+            length = len(word)
+    return lines
+
+
+def _balanced_text(words: List[str], layout: CaptionLayout) -> str:
+    """Join a caption's words into lines of similar length instead of a long line and a stub"""
+    lines = _wrap(words, layout.max_chars_per_line, layout.max_lines) or [words]
+    if len(lines) > 1:
+        total = sum(len(word) for word in words) + len(words) - 1
+        target = max(-(-total // len(lines)), max(len(word) for word in words))
+        balanced = _wrap(words, target, len(lines))
+        if balanced is not None:
+            lines = balanced
+    return "\n".join(" ".join(line) for line in lines)
+
+
+def resegment_words(words: Iterable[dict], layout: CaptionLayout, end_limit: Optional[float] = None) -> List[dict]:
+    """Cut a word-timed transcript into captions that fit the layout
+
+    One pass over the words: a caption closes when the next word would not fit in
+    max_lines lines, would push it past max_duration, follows a long pause, or when
+    the caption already ends a sentence and has been up for min_duration. A second
+    pass stretches captions too short to read at max_chars_per_second into the gap
+    before the next one (or up to end_limit for the last).
+    """
+    width = layout.max_chars_per_line
+    captions: List[dict] = []
+    current: List[dict] = []
+    line_count = 0
+    line_length = 0
+
+    def close():
+        captions.append({
+            "text": _balanced_text([word['text'] for word in current], layout),
+            "start": current[0]['start'],
+            "end": current[-1]['end'],
+            "words": list(current)
+        })
+        current.clear()
+
+    for word in words:
+        size = len(word['text'])
+        if current:
+            previous = current[-1]
+            fits_line = line_length + 1 + size <= width
+            if (
+                (not fits_line and line_count == layout.max_lines)
+                or word['end'] - current[0]['start'] > layout.max_duration
+                or word['start'] - previous['end'] > layout.max_pause
+                or (previous['text'].endswith(SENTENCE_END)
+                    and previous['end'] - current[0]['start'] >= layout.min_duration)
+            ):
+                close()
+            elif fits_line:
+                current.append(word)
+                line_length += 1 + size
+                continue
+            else:
+                current.append(word)
+                line_count += 1
+                line_length = size
+                continue
+        current.append(word)
+        line_count = 1
+        line_length = size
+
+    if current:
+        close()
+
+    # Reading speed: give dense captions more time, without running into the next one
+    for index, caption in enumerate(captions):
+        stretch_caption(caption, layout, captions[index + 1]['start'] if index + 1 < len(captions) else end_limit)
+
+    return captions
+
+
+def stretch_caption(caption: dict, layout: CaptionLayout, limit: Optional[float] = None) -> None:
+    """Lengthen a caption too short to read at max_chars_per_second, but not past limit"""
+    needed = max(layout.min_duration, len(caption['text']) / layout.max_chars_per_second)
+    if caption['end'] - caption['start'] >= needed:
+        return
+    if limit is None:
+        limit = caption['start'] + needed
+    caption['end'] = max(caption['end'], min(caption['start'] + needed, limit))
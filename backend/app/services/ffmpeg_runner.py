@@ -0,0 +1,169 @@
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+import ffmpeg
+from ffmpeg.nodes import OutputNode
+
+from app.models.job import EncodeProgress
+from app.services.job_queue import JobCancelled, JobTimedOut, current_job, job_queue
+from app.services.telemetry import metrics, span
+
+# Bytes of ffmpeg's log kept for error messages; the rest is discarded as it arrives
+STDERR_TAIL_BYTES = 64 * 1024
+
+# How often the watchdog checks for cancellation and deadlines
+WATCHDOG_INTERVAL_SECONDS = 0.2
+
+FFMPEG_SECONDS = metrics.histogram(
+    "video_editor_ffmpeg_seconds", "Wall time of ffmpeg subprocesses", ("operation", "outcome")
+)
+FFMPEG_ENCODE_FPS = metrics.gauge(
+    "video_editor_ffmpeg_encode_fps", "Frames encoded per wall second in the last ffmpeg run", ("operation",)
+)
+FFMPEG_SPEED = metrics.gauge(
+    "video_editor_ffmpeg_speed", "Media seconds processed per wall second in the last ffmpeg run", ("operation",)
+)
+
+SPEED_RE = re.compile(r"([\d.]+)x")
+
+
+def output_paths(stream) -> List[str]:
+    """Files an ffmpeg-python stream spec writes, found by walking back to its output nodes"""
+    paths = []
+    nodes = [stream.node]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, OutputNode):
+            filename = node.kwargs.get("filename")
+            if filename and not filename.startswith("pipe:"):
+                paths.append(filename)
+            continue
+        nodes.extend(edge.upstream_node for edge in node.incoming_edges)
+    return paths
+
+
+def parse_progress(block: Dict[str, str]) -> Tuple[float, Optional[int], Optional[float]]:
+    """(output seconds, frame, speed) from one block of -progress key=value lines"""
+    out_time = 0.0
+    # out_time_ms is also microseconds, despite its name
+    raw = block.get("out_time_us") or block.get("out_time_ms")
+    if raw and raw.lstrip("-").isdigit():
+        out_time = max(0.0, int(raw) / 1_000_000)
+    frame = int(block["frame"]) if block.get("frame", "").isdigit() else None
+    speed_match = SPEED_RE.match(block.get("speed", "").strip())
+    speed = float(speed_match.group(1)) if speed_match else None
+    return out_time, frame, speed
+
+
+def _drain(pipe, tail: deque) -> None:
+    """Read a pipe to EOF keeping only the last STDERR_TAIL_BYTES, so ffmpeg never blocks on it"""
+    size = 0
+    for chunk in iter(lambda: pipe.read(4096), b""):
+        tail.append(chunk)
+        size += len(chunk)
+        while size > STDERR_TAIL_BYTES and len(tail) > 1:
+            size -= len(tail.popleft())
+
+
+def run_ffmpeg(
+    stream,
+    operation: str,
+    duration: Optional[float] = None,
+    on_progress: Optional[Callable[[float], None]] = None
+) -> bytes:
+    """Run an ffmpeg-python stream spec with live progress, cancellation and timeouts
+
+    ffmpeg writes -progress blocks to stdout; each one updates the running job's
+    encode stats and, given the expected output duration, calls on_progress with the
+    fraction done. If the job is cancelled or passes its deadline, ffmpeg is killed
+    and its partial outputs are removed. Returns the tail of ffmpeg's log and raises
+    ffmpeg.Error on failure, like stream.run(capture_stderr=True).
+    """
+    job = current_job()
+    cancel = job_queue.cancel_event(job) if job is not None else None
+    deadline = job_queue.deadline(job) if job is not None else None
+    args = stream.global_args("-progress", "pipe:1", "-nostats").compile()
+
+    with span("ffmpeg", operation=operation) as attributes:
+        started = time.perf_counter()
+        process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        tail: deque = deque()
+        drainer = threading.Thread(target=_drain, args=(process.stderr, tail), daemon=True)
+        drainer.start()
+
+        stopped: List[BaseException] = []
+        finished = threading.Event()
+
+        def watchdog():
+            while not finished.wait(WATCHDOG_INTERVAL_SECONDS):
+                if cancel is not None and cancel.is_set():
+                    stopped.append(JobCancelled())
+                elif deadline is not None and time.time() > deadline:
+                    stopped.append(JobTimedOut(f"Timed out after {job.timeout_seconds:g}s during {operation}"))
+                else:
+                    continue
+                process.kill()
+                return
+
+        if cancel is not None or deadline is not None:
+            threading.Thread(target=watchdog, daemon=True).start()
+
+        frame, speed = None, None
+        outcome = "error"
+        try:
+            block: Dict[str, str] = {}
+            for line in process.stdout:
+                key, _, value = line.decode(errors="replace").strip().partition("=")
+                if key != "progress":
+                    block[key] = value
+                    continue
+                # "progress=continue" or "progress=end" closes a block
+                out_time, frame, speed = parse_progress(block)
+                block = {}
+                if job is not None:
+                    fps = frame / (time.perf_counter() - started) if frame else None
+                    job_queue.report_encode(job, EncodeProgress(
+                        operation=operation, out_time=out_time, duration=duration, frame=frame,
+                        fps=round(fps, 1) if fps else None, speed=speed
+                    ))
+                if on_progress is not None and duration:
+                    on_progress(min(1.0, out_time / duration))
+
+            returncode = process.wait()
+            finished.set()
+            drainer.join()
+            stderr = b"".join(tail)
+            if stopped:
+                raise stopped[0]
+            if returncode != 0:
+                raise ffmpeg.Error("ffmpeg", None, stderr)
+            outcome = "ok"
+        except BaseException:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            # A killed or failed run leaves truncated files that must never be served
+            for path in output_paths(stream):
+                if os.path.isfile(path):
+                    os.remove(path)
+            raise
+        finally:
+            finished.set()
+            elapsed = time.perf_counter() - started
+            FFMPEG_SECONDS.observe(elapsed, operation=operation, outcome=outcome)
+            if job is not None:
+                job_queue.report_encode(job, None)
+
+        if frame and elapsed > 0:
+            attributes["frames"] = frame
+            attributes["fps"] = round(frame / elapsed, 1)
+            FFMPEG_ENCODE_FPS.set(attributes["fps"], operation=operation)
+        if speed is not None:
+            attributes["speed"] = speed
+            FFMPEG_SPEED.set(speed, operation=operation)
+        return stderr
@@ -0,0 +1,95 @@
+import os
+import shutil
+import threading
+import uuid
+
+import ffmpeg
+
+from app.services.ffmpeg_runner import run_ffmpeg
+
+HLS_DIR = os.path.join("outputs", "hls")
+
+# Short segments let playback start after the first few seconds have been fetched
+HLS_SEGMENT_SECONDS = float(os.getenv("HLS_SEGMENT_SECONDS", "4"))
+
+HLS_PLAYLIST = "index.m3u8"
+
+_package_locks = {}
+_package_locks_guard = threading.Lock()
+
+
+def hls_dir(video_id: str) -> str:
+    return os.path.join(HLS_DIR, video_id)
+
+
+def _package(source_path: str, target_dir: str, copy: bool) -> None:
+    output_args = {
+        "f": "hls",
+        "hls_time": HLS_SEGMENT_SECONDS,
+        "hls_playlist_type": "vod",
+        "hls_segment_filename": os.path.join(target_dir, "segment_%05d.ts"),
+    }
+    if copy:
+        output_args["c"] = "copy"
+    else:
+        # Sources that MPEG-TS can't carry as-is (VP9, Opus, ...) get a fast H.264 encode
+        output_args.update(vcodec="libx264", preset="veryfast", pix_fmt="yuv420p", acodec="aac",
+                           force_key_frames=f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})")
+
+    run_ffmpeg(
+        ffmpeg
+        .input(source_path)
+        .output(os.path.join(target_dir, HLS_PLAYLIST), **output_args)
+        .overwrite_output(),
+        "hls_copy" if copy else "hls_encode"
+    )
+
+
+def package_hls(video_id: str, source_path: str) -> str:
+    """Segment the source for HLS once and return the playlist path
+
+    The source never changes, so segments are built once per video; subtitles ride
+    along as the separate WebVTT track rather than being burned in.
+    """
+
+    target = hls_dir(video_id)
+    playlist = os.path.join(target, HLS_PLAYLIST)
+    if os.path.exists(playlist):
+        return playlist
+
+    with _package_locks_guard:
+        lock = _package_locks.setdefault(video_id, threading.Lock())
+
+    with lock:
+        if os.path.exists(playlist):
+            return playlist
+
+        # Build next to the final directory and rename, so a half-written playlist is never served
+        staging = f"{target}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(staging)
+        try:
+            try:
+                _package(source_path, staging, copy=True)
+            except ffmpeg.Error:
+                for name in os.listdir(staging):
+                    os.remove(os.path.join(staging, name))
+                _package(source_path, staging, copy=False)
+            try:
+                os.rename(staging, target)
+            except OSError:
+                # Another worker process finished first
+                pass
+        except ffmpeg.Error as e:
+            print(f"FFmpeg error: {e.stderr.decode()}")
+            raise Exception(f"Failed to package HLS preview: {e.stderr.decode()}")
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    return playlist
+
+
+def clear_hls(video_id: str) -> None:
+    """Remove a video's HLS segments"""
+    shutil.rmtree(hls_dir(video_id), ignore_errors=True)
+    with _package_locks_guard:
+        _package_locks.pop(video_id, None)
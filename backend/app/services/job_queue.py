@@ -0,0 +1,257 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from app.models.job import EncodeProgress, Job, JobStatus
+from app.services.telemetry import SpanContext, current_span, metrics, span
+
+# Encodes and transcriptions are CPU bound, so one worker per core by default
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(os.cpu_count() or 1)))
+
+# How many finished jobs to remember for status polling
+JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", "1000"))
+
+# Running time after which a job is stopped so a stuck encode can't hold a worker (0 disables)
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "3600"))
+
+JOB_WAIT_SECONDS = metrics.histogram(
+    "video_editor_job_wait_seconds", "Time jobs spent queued before a worker picked them up", ("kind",)
+)
+JOB_SECONDS = metrics.histogram(
+    "video_editor_job_seconds", "Time jobs spent running", ("kind", "status")
+)
+
+# The job the current worker thread is running, so ffmpeg runs deep in a render can
+# report progress to it and notice when it is cancelled
+_current_job: contextvars.ContextVar[Optional[Job]] = contextvars.ContextVar("current_job", default=None)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once it has been cancelled"""
+
+
+class JobTimedOut(TimeoutError):
+    """Raised inside a job that ran past its timeout"""
+
+
+class _QueuedJob:
+    def __init__(self, job: Job, fn: Callable, args: tuple, parent: Optional[SpanContext],
+                 on_cancelled: Optional[Callable[[Job], None]]):
+        self.job = job
+        self.fn = fn
+        self.args = args
+        self.parent = parent
+        self.on_cancelled = on_cancelled
+        self.cancel = threading.Event()
+        self.deadline: Optional[float] = None
+
+
+class JobQueue:
+    """Bounded worker pool that runs at most one job per video at a time"""
+
+    def __init__(self, max_workers: int = JOB_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._finished: Deque[str] = deque()
+        self._video_queues: Dict[str, Deque[_QueuedJob]] = {}
+        # Queued and running jobs only
+        self._entries: Dict[str, _QueuedJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, video_id: str, fn: Callable, *args,
+               timeout: Optional[float] = None,
+               on_cancelled: Optional[Callable[[Job], None]] = None) -> Job:
+        """Queue fn(job, *args); jobs for the same video run in submission order
+
+        timeout (default JOB_TIMEOUT_SECONDS) bounds the running time. on_cancelled
+        is called instead of fn if the job is cancelled before it starts, for callers
+        that track the job elsewhere.
+        """
+        timeout = JOB_TIMEOUT_SECONDS if timeout is None else timeout
+        job = Job(job_id=str(uuid.uuid4()), kind=kind, video_id=video_id, timeout_seconds=timeout or None)
+        # The job's spans continue the trace of the request that queued it
+        entry = _QueuedJob(job, fn, args, current_span(), on_cancelled)
+
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._entries[job.job_id] = entry
+            queue = self._video_queues.setdefault(video_id, deque())
+            queue.append(entry)
+            # Only the head of a video's queue is ever handed to the pool
+            if len(queue) == 1:
+                self._executor.submit(self._run_next, video_id)
+
+        return job
+
+    def _run_next(self, video_id: str) -> None:
+        with self._lock:
+            entry = self._video_queues[video_id][0]
+        job = entry.job
+
+        if entry.cancel.is_set():
+            self.update(job, status=JobStatus.CANCELLED, error="Cancelled before it started",
+                        finished_at=time.time())
+            if entry.on_cancelled is not None:
+                entry.on_cancelled(job)
+        else:
+            self._run(entry)
+
+        with self._lock:
+            queue = self._video_queues[video_id]
+            queue.popleft()
+            if queue:
+                self._executor.submit(self._run_next, video_id)
+            else:
+                del self._video_queues[video_id]
+            self._entries.pop(job.job_id, None)
+            self._remember_finished_locked(job)
+
+    def _run(self, entry: _QueuedJob) -> None:
+        job = entry.job
+        self.update(job, status=JobStatus.RUNNING, started_at=time.time())
+        if job.timeout_seconds:
+            entry.deadline = job.started_at + job.timeout_seconds
+        JOB_WAIT_SECONDS.observe(job.started_at - job.created_at, kind=job.kind)
+        token = _current_job.set(job)
+        try:
+            with span("job", parent=entry.parent, kind=job.kind, job_id=job.job_id, video_id=job.video_id):
+                result = entry.fn(job, *entry.args)
+            self.update(job, status=JobStatus.COMPLETED, progress=1.0, result=result,
+                        finished_at=time.time())
+        except JobCancelled:
+            print(f"🛑 Job {job.job_id} ({job.kind}) cancelled")
+            self.update(job, status=JobStatus.CANCELLED, error="Cancelled", finished_at=time.time())
+        except Exception as e:
+            print(f"❌ Job {job.job_id} ({job.kind}) failed: {str(e)}")
+            if not isinstance(e, JobTimedOut):
+                traceback.print_exc()
+            self.update(job, status=JobStatus.FAILED, error=str(e), finished_at=time.time())
+        finally:
+            # Worker threads are reused, so the job must not leak into the next one
+            _current_job.reset(token)
+        JOB_SECONDS.observe(job.finished_at - job.started_at, kind=job.kind, status=job.status.value)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Ask a queued or running job to stop; returns None for unknown or finished jobs
+
+        A queued job is dropped when its turn comes. A running one stops at its next
+        checkpoint: ffmpeg is killed right away, Whisper between audio blocks.
+        """
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return None
+            entry.cancel.set()
+            queue = self._video_queues[entry.job.video_id]
+            # Not yet handed to the pool: drop it now rather than when its turn comes
+            dropped = queue[0] is not entry
+            if dropped:
+                queue.remove(entry)
+                del self._entries[job_id]
+
+        if not dropped:
+            self.update(entry.job, stage="cancelling")
+            return entry.job
+
+        self.update(entry.job, status=JobStatus.CANCELLED, error="Cancelled before it started",
+                    finished_at=time.time())
+        if entry.on_cancelled is not None:
+            entry.on_cancelled(entry.job)
+        with self._lock:
+            self._remember_finished_locked(entry.job)
+        return entry.job
+
+    def cancel_event(self, job: Job) -> Optional[threading.Event]:
+        with self._lock:
+            entry = self._entries.get(job.job_id)
+        return entry.cancel if entry is not None else None
+
+    def deadline(self, job: Job) -> Optional[float]:
+        with self._lock:
+            entry = self._entries.get(job.job_id)
+        return entry.deadline if entry is not None else None
+
+    def raise_if_stopped(self, job: Job) -> None:
+        """Checkpoint for long work: raises if the job was cancelled or ran out of time"""
+        cancel = self.cancel_event(job)
+        if cancel is not None and cancel.is_set():
+            raise JobCancelled()
+        deadline = self.deadline(job)
+        if deadline is not None and time.time() > deadline:
+            raise JobTimedOut(f"Timed out after {job.timeout_seconds:g}s")
+
+    def _remember_finished_locked(self, job: Job) -> None:
+        self._finished.append(job.job_id)
+        while len(self._finished) > JOB_HISTORY_LIMIT:
+            self._jobs.pop(self._finished.popleft(), None)
+
+    def update(self, job: Job, **changes) -> None:
+        """Apply changes to a job and bump its version for subscribers"""
+        with self._lock:
+            for field, value in changes.items():
+                setattr(job, field, value)
+            job.version += 1
+
+    def report_progress(self, job: Job, progress: float, stage: Optional[str] = None) -> None:
+        self.update(job, progress=max(0.0, min(progress, 1.0)), stage=stage or job.stage)
+
+    def report_encode(self, job: Job, encode: Optional[EncodeProgress]) -> None:
+        """Publish the live stats of the ffmpeg run the job is waiting on"""
+        self.update(job, encode=encode)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def snapshot(self, job: Job) -> Job:
+        """Consistent copy of a job for serialization outside the worker"""
+        with self._lock:
+            return job.model_copy(deep=True)
+
+    async def wait(self, job: Job, poll_interval: float = 0.1,
+                   abandoned: Optional[Callable[[], Awaitable[bool]]] = None) -> Job:
+        """Wait from the event loop until a job finishes, without blocking it
+
+        If abandoned() turns true (e.g. the client disconnected), the job is cancelled.
+        Polling starts at 10ms and backs off to poll_interval, so jobs that finish
+        almost at once (cache hits) aren't held for a whole interval.
+        """
+        cancelled = False
+        delay = min(0.01, poll_interval)
+        while not job.is_finished:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, poll_interval)
+            if abandoned is not None and not cancelled and await abandoned():
+                print(f"🛑 Client gone; cancelling job {job.job_id}")
+                self.cancel(job.job_id)
+                cancelled = True
+        return self.snapshot(job)
+
+    def depth(self) -> int:
+        """Number of queued or running jobs"""
+        with self._lock:
+            return sum(len(queue) for queue in self._video_queues.values())
+
+
+def current_job() -> Optional[Job]:
+    """The job this worker thread is running, if any"""
+    return _current_job.get()
+
+
+def raise_if_stopped() -> None:
+    """Checkpoint for code that doesn't know which job it runs in"""
+    job = _current_job.get()
+    if job is not None:
+        job_queue.raise_if_stopped(job)
+
+
+# Shared queue for the whole worker process
+job_queue = JobQueue()
@@ -0,0 +1,163 @@
+import json
+import os
+import subprocess
+import threading
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple
+from app.models.video import MediaProfile, MediaStream, VideoSession
+from app.services.session_store import session_store
+from app.services.telemetry import span
+
+_profile_cache: Dict[Tuple[str, float, int], MediaProfile] = {}
+_keyframe_cache: Dict[Tuple[str, float, int], List[float]] = {}
+_profile_lock = threading.Lock()
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fps(rate: Optional[str]) -> Optional[float]:
+    """ffprobe frame rates are fractions like "30000/1001"; "0/0" means unknown"""
+    try:
+        value = Fraction(rate)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return round(float(value), 3) if value > 0 else None
+
+
+def _rotation(stream: dict) -> int:
+    rotate = _int(stream.get("tags", {}).get("rotate"))
+    if rotate is None:
+        for side_data in stream.get("side_data_list", []):
+            rotate = _int(side_data.get("rotation"))
+            if rotate is not None:
+                break
+    return abs(rotate or 0) % 180
+
+
+def _run_ffprobe(args: List[str], video_path: str) -> dict:
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-of", "json", *args, video_path],
+        capture_output=True,
+        check=True
+    )
+    return json.loads(result.stdout)
+
+
+def _stat_key(video_path: str) -> Tuple[str, float, int]:
+    stat = os.stat(video_path)
+    return os.path.abspath(video_path), stat.st_mtime, stat.st_size
+
+
+def probe_media(video_path: str) -> MediaProfile:
+    """Read container and stream metadata in one ffprobe call (no decoding, no packet scan)"""
+    cache_key = _stat_key(video_path)
+    with _profile_lock:
+        if cache_key in _profile_cache:
+            return _profile_cache[cache_key].model_copy(deep=True)
+
+    with span("probe"):
+        probe = _run_ffprobe(["-show_format", "-show_streams"], video_path)
+    fmt = probe.get("format", {})
+    streams = probe.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"
+                  and not s.get("disposition", {}).get("attached_pic")), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    profile = MediaProfile(
+        duration=_float(fmt.get("duration")),
+        format_name=fmt.get("format_name"),
+        bit_rate=_int(fmt.get("bit_rate")),
+        streams=[
+            MediaStream(index=s["index"], codec_type=s.get("codec_type", "unknown"), codec_name=s.get("codec_name"))
+            for s in streams
+        ]
+    )
+
+    if video is not None:
+        width, height = _int(video.get("width")), _int(video.get("height"))
+        if _rotation(video) == 90:
+            # Phone footage is often stored landscape with a rotate flag; libass sees the rotated frame
+            width, height = height, width
+        profile.video_codec = video.get("codec_name")
+        profile.width, profile.height = width, height
+        profile.fps = _fps(video.get("avg_frame_rate")) or _fps(video.get("r_frame_rate"))
+        profile.pix_fmt = video.get("pix_fmt")
+        profile.video_bit_rate = _int(video.get("bit_rate"))
+
+    if audio is not None:
+        profile.audio_codec = audio.get("codec_name")
+        profile.audio_channels = _int(audio.get("channels"))
+        profile.audio_channel_layout = audio.get("channel_layout")
+        profile.audio_sample_rate = _int(audio.get("sample_rate"))
+        profile.audio_bit_rate = _int(audio.get("bit_rate"))
+
+    with _profile_lock:
+        _profile_cache[cache_key] = profile
+    return profile.model_copy(deep=True)
+
+
+def index_keyframes(video_path: str) -> List[float]:
+    """Presentation times of the first video stream's keyframes, from packet flags alone"""
+    cache_key = _stat_key(video_path)
+    with _profile_lock:
+        if cache_key in _keyframe_cache:
+            return list(_keyframe_cache[cache_key])
+
+    # Reading packet flags avoids decoding any frames
+    probe = _run_ffprobe(
+        ["-select_streams", "v:0", "-show_entries", "packet=pts_time,flags"],
+        video_path
+    )
+    keyframes = sorted(
+        float(packet["pts_time"])
+        for packet in probe.get("packets", [])
+        if "K" in packet.get("flags", "") and packet.get("pts_time") not in (None, "N/A")
+    )
+
+    with _profile_lock:
+        _keyframe_cache[cache_key] = keyframes
+    return list(keyframes)
+
+
+def ensure_media_profile(session: VideoSession, keyframes: bool = False) -> Optional[MediaProfile]:
+    """The session's media profile, probing (and saving it on the session) only if it's missing
+
+    Keyframes need a full packet scan, so they're indexed on first use rather than at upload.
+    """
+    profile = session.media
+    changed = False
+    try:
+        if profile is None:
+            profile = probe_media(session.source_path)
+            changed = True
+        if keyframes and profile.keyframes is None and profile.has_video:
+            profile.keyframes = index_keyframes(session.source_path)
+            changed = True
+    except (OSError, subprocess.CalledProcessError, ValueError) as e:
+        print(f"⚠️ Could not probe {session.source_path}: {e}")
+        return profile
+
+    if changed:
+        session.media = profile
+        if session.duration is None:
+            session.duration = profile.duration
+
+        def store_profile(stored: VideoSession):
+            stored.media = profile
+            if stored.duration is None:
+                stored.duration = profile.duration
+
+        session_store.update(session.video_id, store_profile)
+    return profile
@@ -0,0 +1,141 @@
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import whisper
+
+from app.services.telemetry import span
+
+# Default Whisper size used for auto-generated subtitles
+DEFAULT_WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+
+# Upper bound on the weights kept warm across all loaded sizes (in MB)
+WHISPER_MEMORY_BUDGET_MB = float(os.getenv("WHISPER_MEMORY_BUDGET_MB", "4096"))
+
+
+class _ModelEntry:
+    """A loaded Whisper model plus the bookkeeping needed to share it"""
+
+    def __init__(self, name: str, model, size_bytes: int):
+        self.name = name
+        self.model = model
+        self.size_bytes = size_bytes
+        self.in_use = 0
+        self.last_used = time.time()
+        # Whisper installs KV-cache hooks on the model while decoding, so two
+        # transcriptions on the same instance must not interleave.
+        self.inference_lock = threading.Lock()
+
+
+def _model_size_bytes(model) -> int:
+    """Memory held by the model's parameters and buffers"""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class WhisperModelRegistry:
+    """Process-wide pool that loads each Whisper size once and keeps it warm"""
+
+    def __init__(self, memory_budget_mb: float = WHISPER_MEMORY_BUDGET_MB):
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self._entries: "OrderedDict[str, _ModelEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def _load(self, name: str) -> _ModelEntry:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+                return entry
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Only one thread loads a given size; the others wait and reuse it
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    self._entries.move_to_end(name)
+                    return entry
+
+            print(f"🧠 Loading Whisper model '{name}'...")
+            started = time.time()
+            with span("model_load", model=name):
+                model = whisper.load_model(name)
+            entry = _ModelEntry(name, model, _model_size_bytes(model))
+            print(f"✅ Whisper model '{name}' loaded in {time.time() - started:.1f}s "
+                  f"({entry.size_bytes / (1024 * 1024):.0f} MB)")
+
+            with self._lock:
+                self._entries[name] = entry
+                self._evict_locked(keep=name)
+            return entry
+
+    def _evict_locked(self, keep: Optional[str] = None) -> None:
+        """Drop least recently used idle models until we fit the budget"""
+        evicted = False
+        for name in list(self._entries.keys()):
+            if self._total_bytes_locked() <= self.memory_budget_bytes:
+                break
+            entry = self._entries[name]
+            if name == keep or entry.in_use > 0:
+                continue
+            del self._entries[name]
+            evicted = True
+            print(f"🗑️ Evicted idle Whisper model '{name}'")
+
+        if evicted:
+            gc.collect()
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except ImportError:
+                pass
+
+    def _total_bytes_locked(self) -> int:
+        return sum(entry.size_bytes for entry in self._entries.values())
+
+    @contextmanager
+    def acquire(self, name: str = DEFAULT_WHISPER_MODEL) -> Iterator:
+        """Borrow a warm model for one transcription"""
+        entry = self._load(name)
+        with self._lock:
+            entry.in_use += 1
+        try:
+            with entry.inference_lock:
+                yield entry.model
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.time()
+                self._evict_locked()
+
+    def preload(self, names: List[str]) -> None:
+        """Load the given sizes ahead of the first request"""
+        for name in names:
+            self._load(name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "loaded_bytes": self._total_bytes_locked(),
+                "models": [
+                    {
+                        "name": entry.name,
+                        "size_bytes": entry.size_bytes,
+                        "in_use": entry.in_use,
+                        "last_used": entry.last_used,
+                    }
+                    for entry in self._entries.values()
+                ],
+            }
+
+
+# Shared registry for the whole worker process
+model_registry = WhisperModelRegistry()
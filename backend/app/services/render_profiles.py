@@ -0,0 +1,36 @@
+import os
+from typing import Dict
+from app.models.render import RenderProfile
+
+
+def _threads(name: str, default: int) -> int:
+    return int(os.getenv(f"RENDER_{name.upper()}_THREADS", str(default)))
+
+
+# Defaults favour throughput on CPU-only hosts: drafts and previews are small, fast
+# encodes with few threads each so several can run side by side on the job pool;
+# final renders use x264's "faster" preset, which keeps most of medium's quality
+# at roughly twice the speed.
+RENDER_PROFILES: Dict[str, RenderProfile] = {
+    "draft": RenderProfile(
+        name="draft", preset="ultrafast", crf=32, threads=_threads("draft", 2),
+        tune="fastdecode", max_height=480
+    ),
+    "preview": RenderProfile(
+        name="preview", preset="veryfast", crf=27, threads=_threads("preview", 4),
+        max_height=720
+    ),
+    "final": RenderProfile(
+        name="final", preset=os.getenv("RENDER_FINAL_PRESET", "faster"),
+        crf=int(os.getenv("RENDER_FINAL_CRF", "21")), threads=_threads("final", 0)
+    ),
+}
+
+DEFAULT_RENDER_PROFILE = os.getenv("DEFAULT_RENDER_PROFILE", "final")
+
+
+def get_render_profile(name: str = DEFAULT_RENDER_PROFILE) -> RenderProfile:
+    """Look up a profile by name; raises ValueError for unknown names"""
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile '{name}', expected one of: {', '.join(RENDER_PROFILES)}")
+    return RENDER_PROFILES[name]
@@ -0,0 +1,51 @@
+import os
+import threading
+from typing import Callable, Dict
+
+# Profile rendered automatically once a video's edits settle; empty turns auto-render off
+AUTO_RENDER_PROFILE = os.getenv("AUTO_RENDER_PROFILE", "draft")
+
+# How long edits must stop arriving before that render starts
+AUTO_RENDER_DEBOUNCE_SECONDS = float(os.getenv("AUTO_RENDER_DEBOUNCE_SECONDS", "3"))
+
+
+class RenderDebouncer:
+    """Coalesces a burst of edits to one video into a single render after a quiet period"""
+
+    def __init__(self, delay: float, submit: Callable[[str], None]):
+        self.delay = delay
+        self.submit = submit
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, video_id: str) -> None:
+        """(Re)start the video's quiet-period timer"""
+        timer = threading.Timer(self.delay, self._fire, args=(video_id,))
+        timer.daemon = True
+        with self._lock:
+            previous = self._timers.get(video_id)
+            if previous is not None:
+                previous.cancel()
+            self._timers[video_id] = timer
+        timer.start()
+
+    def cancel(self, video_id: str) -> None:
+        with self._lock:
+            timer = self._timers.pop(video_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._timers)
+
+    def _fire(self, video_id: str) -> None:
+        with self._lock:
+            # A newer edit replaced this timer after it had already fired
+            if self._timers.get(video_id) is not threading.current_thread():
+                return
+            del self._timers[video_id]
+        try:
+            self.submit(video_id)
+        except Exception as e:
+            print(f"❌ Auto-render of {video_id} failed to start: {str(e)}")
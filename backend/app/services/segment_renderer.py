@@ -0,0 +1,182 @@
+import ffmpeg
+import hashlib
+import json
+import os
+import shutil
+from typing import Callable, List, Optional, Tuple
+from app.models.render import RenderProfile
+from app.models.subtitle import SubtitleResponse
+from app.models.video import MediaProfile
+from app.services.ffmpeg_runner import run_ffmpeg
+from app.services.render_profiles import get_render_profile
+from app.services.subtitle_generator import write_ass_file
+from app.services.timeline import SubtitleTimeline, build_timeline
+from app.services.video_processor import audio_encoder_args, video_encoder_args
+
+# Segments are cut at the first keyframe after this many seconds
+SEGMENT_TARGET_SECONDS = float(os.getenv("SEGMENT_TARGET_SECONDS", "10"))
+
+SEGMENT_CACHE_DIR = os.path.join("outputs", "segments")
+
+def plan_segments(keyframes: List[float], duration: float,
+                  target_seconds: float = SEGMENT_TARGET_SECONDS) -> List[Tuple[float, float]]:
+    """Group keyframes into GOP-aligned (start, end) segments of roughly target_seconds"""
+    segments = []
+    start = 0.0
+    for keyframe in keyframes:
+        if keyframe - start >= target_seconds and keyframe < duration:
+            segments.append((start, keyframe))
+            start = keyframe
+    segments.append((start, duration))
+    return segments
+
+
+def _segment_key(source_path: str, start: float, end: float, events: SubtitleTimeline,
+                 encoder_args: dict, filters: List[str]) -> str:
+    """Content key for one encoded segment: source, span, overlapping events and settings"""
+    stat = os.stat(source_path)
+    payload = {
+        "source": [os.path.abspath(source_path), stat.st_mtime, stat.st_size],
+        "span": [round(start, 6), round(end, 6)],
+        "events": [
+            events.starts.round(6).tolist(),
+            events.ends.round(6).tolist(),
+            events.texts,
+            [events.styles[style_id] for style_id in events.style_ids.tolist()],
+            events.words,
+        ],
+        "encoder": [encoder_args, filters],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def _render_segment(source_path: str, start: float, end: float, events: SubtitleTimeline,
+                    segment_path: str, media: MediaProfile, encoder_args: dict, filters: List[str],
+                    on_progress: Optional[Callable[[float], None]] = None) -> None:
+    """Encode one segment of video (no audio), burning only the events that overlap it"""
+    # Shift events so the segment starts at 0, since input seeking resets timestamps
+    shifted = events.shift(-start)
+
+    output_args = dict(encoder_args)
+    output_args["an"] = None
+    output_args["t"] = end - start
+
+    ass_file_path = segment_path.replace('.mp4', '.ass')
+    video_filters = list(filters)
+    if len(shifted):
+        write_ass_file(shifted, ass_file_path, media)
+        video_filters.append(f"ass={ass_file_path}")
+    if video_filters:
+        output_args["vf"] = ",".join(video_filters)
+
+    try:
+        run_ffmpeg(
+            ffmpeg
+            .input(source_path, ss=start)
+            .output(segment_path, **output_args)
+            .overwrite_output(),
+            "render_segment",
+            duration=end - start,
+            on_progress=on_progress
+        )
+    except ffmpeg.Error as e:
+        if os.path.exists(segment_path):
+            os.remove(segment_path)
+        print(f"FFmpeg error: {e.stderr.decode()}")
+        raise Exception(f"Failed to render segment {start:.2f}-{end:.2f}s: {e.stderr.decode()}")
+    finally:
+        if os.path.exists(ass_file_path):
+            os.remove(ass_file_path)
+
+
+def _scaled(on_progress: Callable[[float], None], offset: float, length: float,
+            total: float) -> Callable[[float], None]:
+    """Map one segment's 0-1 progress onto the whole render's"""
+    return lambda fraction: on_progress((offset + fraction * length) / total)
+
+
+def render_incremental(
+    video_id: str,
+    source_path: str,
+    subtitles: list[SubtitleResponse],
+    output_video_path: str,
+    media: MediaProfile,
+    profile: Optional[RenderProfile] = None,
+    on_progress: Optional[Callable[[float], None]] = None
+) -> str:
+    """Burn subtitles by re-encoding only the segments whose overlapping events changed
+
+    media must carry the duration and keyframe index from the upload's probe.
+    on_progress gets the fraction of the re-encoded seconds done so far.
+    """
+
+    profile = profile or get_render_profile()
+    segments = plan_segments(media.keyframes or [], media.duration)
+    encoder_args, filters = video_encoder_args(media, profile)
+    timeline = build_timeline(subtitles)
+
+    # Each profile keeps its own segments, so a draft doesn't evict the final render's
+    cache_dir = os.path.join(SEGMENT_CACHE_DIR, video_id, profile.name)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    segment_paths = []
+    stale = []
+    for start, end in segments:
+        events = timeline.overlapping(start, end)
+        key = _segment_key(source_path, start, end, events, encoder_args, filters)
+        segment_path = os.path.join(cache_dir, f"{key}.mp4")
+        if not os.path.exists(segment_path):
+            stale.append((start, end, events, segment_path))
+        segment_paths.append(segment_path)
+
+    # Progress is measured over the seconds that actually need encoding
+    total = sum(end - start for start, end, _, _ in stale)
+    done = 0.0
+    for start, end, events, segment_path in stale:
+        segment_progress = _scaled(on_progress, done, end - start, total) if on_progress and total else None
+        _render_segment(source_path, start, end, events, segment_path, media, encoder_args, filters, segment_progress)
+        done += end - start
+    rendered = len(stale)
+
+    print(f"🧩 Re-encoded {rendered}/{len(segments)} segments")
+
+    # Drop cached segments that no longer belong to the current edit list
+    current = {os.path.basename(path) for path in segment_paths}
+    for name in os.listdir(cache_dir):
+        if name.endswith('.mp4') and name not in current:
+            os.remove(os.path.join(cache_dir, name))
+
+    concat_list_path = os.path.join(cache_dir, "concat.txt")
+    with open(concat_list_path, 'w', encoding='utf-8') as f:
+        for path in segment_paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+
+    # Stitch segments with stream copy and take the audio straight from the source
+    video = ffmpeg.input(concat_list_path, f='concat', safe=0)['v']
+    streams = [video]
+    # moov atom up front so players can start before the whole file has arrived
+    output_args = {"vcodec": "copy", "movflags": "+faststart"}
+    if media.has_audio:
+        streams.append(ffmpeg.input(source_path)['a'])
+        output_args.update(audio_encoder_args(media))
+
+    try:
+        run_ffmpeg(
+            ffmpeg
+            .output(*streams, output_video_path, **output_args)
+            .overwrite_output(),
+            "concat_segments"
+        )
+        return output_video_path
+    except ffmpeg.Error as e:
+        print(f"FFmpeg error: {e.stderr.decode()}")
+        raise Exception(f"Failed to concatenate segments: {e.stderr.decode()}")
+    finally:
+        if os.path.exists(concat_list_path):
+            os.remove(concat_list_path)
+
+
+
+def clear_segment_cache(video_id: str) -> None:
+    """Remove all cached segments for a video"""
+    shutil.rmtree(os.path.join(SEGMENT_CACHE_DIR, video_id), ignore_errors=True)
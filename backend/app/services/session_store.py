@@ -0,0 +1,288 @@
+import os
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import (
+    Column, Float, Index, LargeBinary, MetaData, String, Table, create_engine, delete, event,
+    exists, func, insert, select, update
+)
+
+from app.models.video import VideoSession
+
+# "sqlite:///path.db" (default) or any SQLAlchemy URL; "memory://" keeps sessions in-process
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "sqlite:///sessions.db")
+
+# Sessions untouched for this long are removed together with their media
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(24 * 3600)))
+
+# A read only rewrites last_access once it is this stale, so polling stays a pure read
+LAST_ACCESS_RESOLUTION_SECONDS = 60
+
+
+def _encode(session: VideoSession) -> bytes:
+    # Subtitles are derived from the edit list, so they aren't stored twice
+    return zlib.compress(session.model_dump_json(exclude={"subtitles"}).encode())
+
+
+def _decode(data: bytes) -> VideoSession:
+    return VideoSession.model_validate_json(zlib.decompress(data))
+
+
+class SessionStore(ABC):
+    """Where video sessions live between requests"""
+
+    @abstractmethod
+    def get(self, video_id: str) -> Optional[VideoSession]:
+        """Load a session and mark it as recently used"""
+
+    @abstractmethod
+    def save(self, session: VideoSession) -> None:
+        ...
+
+    @abstractmethod
+    def update(self, video_id: str, mutate: Callable[[VideoSession], None]) -> Optional[VideoSession]:
+        """Atomically load, change and save a session; returns None if it's gone"""
+
+    @abstractmethod
+    def delete(self, video_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def expired(self, ttl_seconds: float) -> List[VideoSession]:
+        """Sessions not accessed within ttl_seconds"""
+
+    @abstractmethod
+    def count_by_source(self, source_path: str) -> int:
+        """How many sessions share an uploaded file"""
+
+    @abstractmethod
+    def find_by_content_hash(self, content_hash: str) -> Optional[VideoSession]:
+        """Any session whose upload has this content, for deduplicating uploads"""
+
+    @abstractmethod
+    def __contains__(self, video_id: str) -> bool:
+        """Whether a session exists, without loading it or touching last_access"""
+
+    @abstractmethod
+    def ping(self) -> None:
+        """Round-trip to the backing store; raises if it can't be reached"""
+
+
+class MemorySessionStore(SessionStore):
+    """Single-process store, handy for development and tests"""
+
+    def __init__(self):
+        self._sessions: Dict[str, bytes] = {}
+        self._last_access: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, video_id: str) -> Optional[VideoSession]:
+        with self._lock:
+            data = self._sessions.get(video_id)
+            if data is None:
+                return None
+            self._last_access[video_id] = time.time()
+        return _decode(data)
+
+    def save(self, session: VideoSession) -> None:
+        with self._lock:
+            self._sessions[session.video_id] = _encode(session)
+            self._last_access[session.video_id] = time.time()
+
+    def update(self, video_id: str, mutate: Callable[[VideoSession], None]) -> Optional[VideoSession]:
+        with self._lock:
+            data = self._sessions.get(video_id)
+            if data is None:
+                return None
+            session = _decode(data)
+            mutate(session)
+            self._sessions[video_id] = _encode(session)
+            self._last_access[video_id] = time.time()
+        return session
+
+    def delete(self, video_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(video_id, None)
+            self._last_access.pop(video_id, None)
+
+    def expired(self, ttl_seconds: float) -> List[VideoSession]:
+        cutoff = time.time() - ttl_seconds
+        with self._lock:
+            stale = [self._sessions[video_id] for video_id, last in self._last_access.items() if last < cutoff]
+        return [_decode(data) for data in stale]
+
+    def __contains__(self, video_id: str) -> bool:
+        with self._lock:
+            return video_id in self._sessions
+
+    def ping(self) -> None:
+        pass
+
+    def count_by_source(self, source_path: str) -> int:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return sum(1 for data in sessions if _decode(data).source_path == source_path)
+
+    def find_by_content_hash(self, content_hash: str) -> Optional[VideoSession]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for data in sessions:
+            session = _decode(data)
+            if session.content_hash == content_hash:
+                return session
+        return None
+
+
+class SQLSessionStore(SessionStore):
+    """Sessions in a SQL database (SQLite by default), shared by every worker on the host"""
+
+    def __init__(self, url: str):
+        self.engine = create_engine(url)
+        self.metadata = MetaData()
+        self.sessions = Table(
+            "video_sessions",
+            self.metadata,
+            Column("video_id", String(64), primary_key=True),
+            Column("source_path", String(1024), nullable=False),
+            Column("content_hash", String(64), nullable=True),
+            Column("data", LargeBinary, nullable=False),
+            Column("created_at", Float, nullable=False),
+            Column("last_access", Float, nullable=False),
+            Index("ix_video_sessions_last_access", "last_access"),
+            Index("ix_video_sessions_source_path", "source_path"),
+            Index("ix_video_sessions_content_hash", "content_hash"),
+        )
+
+        if self.engine.dialect.name == "sqlite":
+            self._configure_sqlite()
+
+        self.metadata.create_all(self.engine)
+
+    def _configure_sqlite(self) -> None:
+        """WAL lets readers run alongside a writer; BEGIN IMMEDIATE makes updates atomic across workers"""
+
+        @event.listens_for(self.engine, "connect")
+        def on_connect(dbapi_connection, _):
+            # Let SQLAlchemy's begin event below decide how transactions start
+            dbapi_connection.isolation_level = None
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.close()
+
+        @event.listens_for(self.engine, "begin")
+        def on_begin(connection):
+            # Reads take no lock up front, so they never queue behind (or block) a writer
+            read_only = connection.get_execution_options().get("read_only")
+            connection.exec_driver_sql("BEGIN" if read_only else "BEGIN IMMEDIATE")
+
+    def _read(self):
+        """A transaction for queries that never write"""
+        return self.engine.connect().execution_options(read_only=True)
+
+    def get(self, video_id: str) -> Optional[VideoSession]:
+        with self._read() as connection:
+            row = connection.execute(
+                select(self.sessions.c.data, self.sessions.c.last_access)
+                .where(self.sessions.c.video_id == video_id)
+            ).first()
+        if row is None:
+            return None
+
+        now = time.time()
+        if now - row.last_access > LAST_ACCESS_RESOLUTION_SECONDS:
+            # The TTL is hours long; minute precision is plenty and spares polls the write lock
+            with self.engine.begin() as connection:
+                connection.execute(
+                    update(self.sessions)
+                    .where(self.sessions.c.video_id == video_id)
+                    .where(self.sessions.c.last_access < now - LAST_ACCESS_RESOLUTION_SECONDS)
+                    .values(last_access=now)
+                )
+        return _decode(row.data)
+
+    def __contains__(self, video_id: str) -> bool:
+        with self._read() as connection:
+            return connection.execute(
+                select(exists().where(self.sessions.c.video_id == video_id))
+            ).scalar()
+
+    def ping(self) -> None:
+        with self._read() as connection:
+            connection.execute(select(1))
+
+    def save(self, session: VideoSession) -> None:
+        now = time.time()
+        with self.engine.begin() as connection:
+            updated = connection.execute(
+                update(self.sessions)
+                .where(self.sessions.c.video_id == session.video_id)
+                .values(source_path=session.source_path, content_hash=session.content_hash,
+                        data=_encode(session), last_access=now)
+            ).rowcount
+            if not updated:
+                connection.execute(
+                    insert(self.sessions).values(
+                        video_id=session.video_id,
+                        source_path=session.source_path,
+                        content_hash=session.content_hash,
+                        data=_encode(session),
+                        created_at=now,
+                        last_access=now
+                    )
+                )
+
+    def update(self, video_id: str, mutate: Callable[[VideoSession], None]) -> Optional[VideoSession]:
+        with self.engine.begin() as connection:
+            data = connection.execute(
+                select(self.sessions.c.data).where(self.sessions.c.video_id == video_id)
+            ).scalar()
+            if data is None:
+                return None
+            session = _decode(data)
+            mutate(session)
+            connection.execute(
+                update(self.sessions)
+                .where(self.sessions.c.video_id == video_id)
+                .values(source_path=session.source_path, content_hash=session.content_hash,
+                        data=_encode(session), last_access=time.time())
+            )
+        return session
+
+    def delete(self, video_id: str) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(delete(self.sessions).where(self.sessions.c.video_id == video_id))
+
+    def expired(self, ttl_seconds: float) -> List[VideoSession]:
+        cutoff = time.time() - ttl_seconds
+        with self._read() as connection:
+            rows = connection.execute(
+                select(self.sessions.c.data).where(self.sessions.c.last_access < cutoff)
+            ).scalars().all()
+        return [_decode(data) for data in rows]
+
+    def count_by_source(self, source_path: str) -> int:
+        with self._read() as connection:
+            return connection.execute(
+                select(func.count()).select_from(self.sessions).where(self.sessions.c.source_path == source_path)
+            ).scalar()
+
+    def find_by_content_hash(self, content_hash: str) -> Optional[VideoSession]:
+        with self._read() as connection:
+            data = connection.execute(
+                select(self.sessions.c.data).where(self.sessions.c.content_hash == content_hash).limit(1)
+            ).scalar()
+        return _decode(data) if data is not None else None
+
+
+def create_session_store(url: str = SESSION_STORE_URL) -> SessionStore:
+    if url.startswith("memory://"):
+        return MemorySessionStore()
+    return SQLSessionStore(url)
+
+
+# Shared store for the whole worker process
+session_store = create_session_store()
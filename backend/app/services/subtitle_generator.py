@@ -1,59 +1,147 @@
-from datetime import timedelta
+import numpy as np
+from typing import List, Optional, Tuple
 from app.models.subtitle import SubtitleResponse
+from app.models.video import MediaProfile
+from app.services.timeline import EventWords, SubtitleTimeline, build_timeline
+
+# Supported color names and their ASS color format (BGR hex)
+ASS_COLOR_MAP = {
+    "white": "&H00FFFFFF",
+    "red": "&H000000FF",
+    "blue": "&H00FF0000",
+    "green": "&H0000FF00",
+    "yellow": "&H0000FFFF",
+    "black": "&H00000000",
+    "orange": "&H000099FF",
+    "pink": "&H00FF00FF",
+}
+
+# Karaoke words not yet spoken are drawn in translucent white, then switch to the style's color
+ASS_KARAOKE_UPCOMING = "&H80FFFFFF"
+
+# Font sizes and margins are given for a frame of this size
+ASS_REFERENCE_WIDTH = 1920
+ASS_REFERENCE_HEIGHT = 1080
+
+
+def format_timestamps(seconds: np.ndarray, decimal: str = ",") -> List[str]:
+    """Format a column of times as HH:MM:SS,mmm using integer milliseconds
+
+    Rounding once to whole milliseconds avoids the float modulo that could turn
+    1.001 into 1.000.
+    """
+    millis = np.rint(np.maximum(seconds, 0.0) * 1000).astype(np.int64)
+    hours, rest = np.divmod(millis, 3600000)
+    minutes, rest = np.divmod(rest, 60000)
+    secs, millis = np.divmod(rest, 1000)
+    return [
+        f"{h:02d}:{m:02d}:{s:02d}{decimal}{ms:03d}"
+        for h, m, s, ms in zip(hours.tolist(), minutes.tolist(), secs.tolist(), millis.tolist())
+    ]
 
 
 def format_srt_time(seconds: float) -> str:
     """Convert seconds to SRT time format: HH:MM:SS,mmm"""
-    td = timedelta(seconds=seconds)
-    hours = int(td.total_seconds() // 3600)
-    minutes = int((td.total_seconds() % 3600) // 60)
-    secs = int(td.total_seconds() % 60)
-    millis = int((td.total_seconds() % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+    return format_timestamps(np.array([seconds]))[0]
+
+
+def generate_srt_content(subtitles: list[SubtitleResponse]) -> str:
+    """Generate SRT text from subtitle data, in start-time order"""
+    timeline = build_timeline(subtitles)
+    starts = format_timestamps(timeline.starts)
+    ends = format_timestamps(timeline.ends)
+    return "".join(
+        f"{idx}\n{start} --> {end}\n{text}\n\n"
+        for idx, (start, end, text) in enumerate(zip(starts, ends, timeline.texts), start=1)
+    )
 
 
 def generate_srt_file(subtitles: list[SubtitleResponse], output_path: str) -> str:
     """Generate SRT subtitle file from subtitle data"""
     with open(output_path, 'w', encoding='utf-8') as f:
-        for idx, subtitle in enumerate(subtitles, start=1):
-            f.write(f"{idx}\n")
-            f.write(f"{format_srt_time(subtitle.start_time)} --> {format_srt_time(subtitle.end_time)}\n")
-            f.write(f"{subtitle.text}\n\n")
+        f.write(generate_srt_content(subtitles))
     
     return output_path
 
 
-def generate_ass_style(font_size: int, color: str, position: str) -> str:
-    """Generate ASS subtitle style with custom font size and color"""
+def format_vtt_time(seconds: float) -> str:
+    """Convert seconds to WebVTT time format: HH:MM:SS.mmm"""
+    return format_timestamps(np.array([seconds]), ".")[0]
+
+
+# WebVTT cue settings can't express font size, but line position and a color class can
+VTT_LINE_MAP = {
+    "top": " line:5%",
+    "center": " line:50%",
+    "bottom": "",
+}
+
+
+def generate_vtt_content(subtitles: list[SubtitleResponse]) -> str:
+    """Generate WebVTT text for playing subtitles alongside the untouched source"""
+    timeline = build_timeline(subtitles)
+    starts = format_timestamps(timeline.starts, ".")
+    ends = format_timestamps(timeline.ends, ".")
+    
+    lines = ["WEBVTT", ""]
+    # Cues must be in start-time order
+    for start, end, text, style_id in zip(starts, ends, timeline.texts, timeline.style_ids.tolist()):
+        _, color, position, _ = timeline.styles[style_id]
+        text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        lines.append(f"{start} --> {end}{VTT_LINE_MAP.get(position, '')}")
+        lines.append(f"<c.{color}>{text}</c>")
+        lines.append("")
+    
+    return "\n".join(lines)
+
+
+def ass_play_res(media: Optional[MediaProfile] = None) -> Tuple[int, int, float]:
+    """PlayResX/Y matching the video frame, and the scale from the 1080p reference sizes
+
+    Font sizes are authored against a 1080-line frame; matching PlayRes to the real
+    aspect ratio keeps text from being stretched on portrait or non-16:9 video.
+    """
+    if media is None or not media.width or not media.height:
+        return ASS_REFERENCE_WIDTH, ASS_REFERENCE_HEIGHT, 1.0
+    return media.width, media.height, media.height / ASS_REFERENCE_HEIGHT
+
+
+ASS_ALIGNMENT_MAP = {
+    "bottom": "2",  # Bottom center
+    "center": "5",  # Center
+    "top": "8",     # Top center
+}
+
+
+def generate_ass_style(name: str, font_size: int, color: str, position: str,
+                       karaoke: bool = False, scale: float = 1.0) -> str:
+    """One ASS Style line with custom font size, color and position"""
     # Convert color name to ASS color format (BGR hex)
-    color_map = {
-        "white": "&H00FFFFFF",
-        "red": "&H000000FF",
-        "blue": "&H00FF0000",
-        "green": "&H0000FF00",
-        "yellow": "&H0000FFFF",
-        "black": "&H00000000",
-        "orange": "&H000099FF",
-        "pink": "&H00FF00FF",
-    }
-    ass_color = color_map.get(color.lower(), "&H00FFFFFF")
+    ass_color = ASS_COLOR_MAP.get(color.lower(), "&H00FFFFFF")
+    secondary = ASS_KARAOKE_UPCOMING if karaoke else "&H000000FF"
     
     # Position alignment (1-9 numpad style)
-    alignment_map = {
-        "bottom": "2",  # Bottom center
-        "center": "5",  # Center
-        "top": "8",     # Top center
-    }
-    alignment = alignment_map.get(position.lower(), "2")
+    alignment = ASS_ALIGNMENT_MAP.get(position.lower(), "2")
+    
+    scaled_size = max(1, round(font_size * scale))
+    margin = max(1, round(10 * scale))
+    
+    return f"Style: {name},Arial,{scaled_size},{ass_color},{secondary},&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,2,1,{alignment},{margin},{margin},{margin},1"
+
+
+def generate_ass_header(styles: List[str], media: Optional[MediaProfile] = None) -> str:
+    """Script info, the given Style lines and the Events format line"""
+    play_res_x, play_res_y, _ = ass_play_res(media)
+    style_lines = "\n".join(styles)
     
     return f"""[Script Info]
 ScriptType: v4.00+
-PlayResX: 1920
-PlayResY: 1080
+PlayResX: {play_res_x}
+PlayResY: {play_res_y}
 
 [V4+ Styles]
 Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: Default,Arial,{font_size},{ass_color},&H000000FF,&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,2,1,{alignment},10,10,10,1
+{style_lines}
 
 [Events]
 Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
@@ -62,28 +150,83 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 
 def format_ass_time(seconds: float) -> str:
     """Convert seconds to ASS time format: H:MM:SS.cc"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    centisecs = int((seconds % 1) * 100)
-    return f"{hours}:{minutes:02d}:{secs:02d}.{centisecs:02d}"
+    return format_ass_times(np.array([seconds]))[0]
 
 
-def generate_ass_file(subtitles: list[SubtitleResponse], output_path: str) -> str:
-    """Generate ASS subtitle file with custom styling"""
-    if not subtitles:
-        return output_path
+def format_ass_times(seconds: np.ndarray) -> List[str]:
+    """Format a whole column of times at once, rounded to the nearest centisecond"""
+    centis = np.rint(np.maximum(seconds, 0.0) * 100).astype(np.int64)
+    hours, rest = np.divmod(centis, 360000)
+    minutes, rest = np.divmod(rest, 6000)
+    secs, centis = np.divmod(rest, 100)
+    return [
+        f"{h}:{m:02d}:{s:02d}.{c:02d}"
+        for h, m, s, c in zip(hours.tolist(), minutes.tolist(), secs.tolist(), centis.tolist())
+    ]
+
+
+def karaoke_text(text: str, words: EventWords) -> Optional[str]:
+    """ASS text with a \\k tag per word so each lights up when it is spoken
+
+    Word times are relative to the event start. Returns None when the text no
+    longer matches the words (e.g. it was edited by hand), so it is drawn plainly.
+    """
+    lines = [line.split() for line in text.split("\n")]
+    if not words or [word for line in lines for word in line] != [word[0] for word in words]:
+        return None
+
+    # Tag lengths come from rounded absolute boundaries so rounding never drifts
+    boundaries = [max(0, round(start * 100)) for _, start, _ in words]
+    boundaries.append(max(boundaries[-1], round(words[-1][2] * 100)))
+    for i in range(1, len(boundaries)):
+        boundaries[i] = max(boundaries[i], boundaries[i - 1])
+
+    parts = [f"{{\\k{boundaries[0]}}}"] if boundaries[0] else []
+    index = 0
+    for line_number, line in enumerate(lines):
+        if line_number:
+            parts.append("\\N")
+        for position, word in enumerate(line):
+            space = " " if position else ""
+            parts.append(f"{{\\k{boundaries[index + 1] - boundaries[index]}}}{space}{word}")
+            index += 1
+    return "".join(parts)
+
+
+def generate_ass_content(timeline: SubtitleTimeline, media: Optional[MediaProfile] = None) -> str:
+    """A timeline as ASS text, with one style per distinct font size, color and position"""
+    _, _, scale = ass_play_res(media)
+    used = timeline.used_styles()
+    styles = [generate_ass_style(f"S{style_id}", *timeline.styles[style_id], scale=scale) for style_id in used]
     
-    # Use the first subtitle's style for the file
-    first_sub = subtitles[0]
-    content = generate_ass_style(first_sub.font_size, first_sub.color, first_sub.position)
+    starts = format_ass_times(timeline.starts)
+    ends = format_ass_times(timeline.ends)
+    # Line breaks in ASS text are written as \N
+    texts = []
+    for text, words, style_id in zip(timeline.texts, timeline.words, timeline.style_ids.tolist()):
+        karaoke = karaoke_text(text, words) if timeline.styles[style_id][3] else None
+        texts.append(karaoke or text.replace("\n", "\\N"))
+    events = [
+        f"Dialogue: 0,{start},{end},S{style_id},,0,0,0,,{text}\n"
+        for start, end, style_id, text in zip(starts, ends, timeline.style_ids.tolist(), texts)
+    ]
     
+    return generate_ass_header(styles, media) + "".join(events)
+
+
+def write_ass_file(timeline: SubtitleTimeline, output_path: str,
+                   media: Optional[MediaProfile] = None) -> str:
+    """Write a timeline as an ASS file"""
     with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(content)
-        for subtitle in subtitles:
-            start = format_ass_time(subtitle.start_time)
-            end = format_ass_time(subtitle.end_time)
-            f.write(f"Dialogue: 0,{start},{end},Default,,0,0,0,,{subtitle.text}\n")
+        f.write(generate_ass_content(timeline, media))
     
     return output_path
 
+
+def generate_ass_file(subtitles: list[SubtitleResponse], output_path: str,
+                      media: Optional[MediaProfile] = None) -> str:
+    """Generate ASS subtitle file with custom styling, scaled to the video's frame"""
+    if not subtitles:
+        return output_path
+    
+    return write_ass_file(build_timeline(subtitles), output_path, media)
@@ -0,0 +1,249 @@
+import os
+import re
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from app.models.subtitle import SubtitleResponse
+from app.services.subtitle_generator import ASS_COLOR_MAP, ASS_REFERENCE_HEIGHT
+
+SUBTITLE_FORMATS = ("srt", "vtt", "ass")
+
+SUBTITLE_EXTENSIONS = {".srt": "srt", ".vtt": "vtt", ".ass": "ass", ".ssa": "ass"}
+
+SUBTITLE_MEDIA_TYPES = {"srt": "application/x-subrip", "vtt": "text/vtt", "ass": "text/x-ssa"}
+
+TAG_RE = re.compile(r"<[^>]*>")
+VTT_CLASS_COLOR_RE = re.compile(r"<c\.([a-zA-Z]+)")
+FONT_COLOR_RE = re.compile(r"<font[^>]*color=[\"']?#?([0-9a-zA-Z]+)", re.IGNORECASE)
+ASS_OVERRIDE_RE = re.compile(r"\{[^}]*\}")
+ASS_ALIGN_RE = re.compile(r"\\an?(\d+)")
+ASS_FONT_SIZE_RE = re.compile(r"\\fs(\d+(?:\.\d+)?)")
+ASS_COLOR_RE = re.compile(r"\\1?c&H([0-9a-fA-F]+)&?")
+
+# ASS files without PlayResY are laid out on a 288-line script, per the spec
+ASS_DEFAULT_PLAY_RES_Y = 288
+
+# SSA numbers alignment 1-3 bottom, 5-7 top, 9-11 middle; map it to numpad order
+SSA_TO_NUMPAD = {5: 7, 6: 8, 7: 9, 9: 4, 10: 5, 11: 6}
+
+# RGB of each supported color, for snapping arbitrary colors to the nearest name
+_COLOR_RGB = {
+    name: (int(value[-2:], 16), int(value[-4:-2], 16), int(value[-6:-4], 16))
+    for name, value in ASS_COLOR_MAP.items()
+}
+
+
+def detect_format(filename: Optional[str], first_line: str = "") -> str:
+    """srt, vtt or ass, from the extension or failing that the first line"""
+    if filename:
+        extension = os.path.splitext(filename)[1].lower()
+        if extension in SUBTITLE_EXTENSIONS:
+            return SUBTITLE_EXTENSIONS[extension]
+    first_line = first_line.lstrip("\ufeff").strip()
+    if first_line.startswith("WEBVTT"):
+        return "vtt"
+    if first_line.lower() == "[script info]":
+        return "ass"
+    return "srt"
+
+
+def parse_timestamp(text: str) -> int:
+    """Milliseconds from HH:MM:SS,mmm, MM:SS.mmm or H:MM:SS.cc, using integer arithmetic only"""
+    clock, _, fraction = text.strip().replace(",", ".").partition(".")
+    millis = 0
+    for part in clock.split(":"):
+        millis = millis * 60 + int(part)
+    millis *= 1000
+    if fraction:
+        # .5, .50 and .500 are all half a second
+        millis += int(fraction[:3].ljust(3, "0"))
+    return millis
+
+
+def nearest_color(red: int, green: int, blue: int) -> str:
+    return min(
+        _COLOR_RGB,
+        key=lambda name: sum((a - b) ** 2 for a, b in zip(_COLOR_RGB[name], (red, green, blue)))
+    )
+
+
+def _html_color(value: str) -> Optional[str]:
+    value = value.lower()
+    if value in ASS_COLOR_MAP:
+        return value
+    if re.fullmatch(r"[0-9a-f]{6}", value):
+        return nearest_color(int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16))
+    return None
+
+
+def _ass_color(value: str) -> str:
+    """Color name for an ASS &HAABBGGRR / &HBBGGRR value"""
+    value = value.strip().lstrip("&H").lstrip("&h").rstrip("&").rjust(8, "0")[-6:]
+    return nearest_color(int(value[4:6], 16), int(value[2:4], 16), int(value[0:2], 16))
+
+
+def _numpad_position(alignment: int) -> str:
+    if alignment >= 7:
+        return "top"
+    if alignment >= 4:
+        return "center"
+    return "bottom"
+
+
+def _vtt_position(settings: str) -> Optional[str]:
+    for setting in settings.split():
+        name, _, value = setting.partition(":")
+        if name != "line" or not value:
+            continue
+        value = value.split(",")[0]
+        if value.endswith("%"):
+            percent = float(value[:-1])
+            return "top" if percent < 33 else "center" if percent < 67 else "bottom"
+        # Line numbers count from the top when positive and from the bottom when negative
+        return "bottom" if value.startswith("-") else "top"
+    return None
+
+
+def _make_subtitle(start_ms: int, end_ms: int, text: str, font_size: int, color: str,
+                   position: str) -> SubtitleResponse:
+    return SubtitleResponse(
+        text=text,
+        start_time=start_ms / 1000,
+        end_time=max(end_ms, start_ms) / 1000,
+        font_size=font_size,
+        color=color,
+        position=position
+    )
+
+
+def parse_srt_vtt(lines: Iterable[str], font_size: int = 24, color: str = "white",
+                  position: str = "bottom") -> Iterator[SubtitleResponse]:
+    """Parse SRT or WebVTT cues one at a time
+
+    A cue starts at a line containing "-->" and runs to the next blank line, so cue
+    numbers, the WEBVTT header and NOTE/STYLE blocks are skipped without special cases.
+    Color comes from <c.name> or <font color=...>, position from VTT line settings or
+    an SRT {\\an8} marker; everything else falls back to the given defaults.
+    """
+    timing: Optional[Tuple[int, int, str]] = None
+    text_lines = []
+
+    def finish() -> SubtitleResponse:
+        start_ms, end_ms, settings = timing
+        raw = "\n".join(text_lines)
+        cue_color = color
+        match = VTT_CLASS_COLOR_RE.search(raw) or FONT_COLOR_RE.search(raw)
+        if match:
+            cue_color = _html_color(match.group(1)) or color
+        cue_position = _vtt_position(settings) or position
+        align = ASS_ALIGN_RE.search(raw)
+        if align:
+            cue_position = _numpad_position(int(align.group(1)))
+        text = ASS_OVERRIDE_RE.sub("", TAG_RE.sub("", raw))
+        text = text.replace("&lt;", "<").replace("&gt;", ">").replace("&nbsp;", " ").replace("&amp;", "&")
+        return _make_subtitle(start_ms, end_ms, text.strip(), font_size, cue_color, cue_position)
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if timing is not None:
+            if line.strip():
+                text_lines.append(line)
+                continue
+            if text_lines:
+                yield finish()
+            timing = None
+            text_lines = []
+        elif "-->" in line:
+            start, _, rest = line.partition("-->")
+            end, _, settings = rest.strip().partition(" ")
+            try:
+                timing = (parse_timestamp(start), parse_timestamp(end), settings)
+            except ValueError:
+                raise ValueError(f"Invalid cue timing: {line.strip()}")
+
+    if timing is not None and text_lines:
+        yield finish()
+
+
+def parse_ass(lines: Iterable[str]) -> Iterator[SubtitleResponse]:
+    """Parse ASS/SSA Dialogue events one at a time, taking size, color and position from their style
+
+    Font sizes are scaled from the script's PlayResY to the 1080-line reference the
+    editor uses. Inline \\an, \\fs and \\c overrides win over the style; other
+    override tags are dropped.
+    """
+    section = ""
+    style_format: Optional[list] = None
+    event_format: Optional[list] = None
+    play_res_y = ASS_DEFAULT_PLAY_RES_Y
+    styles: Dict[str, Tuple[Optional[float], str, str]] = {}
+    default_style = (None, "white", "bottom")
+
+    for line in lines:
+        line = line.strip().lstrip("\ufeff")
+        if not line or line.startswith(";"):
+            continue
+        if line.startswith("["):
+            section = line.lower()
+            continue
+        kind, _, value = line.partition(":")
+        kind = kind.strip().lower()
+        value = value.strip()
+
+        if section == "[script info]" and kind == "playresy":
+            play_res_y = int(value) or ASS_DEFAULT_PLAY_RES_Y
+        elif section in ("[v4+ styles]", "[v4 styles]"):
+            if kind == "format":
+                style_format = [field.strip().lower() for field in value.split(",")]
+            elif kind == "style" and style_format:
+                fields = dict(zip(style_format, (field.strip() for field in value.split(","))))
+                alignment = int(fields.get("alignment", "2"))
+                if section == "[v4 styles]":
+                    alignment = SSA_TO_NUMPAD.get(alignment, alignment)
+                styles[fields.get("name", "Default")] = (
+                    float(fields.get("fontsize", "24")),
+                    _ass_color(fields.get("primarycolour", "&H00FFFFFF")),
+                    _numpad_position(alignment)
+                )
+        elif section == "[events]":
+            if kind == "format":
+                event_format = [field.strip().lower() for field in value.split(",")]
+            elif kind == "dialogue" and event_format:
+                # Text is always last and may itself contain commas
+                fields = dict(zip(event_format, value.split(",", len(event_format) - 1)))
+                size, color, position = styles.get(fields.get("style", "").strip(), default_style)
+                text = fields.get("text", "")
+
+                for override in re.findall(r"\{([^}]*)\}", text):
+                    align = ASS_ALIGN_RE.search(override)
+                    if align:
+                        number = int(align.group(1))
+                        if override[align.start() + 2] != "n":
+                            # Legacy \a uses SSA numbering, \an numpad numbering
+                            number = SSA_TO_NUMPAD.get(number, number)
+                        position = _numpad_position(number)
+                    font_size = ASS_FONT_SIZE_RE.search(override)
+                    if font_size:
+                        size = float(font_size.group(1))
+                    ass_color = ASS_COLOR_RE.search(override)
+                    if ass_color:
+                        color = _ass_color(ass_color.group(1))
+
+                text = ASS_OVERRIDE_RE.sub("", text).replace("\\N", "\n").replace("\\n", "\n").replace("\\h", " ")
+                yield _make_subtitle(
+                    parse_timestamp(fields.get("start", "0:00:00.00")),
+                    parse_timestamp(fields.get("end", "0:00:00.00")),
+                    text.strip(),
+                    max(1, round(size * ASS_REFERENCE_HEIGHT / play_res_y)) if size is not None else 24,
+                    color,
+                    position
+                )
+
+
+def parse_subtitles(lines: Iterable[str], subtitle_format: str, font_size: int = 24,
+                    color: str = "white", position: str = "bottom") -> Iterator[SubtitleResponse]:
+    """Stream subtitles out of an SRT, WebVTT or ASS file's lines
+
+    The defaults style formats that carry no styling of their own (SRT, WebVTT).
+    """
+    if subtitle_format == "ass":
+        return parse_ass(lines)
+    return parse_srt_vtt(lines, font_size, color, position)
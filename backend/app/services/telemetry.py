@@ -0,0 +1,301 @@
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Print one JSON line per finished span ("0" to turn off)
+TRACE_LOG = os.getenv("TRACE_LOG", "1") != "0"
+
+# Spans shorter than this aren't logged (they are still counted in /metrics)
+TRACE_LOG_MIN_SECONDS = float(os.getenv("TRACE_LOG_MIN_SECONDS", "0"))
+
+# "otlp" or "console" also sends spans to OpenTelemetry, when its SDK is installed
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "").lower()
+
+# Stage timings run from milliseconds (rule parsing) to minutes (full encodes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Sample lines in the Prometheus text format"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """A settable value, or one read from collect() each time /metrics is scraped"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 collect: Optional[Callable[[], Iterable[Tuple[Dict[str, str], float]]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self) -> List[str]:
+        if self._collect is not None:
+            values = [(self._key(labels), value) for labels, value in self._collect()]
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts, sum, count)
+        self._values: Dict[Labels, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        lines = []
+        inf = 'le="+Inf"'
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, inf)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics for the whole worker process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+              collect: Optional[Callable[[], Iterable[Tuple[Dict[str, str], float]]]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, collect))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        blocks = []
+        for metric in metrics:
+            try:
+                blocks.append(metric.render())
+            except Exception as e:
+                # One broken collector shouldn't take the whole scrape down
+                print(f"❌ Metric {metric.name} failed to collect: {str(e)}")
+        return "\n".join(blocks) + "\n"
+
+
+# Shared registry for the whole worker process
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    "video_editor_stage_seconds", "Wall time of each pipeline stage", ("stage", "outcome")
+)
+
+
+class SpanContext:
+    """Identifies a span so work handed to another thread can continue its trace"""
+
+    def __init__(self, trace_id: str, span_id: str, otel_context=None):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.otel_context = otel_context
+
+
+_current_span: contextvars.ContextVar[Optional[SpanContext]] = contextvars.ContextVar("current_span", default=None)
+
+_tracer = None
+
+
+def configure_tracing() -> None:
+    """Send spans to OpenTelemetry too when TRACING_EXPORTER is set and the SDK is installed"""
+    global _tracer
+    if not TRACING_EXPORTER or _tracer is not None:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError:
+        print("⚠️ TRACING_EXPORTER is set but opentelemetry-sdk is not installed; spans stay local")
+        return
+
+    if TRACING_EXPORTER == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("⚠️ opentelemetry-exporter-otlp is not installed; spans stay local")
+            return
+        # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+        exporter = OTLPSpanExporter()
+    else:
+        exporter = ConsoleSpanExporter()
+
+    service = os.getenv("OTEL_SERVICE_NAME", "video-editor-api")
+    provider = TracerProvider(resource=Resource.create({"service.name": service}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("video-editor")
+    print(f"🔭 Tracing spans to OpenTelemetry ({TRACING_EXPORTER})")
+
+
+def current_span() -> Optional[SpanContext]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(stage: str, parent: Optional[SpanContext] = None, **attributes) -> Iterator[dict]:
+    """Time one pipeline stage
+
+    The duration lands in video_editor_stage_seconds and, when TRACE_LOG is on, in a
+    JSON log line carrying the trace id shared by every span of the same request or
+    job. Code inside may add attributes to the yielded dict. parent continues a trace
+    started on another thread (e.g. the request that queued a job).
+    """
+    parent = parent or _current_span.get()
+    context = SpanContext(parent.trace_id if parent else uuid.uuid4().hex, uuid.uuid4().hex[:16])
+
+    otel_span = None
+    if _tracer is not None:
+        otel_span = _tracer.start_span(stage, context=parent.otel_context if parent else None)
+        from opentelemetry import trace
+        context.otel_context = trace.set_span_in_context(otel_span)
+
+    token = _current_span.set(context)
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield attributes
+    except BaseException as e:
+        outcome = "error"
+        attributes.setdefault("error", str(e) or type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(stage, context, parent, time.perf_counter() - started, outcome, attributes, otel_span)
+
+
+def record_span(stage: str, duration: float, outcome: str = "ok", **attributes) -> None:
+    """Record a stage timed by the caller, e.g. time spent blocked on a pipe inside a generator"""
+    parent = _current_span.get()
+    context = SpanContext(parent.trace_id if parent else uuid.uuid4().hex, uuid.uuid4().hex[:16])
+    _finish(stage, context, parent, duration, outcome, attributes, None)
+
+
+def _finish(stage: str, context: SpanContext, parent: Optional[SpanContext], duration: float,
+            outcome: str, attributes: dict, otel_span) -> None:
+    STAGE_SECONDS.observe(duration, stage=stage, outcome=outcome)
+
+    if otel_span is not None:
+        for name, value in attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(name, value)
+        if outcome == "error":
+            from opentelemetry.trace import Status, StatusCode
+            otel_span.set_status(Status(StatusCode.ERROR, attributes.get("error")))
+        otel_span.end()
+
+    if TRACE_LOG and duration >= TRACE_LOG_MIN_SECONDS:
+        record = {
+            "span": stage,
+            "trace_id": context.trace_id,
+            "span_id": context.span_id,
+            "parent_id": parent.span_id if parent else None,
+            "duration_ms": round(duration * 1000, 2),
+            "outcome": outcome,
+        }
+        record.update(attributes)
+        print(f"⏱️ {json.dumps(record, default=str)}")
@@ -0,0 +1,182 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.models.subtitle import SubtitleResponse, WordTiming
+
+# (font_size, color, position, karaoke): subtitles sharing these share one ASS style
+StyleKey = Tuple[int, str, str, bool]
+
+# Word timings as (text, start, end) relative to their event's start, so moving
+# an event never has to touch its words
+EventWords = Optional[List[Tuple[str, float, float]]]
+
+
+class SubtitleTimeline:
+    """Subtitles as columns sorted by start time, with an interval index for range queries
+
+    starts/ends are float64 arrays; texts, words and style ids are aligned with them. The
+    running maximum of ends (max_end) is non-decreasing, so the first event that can
+    still be on screen at time t is found by binary search, as is the last one that
+    has started by then.
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, texts: Sequence[str],
+                 style_ids: np.ndarray, styles: List[StyleKey],
+                 words: Optional[Sequence[EventWords]] = None):
+        order = np.lexsort((ends, starts))
+        self.starts = np.asarray(starts, dtype=np.float64)[order]
+        self.ends = np.asarray(ends, dtype=np.float64)[order]
+        self.texts = [texts[i] for i in order]
+        self.words = [words[i] for i in order] if words is not None else [None] * len(order)
+        self.style_ids = np.asarray(style_ids, dtype=np.int32)[order]
+        self.styles = styles
+        self.max_end = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+
+    @classmethod
+    def from_subtitles(cls, subtitles: Sequence[SubtitleResponse]) -> "SubtitleTimeline":
+        style_index: Dict[StyleKey, int] = {}
+        style_ids = []
+        words: List[EventWords] = []
+        for subtitle in subtitles:
+            karaoke = bool(subtitle.karaoke and subtitle.words)
+            key = (subtitle.font_size, subtitle.color.lower(), subtitle.position.lower(), karaoke)
+            style_ids.append(style_index.setdefault(key, len(style_index)))
+            words.append([
+                (word.text, word.start - subtitle.start_time, word.end - subtitle.start_time)
+                for word in subtitle.words
+            ] if subtitle.words else None)
+        return cls(
+            np.fromiter((s.start_time for s in subtitles), dtype=np.float64, count=len(subtitles)),
+            np.fromiter((s.end_time for s in subtitles), dtype=np.float64, count=len(subtitles)),
+            [s.text for s in subtitles],
+            np.asarray(style_ids, dtype=np.int32),
+            list(style_index),
+            words
+        )
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _take(self, indices: np.ndarray) -> "SubtitleTimeline":
+        """Sub-timeline of the given (already sorted) positions, sharing the style table"""
+        timeline = SubtitleTimeline.__new__(SubtitleTimeline)
+        timeline.starts = self.starts[indices]
+        timeline.ends = self.ends[indices]
+        timeline.texts = [self.texts[i] for i in indices]
+        timeline.words = [self.words[i] for i in indices]
+        timeline.style_ids = self.style_ids[indices]
+        timeline.styles = self.styles
+        timeline.max_end = np.maximum.accumulate(timeline.ends) if len(indices) else timeline.ends
+        return timeline
+
+    def overlapping_indices(self, start: float, end: float) -> np.ndarray:
+        """Positions of events visible at some point in [start, end)"""
+        lo = int(np.searchsorted(self.max_end, start, side='right'))
+        hi = int(np.searchsorted(self.starts, end, side='left'))
+        if hi <= lo:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.arange(lo, hi)
+        return candidates[self.ends[lo:hi] > start]
+
+    def overlapping(self, start: float, end: float) -> "SubtitleTimeline":
+        return self._take(self.overlapping_indices(start, end))
+
+    def active_at(self, t: float) -> "SubtitleTimeline":
+        """Events on screen at time t"""
+        return self.overlapping(t, np.nextafter(t, np.inf))
+
+    def merge_overlaps(self, gap: float = 0.0) -> "SubtitleTimeline":
+        """Merge events with the same text and style that overlap (or are within gap seconds)
+
+        Auto-generated tracks added twice, or chunk seams that repeat a phrase, collapse
+        into one event instead of being drawn stacked on top of each other.
+        """
+        if len(self) < 2:
+            return self
+
+        # Group identical (text, style) pairs, then order each group by start
+        _, text_ids = np.unique(np.array(self.texts, dtype=str), return_inverse=True)
+        group = text_ids.astype(np.int64) * (len(self.styles) + 1) + self.style_ids
+        order = np.lexsort((self.starts, group))
+        starts, ends, group = self.starts[order], self.ends[order], group[order]
+
+        # Offset each group's times so one running max can't leak between groups
+        span = float(max(ends.max(), starts.max())) + gap + 1.0
+        offset = (np.cumsum(np.r_[0, group[1:] != group[:-1]]) * span)
+        running_end = np.maximum.accumulate(ends + offset)
+        new_run = np.r_[True, (starts[1:] + offset[1:]) > running_end[:-1] + gap]
+
+        run_ids = np.cumsum(new_run) - 1
+        run_starts = starts[new_run]
+        run_ends = np.zeros(len(run_starts))
+        np.maximum.at(run_ends, run_ids, ends)
+        first = order[new_run]
+
+        return SubtitleTimeline(
+            run_starts, run_ends, [self.texts[i] for i in first], self.style_ids[first], self.styles,
+            [self.words[i] for i in first]
+        )
+
+    def shift(self, offset: float, start: Optional[float] = None, end: Optional[float] = None) -> "SubtitleTimeline":
+        """Move events that start within [start, end) by offset seconds, clamped at zero"""
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.starts >= start
+        if end is not None:
+            mask &= self.starts < end
+        delta = np.where(mask, offset, 0.0)
+        moved = self.starts + delta
+        new_starts = np.maximum(moved, 0.0)
+        new_ends = np.maximum(self.ends + delta, new_starts)
+        words = self._rebase_words(self.words, new_starts - moved)
+        return SubtitleTimeline(new_starts, new_ends, self.texts, self.style_ids, self.styles, words)
+
+    def retime(self, scale: float, offset: float = 0.0) -> "SubtitleTimeline":
+        """Map every time t to t * scale + offset, e.g. after a frame rate conversion"""
+        moved = self.starts * scale + offset
+        new_starts = np.maximum(moved, 0.0)
+        new_ends = np.maximum(self.ends * scale + offset, new_starts)
+        words = [
+            [(text, start * scale, end * scale) for text, start, end in event] if event else event
+            for event in self.words
+        ]
+        words = self._rebase_words(words, new_starts - moved)
+        return SubtitleTimeline(new_starts, new_ends, self.texts, self.style_ids, self.styles, words)
+
+    @staticmethod
+    def _rebase_words(words: List[EventWords], clamped: np.ndarray) -> List[EventWords]:
+        """Keep word times in place for events whose start was clamped forward"""
+        rebased = list(words)
+        for index in np.flatnonzero(clamped > 0).tolist():
+            if rebased[index]:
+                amount = float(clamped[index])
+                rebased[index] = [(text, start - amount, end - amount) for text, start, end in rebased[index]]
+        return rebased
+
+    def to_subtitles(self) -> List[SubtitleResponse]:
+        return [
+            SubtitleResponse(
+                text=text,
+                start_time=float(start),
+                end_time=float(end),
+                font_size=self.styles[style_id][0],
+                color=self.styles[style_id][1],
+                position=self.styles[style_id][2],
+                karaoke=self.styles[style_id][3],
+                words=[
+                    WordTiming(text=word, start=float(start) + word_start, end=float(start) + word_end)
+                    for word, word_start, word_end in words
+                ] if words else None
+            )
+            for start, end, text, style_id, words in zip(
+                self.starts, self.ends, self.texts, self.style_ids.tolist(), self.words
+            )
+        ]
+
+    def used_styles(self) -> List[int]:
+        """Style ids that at least one event uses, in table order"""
+        return sorted(set(self.style_ids.tolist()))
+
+
+def build_timeline(subtitles: Sequence[SubtitleResponse]) -> SubtitleTimeline:
+    """Sorted timeline with identical overlapping events merged, ready to serialize or render"""
+    return SubtitleTimeline.from_subtitles(subtitles).merge_overlaps()
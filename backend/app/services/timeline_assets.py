@@ -0,0 +1,279 @@
+import json
+import math
+import os
+import shutil
+import struct
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import ffmpeg
+import numpy as np
+from PIL import Image
+
+from app.models.video import MediaProfile
+from app.services.media_probe import probe_media
+from app.services.telemetry import SpanContext, current_span, span
+
+TIMELINE_ASSET_DIR = os.path.join("outputs", "timeline")
+
+# Built off the job queue so a long decode never holds up the video's chat edits
+TIMELINE_ASSET_WORKERS = int(os.getenv("TIMELINE_ASSET_WORKERS", "1"))
+
+# Thumbnails are spread evenly over the video, at most one per SPRITE_MIN_INTERVAL_SECONDS
+SPRITE_MAX_THUMBNAILS = int(os.getenv("SPRITE_MAX_THUMBNAILS", "100"))
+SPRITE_MIN_INTERVAL_SECONDS = float(os.getenv("SPRITE_MIN_INTERVAL_SECONDS", "1"))
+SPRITE_TILE_WIDTH = int(os.getenv("SPRITE_TILE_WIDTH", "160"))
+SPRITE_COLUMNS = 10
+
+# Decode only keyframes for thumbnails ("0" decodes every frame for exact timing)
+SPRITE_KEYFRAMES_ONLY = os.getenv("SPRITE_KEYFRAMES_ONLY", "1") != "0"
+
+# Peaks are (min, max) pairs per bucket; long videos get wider buckets to stay under the cap
+WAVEFORM_PEAKS_PER_SECOND = float(os.getenv("WAVEFORM_PEAKS_PER_SECOND", "50"))
+WAVEFORM_MAX_PEAKS = int(os.getenv("WAVEFORM_MAX_PEAKS", "20000"))
+WAVEFORM_SAMPLE_RATE = 8000
+
+# Seconds of PCM reduced per read from ffmpeg's stdout
+WAVEFORM_BLOCK_SECONDS = 10
+
+SPRITE_FILE = "sprite.jpg"
+PEAKS_FILE = "peaks.bin"
+# Written last; its presence means the assets are complete
+META_FILE = "meta.json"
+
+# Leads the combined /overview payload: magic, then the length of the JSON header that follows
+OVERVIEW_MAGIC = b"VETL"
+OVERVIEW_PREFIX = struct.Struct("<4sI")
+
+_executor = ThreadPoolExecutor(max_workers=TIMELINE_ASSET_WORKERS, thread_name_prefix="timeline")
+_pending: Dict[str, Future] = {}
+_pending_lock = threading.Lock()
+
+
+def asset_key(content_hash: Optional[str], video_id: str) -> str:
+    """Assets depend only on the source bytes, so identical uploads share them"""
+    return content_hash or video_id
+
+
+def asset_dir(key: str) -> str:
+    return os.path.join(TIMELINE_ASSET_DIR, key)
+
+
+def load_meta(key: str) -> Optional[dict]:
+    """Metadata of finished assets, or None while they are missing or being built"""
+    try:
+        with open(os.path.join(asset_dir(key), META_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def reduce_peaks(samples: np.ndarray, bucket_size: int) -> np.ndarray:
+    """(min, max) of each bucket of int16 samples, as interleaved int8 pairs
+
+    One reshape and two reductions over the block; a short last bucket is padded
+    with its own first sample so it doesn't pull the extremes towards zero.
+    """
+    remainder = len(samples) % bucket_size
+    if remainder:
+        samples = np.concatenate([samples, np.full(bucket_size - remainder, samples[-remainder], dtype=np.int16)])
+    buckets = samples.reshape(-1, bucket_size)
+    peaks = np.empty((len(buckets), 2), dtype=np.int16)
+    np.min(buckets, axis=1, out=peaks[:, 0])
+    np.max(buckets, axis=1, out=peaks[:, 1])
+    # Top byte of each sample: -128..127 is plenty for a drawn waveform
+    return (peaks >> 8).astype(np.int8).ravel()
+
+
+def _sprite_layout(duration: float) -> Tuple[float, int, int, int]:
+    """(seconds between thumbnails, thumbnail count, columns, rows) for a video"""
+    interval = max(SPRITE_MIN_INTERVAL_SECONDS, duration / SPRITE_MAX_THUMBNAILS)
+    count = max(1, math.ceil(duration / interval))
+    columns = min(SPRITE_COLUMNS, count)
+    return interval, count, columns, math.ceil(count / columns)
+
+
+def _bucket_size(duration: float) -> int:
+    peaks_per_second = min(WAVEFORM_PEAKS_PER_SECOND, WAVEFORM_MAX_PEAKS / max(duration, 1.0))
+    return max(1, round(WAVEFORM_SAMPLE_RATE / peaks_per_second))
+
+
+def _build(source_path: str, media: MediaProfile, target_dir: str) -> dict:
+    """Decode the source once: the video branch tiles thumbnails into a JPEG, the audio
+    branch streams low-rate PCM to stdout where it is reduced to peaks block by block"""
+
+    duration = media.duration or 0.0
+    source = ffmpeg.input(source_path, **({"skip_frame:v": "nokey"} if SPRITE_KEYFRAMES_ONLY else {}))
+    outputs = []
+    meta = {"version": 1, "duration": duration, "sprite": None, "waveform": None}
+
+    if media.has_video and duration > 0:
+        interval, count, columns, rows = _sprite_layout(duration)
+        sprite = (
+            source.video
+            # Keyframe-only decoding can end well before the video does; repeat the last
+            # frame so fps still has something to sample for every thumbnail
+            .filter("tpad", stop_mode="clone", stop_duration=duration)
+            .filter("fps", fps=1 / interval)
+            .filter("scale", SPRITE_TILE_WIDTH, -2)
+            .filter("tile", f"{columns}x{rows}")
+        )
+        # tile emits a partly filled sheet at the end of the stream, so one frame is the whole sprite
+        outputs.append(ffmpeg.output(sprite, os.path.join(target_dir, SPRITE_FILE), vframes=1, **{"q:v": 5}))
+        meta["sprite"] = {"interval": interval, "count": count, "columns": columns, "rows": rows}
+
+    bucket_size = _bucket_size(duration)
+    if media.has_audio:
+        outputs.append(ffmpeg.output(source.audio, "pipe:", format="s16le", acodec="pcm_s16le",
+                                     ac=1, ar=WAVEFORM_SAMPLE_RATE))
+
+    if not outputs:
+        return meta
+
+    process = (
+        ffmpeg.merge_outputs(*outputs)
+        .global_args("-loglevel", "error")
+        .run_async(pipe_stdout=True, pipe_stderr=True)
+    )
+    block_bytes = bucket_size * max(1, WAVEFORM_SAMPLE_RATE * WAVEFORM_BLOCK_SECONDS // bucket_size) * 2
+    peaks = []
+    try:
+        while True:
+            raw = process.stdout.read(block_bytes)
+            if not raw:
+                break
+            peaks.append(reduce_peaks(np.frombuffer(raw[:len(raw) // 2 * 2], dtype=np.int16), bucket_size))
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise Exception(f"Failed to build timeline assets: {stderr.decode()}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+    if meta["sprite"] is not None and not os.path.exists(os.path.join(target_dir, SPRITE_FILE)):
+        # No frame decoded at all (e.g. a cover-art-only video stream)
+        meta["sprite"] = None
+    if meta["sprite"] is not None:
+        with Image.open(os.path.join(target_dir, SPRITE_FILE)) as image:
+            width, height = image.size
+        meta["sprite"].update(tile_width=width // meta["sprite"]["columns"],
+                              tile_height=height // meta["sprite"]["rows"])
+
+    if media.has_audio:
+        data = np.concatenate(peaks) if peaks else np.empty(0, dtype=np.int8)
+        with open(os.path.join(target_dir, PEAKS_FILE), "wb") as f:
+            f.write(data.tobytes())
+        meta["waveform"] = {
+            "format": "int8_min_max",
+            "peaks_per_second": WAVEFORM_SAMPLE_RATE / bucket_size,
+            "count": len(data) // 2,
+        }
+    return meta
+
+
+def build_timeline_assets(key: str, source_path: str, media: Optional[MediaProfile] = None,
+                          parent: Optional[SpanContext] = None) -> dict:
+    """Build the sprite and waveform for a source once and return their metadata"""
+
+    meta = load_meta(key)
+    if meta is not None:
+        return meta
+    if media is None or media.duration is None:
+        media = probe_media(source_path)
+
+    target = asset_dir(key)
+    # Build next to the final directory and rename, so half-written assets are never served
+    staging = f"{target}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(staging)
+    try:
+        with span("timeline_assets", parent=parent, keyframes_only=SPRITE_KEYFRAMES_ONLY) as attributes:
+            meta = _build(source_path, media, staging)
+            attributes["thumbnails"] = meta["sprite"]["count"] if meta["sprite"] else 0
+            attributes["peaks"] = meta["waveform"]["count"] if meta["waveform"] else 0
+        with open(os.path.join(staging, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another worker process finished first
+            pass
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    print(f"🎞️ Timeline assets ready for {key[:12]}")
+    return meta
+
+
+def schedule_timeline_assets(key: str, source_path: str, media: Optional[MediaProfile] = None) -> Optional[Future]:
+    """Start building a source's assets in the background; None once they already exist
+
+    Returns the running build when one is in flight, so callers can report it as
+    pending or surface its error.
+    """
+    if load_meta(key) is not None:
+        return None
+
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is not None and not (future.done() and future.exception() is None):
+            # Still running, or failed: the caller decides whether to retry
+            return future
+        # The build continues the trace of the upload that started it
+        future = _executor.submit(build_timeline_assets, key, source_path, media, current_span())
+        _pending[key] = future
+    future.add_done_callback(lambda done: _forget(key, done))
+    return future
+
+
+def _forget(key: str, future: Future) -> None:
+    # Failures stay around for one report; successes are on disk
+    if future.exception() is None:
+        with _pending_lock:
+            if _pending.get(key) is future:
+                del _pending[key]
+
+
+def retry_timeline_assets(key: str) -> None:
+    """Drop a failed build so the next schedule starts over"""
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is not None and future.done():
+            del _pending[key]
+
+
+def read_overview(key: str) -> Optional[bytes]:
+    """Sprite, peaks and their metadata in one payload, for a single timeline request
+
+    Layout: OVERVIEW_MAGIC, a little-endian uint32 header length, the JSON header,
+    then the peaks and the JPEG sprite at the offsets it lists (counted from the end
+    of the header).
+    """
+    meta = load_meta(key)
+    if meta is None:
+        return None
+    target = asset_dir(key)
+    parts = []
+    offset = 0
+    header = dict(meta)
+    for name, filename in (("waveform", PEAKS_FILE), ("sprite", SPRITE_FILE)):
+        if meta.get(name) is None:
+            continue
+        with open(os.path.join(target, filename), "rb") as f:
+            data = f.read()
+        header[name] = dict(meta[name], offset=offset, length=len(data))
+        parts.append(data)
+        offset += len(data)
+    encoded = json.dumps(header, separators=(",", ":")).encode()
+    return OVERVIEW_PREFIX.pack(OVERVIEW_MAGIC, len(encoded)) + encoded + b"".join(parts)
+
+
+def clear_timeline_assets(key: str) -> None:
+    """Remove a source's sprite and waveform"""
+    shutil.rmtree(asset_dir(key), ignore_errors=True)
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is not None and future.done():
+            del _pending[key]
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+TRANSCRIPT_CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join("cache", "transcripts"))
+
+# Total size of cached transcripts on disk before least recently used ones are evicted
+TRANSCRIPT_CACHE_MAX_MB = float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "256"))
+
+_file_hashes: Dict[Tuple[str, float, int], str] = {}
+_file_hashes_lock = threading.Lock()
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's contents, memoized by path, mtime and size"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+
+    with _file_hashes_lock:
+        if memo_key in _file_hashes:
+            return _file_hashes[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+
+    with _file_hashes_lock:
+        _file_hashes[memo_key] = digest.hexdigest()
+    return digest.hexdigest()
+
+
+def remember_file_hash(path: str, digest: str) -> None:
+    """Record a hash computed elsewhere (e.g. while uploading) so hash_file can skip the read"""
+    stat = os.stat(path)
+    with _file_hashes_lock:
+        _file_hashes[(os.path.abspath(path), stat.st_mtime, stat.st_size)] = digest
+
+
+def make_cache_key(content_hash: str, model_name: str, options: Optional[dict] = None) -> str:
+    """Cache key for a transcript: source content, model and transcribe options"""
+    payload = json.dumps(
+        {"content": content_hash, "model": model_name, "options": options or {}},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class TranscriptionCache:
+    """Persistent, size-bounded LRU cache of raw Whisper segments"""
+
+    def __init__(self, cache_dir: str = TRANSCRIPT_CACHE_DIR, max_mb: float = TRANSCRIPT_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU order from file access times left by earlier runs"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, name[:-len('.json')], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                segments = json.load(f)
+            # mtime doubles as last-access time so LRU order survives restarts
+            os.utime(self._path(key))
+        except (OSError, ValueError):
+            with self._lock:
+                self._index.pop(key, None)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return segments
+
+    def put(self, key: str, segments: List[dict]) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(segments, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._index[key] = os.path.getsize(path)
+            self._index.move_to_end(key)
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        while len(self._index) > 1 and sum(self._index.values()) > self.max_bytes:
+            key, _ = self._index.popitem(last=False)
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "size_bytes": sum(self._index.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Shared cache for the whole worker process
+transcription_cache = TranscriptionCache()
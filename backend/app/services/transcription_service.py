@@ -1,88 +1,311 @@
-import whisper
 import ffmpeg
-import os
+import itertools
+import numpy as np
 import ssl
+import time
 import urllib.request
-from typing import List
-from app.models.subtitle import SubtitleResponse
+from typing import Iterable, Iterator, List, Optional
+from app.models.subtitle import CaptionLayout, SubtitleResponse, WordTiming
+from app.models.video import MediaProfile
+from app.services.model_registry import model_registry, DEFAULT_WHISPER_MODEL
+from app.services.transcription_cache import transcription_cache, hash_file, make_cache_key
+from app.services.audio_chunker import iter_long_form, LONG_FORM_THRESHOLD_SECONDS, SAMPLE_RATE
+from app.services.caption_segmenter import resegment_words, stretch_caption, words_from_whisper
+from app.services.job_queue import raise_if_stopped
+from app.services.telemetry import record_span, span
 
 # Fix SSL certificate verification issue for Whisper model download
 ssl._create_default_https_context = ssl._create_unverified_context
 
+# Options passed to model.transcribe; part of the transcript cache key
+TRANSCRIBE_OPTIONS = {"word_timestamps": False}
+WORD_TRANSCRIBE_OPTIONS = {"word_timestamps": True}
 
-def extract_audio_from_video(video_path: str, audio_output_path: str) -> str:
-    """Extract audio from video file"""
+
+def transcribe_options(word_timestamps: bool = False) -> dict:
+    return WORD_TRANSCRIBE_OPTIONS if word_timestamps else TRANSCRIBE_OPTIONS
+
+
+def stream_audio_from_video(video_path: str, block_seconds: float = 30) -> Iterator[np.ndarray]:
+    """Decode the video's audio to 16 kHz mono float32 blocks over a pipe, without a temp file"""
+    process = (
+        ffmpeg
+        .input(video_path)
+        .output('pipe:', format='s16le', acodec='pcm_s16le', ac=1, ar=SAMPLE_RATE)
+        .global_args('-loglevel', 'error')
+        .run_async(pipe_stdout=True, pipe_stderr=True)
+    )
+    block_bytes = int(block_seconds * SAMPLE_RATE) * 2
+    # Only time spent waiting on ffmpeg counts; the consumer's work between blocks doesn't
+    decode_seconds = 0.0
+    samples = 0
+    
     try:
-        (
-            ffmpeg
-            .input(video_path)
-            .output(audio_output_path, acodec='pcm_s16le', ac=1, ar='16k')
-            .overwrite_output()
-            .run(capture_stdout=True, capture_stderr=True)
-        )
-        return audio_output_path
-    except ffmpeg.Error as e:
-        print(f"FFmpeg error during audio extraction: {e.stderr.decode()}")
-        raise Exception(f"Failed to extract audio: {e.stderr.decode()}")
+        while True:
+            started = time.perf_counter()
+            raw = process.stdout.read(block_bytes)
+            decode_seconds += time.perf_counter() - started
+            if not raw:
+                break
+            # A cancelled or timed-out job stops here; the finally below kills ffmpeg
+            raise_if_stopped()
+            samples += len(raw) // 2
+            yield np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+        
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            print(f"FFmpeg error during audio extraction: {stderr.decode()}")
+            record_span("audio_extract", decode_seconds, outcome="error", error=stderr.decode()[-200:])
+            raise Exception(f"Failed to extract audio: {stderr.decode()}")
+        record_span("audio_extract", decode_seconds, audio_seconds=round(samples / SAMPLE_RATE, 2))
+    finally:
+        # The consumer may stop early; don't leave ffmpeg running
+        if process.poll() is None:
+            process.kill()
+            process.wait()
 
 
-def transcribe_audio_to_subtitles(
-    audio_path: str,
-    font_size: int = 24,
-    color: str = "white",
-    position: str = "bottom"
-) -> List[SubtitleResponse]:
-    """Transcribe audio using Whisper and return subtitle segments"""
+def iter_transcript_chunks(
+    blocks: Iterable[np.ndarray],
+    model_name: str = DEFAULT_WHISPER_MODEL,
+    progressive: bool = False,
+    duration: Optional[float] = None,
+    options: dict = TRANSCRIBE_OPTIONS
+) -> Iterator[List[dict]]:
+    """Transcribe streamed audio and yield raw text/start/end segments chunk by chunk
+
+    With progressive=True audio is always chunked so results arrive while the
+    rest is still being transcribed. A known duration skips buffering to find out.
+    """
+    
+    if progressive or (duration is not None and duration >= LONG_FORM_THRESHOLD_SECONDS):
+        yield from iter_long_form(blocks, model_name, options)
+        return
     
-    # Load Whisper model (using base model for speed, can upgrade to 'medium' or 'large' for accuracy)
-    model = whisper.load_model("base")
+    # Buffer up to the long-form threshold; shorter audio is transcribed in one call
+    blocks = iter(blocks)
+    buffered = []
+    buffered_samples = 0
+    for block in blocks:
+        buffered.append(block)
+        buffered_samples += len(block)
+        if buffered_samples >= LONG_FORM_THRESHOLD_SECONDS * SAMPLE_RATE:
+            # Long recordings are split at silences and spread over a process pool
+            yield from iter_long_form(itertools.chain(buffered, blocks), model_name, options)
+            return
     
-    # Transcribe with word-level timestamps
-    result = model.transcribe(audio_path, word_timestamps=False)
+    if not buffered:
+        return
+    audio = np.concatenate(buffered)
     
-    # Convert segments to SubtitleResponse objects
-    subtitles = []
+    # Borrow a warm model from the process-wide registry instead of loading it per request
+    with model_registry.acquire(model_name) as model:
+        with span("whisper_inference", model=model_name, audio_seconds=round(len(audio) / SAMPLE_RATE, 2)):
+            result = model.transcribe(audio, **options)
+    
+    segments = []
     for segment in result['segments']:
-        subtitle = SubtitleResponse(
-            text=segment['text'].strip(),
+        entry = {"text": segment['text'].strip(), "start": segment['start'], "end": segment['end']}
+        if options.get("word_timestamps"):
+            entry["words"] = words_from_whisper(segment)
+        segments.append(entry)
+    yield segments
+
+
+def transcribe_audio_segments(
+    blocks: Iterable[np.ndarray],
+    model_name: str = DEFAULT_WHISPER_MODEL,
+    duration: Optional[float] = None,
+    options: dict = TRANSCRIBE_OPTIONS
+) -> List[dict]:
+    """Transcribe streamed audio using Whisper and return raw text/start/end segments"""
+    with span("transcribe", model=model_name) as attributes:
+        chunks = iter_transcript_chunks(blocks, model_name, duration=duration, options=options)
+        segments = [segment for chunk in chunks for segment in chunk]
+        attributes["segments"] = len(segments)
+        return segments
+
+
+def resegment(segments: List[dict], layout: CaptionLayout, end_limit: Optional[float] = None) -> List[dict]:
+    """Re-cut word-timed segments into captions; segments without word timings are kept as-is
+
+    The last caption may stretch into the silence after it, up to end_limit when given
+    (e.g. the video's duration).
+    """
+    captions: List[dict] = []
+    words: List[dict] = []
+    for segment in segments:
+        if segment.get('words'):
+            words.extend(segment['words'])
+            continue
+        if words:
+            captions.extend(resegment_words(words, layout, end_limit=segment['start']))
+            words = []
+        captions.append(segment)
+    if words:
+        captions.extend(resegment_words(words, layout, end_limit=end_limit))
+    return captions
+
+
+def _recut_chunks(
+    chunks: Iterable[List[dict]],
+    segments: List[dict],
+    layout: CaptionLayout,
+    end_limit: Optional[float] = None
+) -> Iterator[List[dict]]:
+    """Re-cut transcript chunks into captions as they arrive, collecting the raw segments
+
+    Chunks end at silences, so each one is re-cut on its own. A chunk's last caption
+    is held back until the next chunk starts, so it can stretch into the silence
+    between them without overlapping the next caption; the very last one stretches
+    up to end_limit.
+    """
+    held = None
+    for chunk in chunks:
+        if not chunk:
+            continue
+        segments.extend(chunk)
+        captions = resegment(chunk, layout, end_limit=chunk[-1]['end'])
+        if held is not None:
+            if held.get('words'):
+                stretch_caption(held, layout, captions[0]['start'])
+            captions.insert(0, held)
+        held = captions.pop()
+        if captions:
+            yield captions
+    if held is not None:
+        if held.get('words'):
+            stretch_caption(held, layout, end_limit)
+        yield [held]
+
+
+def segments_to_subtitles(
+    segments: List[dict],
+    font_size: int = 24,
+    color: str = "white",
+    position: str = "bottom",
+    layout: Optional[CaptionLayout] = None,
+    karaoke: bool = False,
+    end_limit: Optional[float] = None
+) -> List[SubtitleResponse]:
+    """Apply a style to raw transcript segments, re-cutting them to layout when given"""
+    if layout is not None:
+        segments = resegment(segments, layout, end_limit)
+    return [
+        SubtitleResponse(
+            text=segment['text'],
             start_time=segment['start'],
             end_time=segment['end'],
             font_size=font_size,
             color=color,
-            position=position
+            position=position,
+            words=[WordTiming(**word) for word in segment['words']] if segment.get('words') else None,
+            karaoke=karaoke and bool(segment.get('words'))
         )
-        subtitles.append(subtitle)
-    
-    return subtitles
+        for segment in segments
+    ]
+
+
+def transcribe_audio_to_subtitles(
+    blocks: Iterable[np.ndarray],
+    font_size: int = 24,
+    color: str = "white",
+    position: str = "bottom",
+    model_name: str = DEFAULT_WHISPER_MODEL
+) -> List[SubtitleResponse]:
+    """Transcribe audio using Whisper and return subtitle segments"""
+    segments = transcribe_audio_segments(blocks, model_name)
+    return segments_to_subtitles(segments, font_size, color, position)
 
 
 def auto_generate_subtitles(
     video_path: str,
     font_size: int = 24,
     color: str = "white",
-    position: str = "bottom"
+    position: str = "bottom",
+    model_name: str = DEFAULT_WHISPER_MODEL,
+    media: Optional[MediaProfile] = None,
+    word_timestamps: bool = False,
+    karaoke: bool = False,
+    layout: Optional[CaptionLayout] = None
 ) -> List[SubtitleResponse]:
-    """Main function to auto-generate subtitles from video"""
+    """Main function to auto-generate subtitles from video
+
+    word_timestamps re-cuts Whisper's segments into captions that fit layout;
+    karaoke (which implies it) highlights each word as it is spoken.
+    """
     
-    # Create temporary audio file
-    audio_path = video_path.replace('.mp4', '_audio.wav')
+    if media is not None and not media.has_audio:
+        # Nothing to transcribe; don't start ffmpeg just to have it fail
+        return []
     
-    try:
-        # Extract audio
-        extract_audio_from_video(video_path, audio_path)
-        
-        # Transcribe
-        subtitles = transcribe_audio_to_subtitles(audio_path, font_size, color, position)
-        
-        # Clean up audio file
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-        
-        return subtitles
+    word_timestamps = word_timestamps or karaoke
+    options = transcribe_options(word_timestamps)
+    if word_timestamps and layout is None:
+        layout = CaptionLayout()
+    elif not word_timestamps:
+        layout = None
+    # Stretched captions may run into trailing silence, but not past the end of the video
+    end_limit = media.duration if media is not None else None
+    
+    # Same content + model + options means the same transcript, whatever the style
+    cache_key = make_cache_key(hash_file(video_path), model_name, options)
+    segments = transcription_cache.get(cache_key)
+    if segments is not None:
+        print(f"⚡ Transcript cache hit for {video_path}")
+        return segments_to_subtitles(segments, font_size, color, position, layout, karaoke, end_limit)
+    
+    # Audio goes straight from ffmpeg's stdout into Whisper; nothing is written to disk
+    segments = transcribe_audio_segments(
+        stream_audio_from_video(video_path), model_name, duration=media.duration if media else None,
+        options=options
+    )
+    transcription_cache.put(cache_key, segments)
     
-    except Exception as e:
-        # Clean up on error
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-        raise e
+    return segments_to_subtitles(segments, font_size, color, position, layout, karaoke, end_limit)
 
+
+def stream_subtitles(
+    video_path: str,
+    font_size: int = 24,
+    color: str = "white",
+    position: str = "bottom",
+    model_name: str = DEFAULT_WHISPER_MODEL,
+    media: Optional[MediaProfile] = None,
+    word_timestamps: bool = False,
+    karaoke: bool = False,
+    layout: Optional[CaptionLayout] = None
+) -> Iterator[List[SubtitleResponse]]:
+    """Like auto_generate_subtitles, but yields subtitles chunk by chunk as Whisper finishes them"""
+    
+    if media is not None and not media.has_audio:
+        return
+    
+    word_timestamps = word_timestamps or karaoke
+    options = transcribe_options(word_timestamps)
+    if word_timestamps and layout is None:
+        layout = CaptionLayout()
+    elif not word_timestamps:
+        layout = None
+    # Stretched captions may run into trailing silence, but not past the end of the video
+    end_limit = media.duration if media is not None else None
+    
+    cache_key = make_cache_key(hash_file(video_path), model_name, options)
+    segments = transcription_cache.get(cache_key)
+    if segments is not None:
+        print(f"⚡ Transcript cache hit for {video_path}")
+        yield segments_to_subtitles(segments, font_size, color, position, layout, karaoke, end_limit)
+        return
+    
+    segments = []
+    chunks = iter_transcript_chunks(stream_audio_from_video(video_path), model_name, progressive=True, options=options)
+    if layout is None:
+        for chunk in chunks:
+            segments.extend(chunk)
+            yield segments_to_subtitles(chunk, font_size, color, position, karaoke=karaoke)
+    else:
+        for captions in _recut_chunks(chunks, segments, layout, end_limit):
+            yield segments_to_subtitles(captions, font_size, color, position, karaoke=karaoke)
+    
+    # Only a complete transcript is worth caching
+    transcription_cache.put(cache_key, segments)
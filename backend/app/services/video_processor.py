@@ -1,50 +1,217 @@
 import ffmpeg
 import os
-from app.services.subtitle_generator import generate_ass_file
+import uuid
+from typing import Callable, List, Optional, Tuple
+from app.services.subtitle_generator import generate_ass_file, generate_srt_file
+from app.services.ffmpeg_runner import run_ffmpeg
+from app.services.media_probe import probe_media
 from app.models.subtitle import SubtitleResponse
+from app.models.video import MediaProfile
+from app.models.render import RenderProfile
+from app.services.render_profiles import get_render_profile
+
+# Audio codecs that can be stream-copied into an MP4 output
+MP4_COPY_AUDIO_CODECS = {"aac", "mp3", "ac3", "eac3", "alac"}
+
+# Seconds between forced keyframes in rendered output, so players can seek cheaply
+KEYFRAME_INTERVAL_SECONDS = 2
 
 
 def get_video_duration(video_path: str) -> float:
-    """Get video duration in seconds using ffmpeg"""
-    probe = ffmpeg.probe(video_path)
-    duration = float(probe['format']['duration'])
-    return duration
+    """Get video duration in seconds using ffprobe"""
+    return probe_media(video_path).duration
+
+
+def video_encoder_args(media: Optional[MediaProfile] = None,
+                       profile: Optional[RenderProfile] = None) -> Tuple[dict, list]:
+    """libx264 output arguments and scaling filters for the source and render profile
+
+    Returns (output kwargs, filters to run before the subtitle filter, so text is
+    drawn at the output resolution).
+    """
+    profile = profile or get_render_profile()
+    args = {"vcodec": "libx264", "pix_fmt": "yuv420p", "preset": profile.preset, "crf": profile.crf}
+    if profile.threads:
+        args["threads"] = profile.threads
+    if profile.tune:
+        args["tune"] = profile.tune
+    filters = []
+    if media is None:
+        return args, filters
+
+    if profile.max_height and media.height and media.height > profile.max_height:
+        # -2 keeps the aspect ratio with an even width
+        filters.append(f"scale=-2:{profile.max_height - profile.max_height % 2}")
+    elif (media.width or 0) % 2 or (media.height or 0) % 2:
+        # 4:2:0 chroma needs even dimensions; x264 refuses odd ones
+        filters.append("scale=trunc(iw/2)*2:trunc(ih/2)*2")
+    if media.fps:
+        args["g"] = max(1, round(media.fps * KEYFRAME_INTERVAL_SECONDS))
+    if media.video_bit_rate:
+        # Don't let a CRF encode balloon far past the bitrate the source was delivered at
+        args["maxrate"] = media.video_bit_rate * 2
+        args["bufsize"] = media.video_bit_rate * 4
+    return args, filters
+
+
+def audio_encoder_args(media: Optional[MediaProfile] = None) -> dict:
+    """Copy the audio when MP4 can carry it as-is; subtitles never touch the audio"""
+    if media is not None and media.audio_codec in MP4_COPY_AUDIO_CODECS:
+        return {"acodec": "copy"}
+    return {"acodec": "aac"}
 
 
 def burn_subtitles_to_video(
     input_video_path: str,
     subtitles: list[SubtitleResponse],
-    output_video_path: str
+    output_video_path: str,
+    media: Optional[MediaProfile] = None,
+    profile: Optional[RenderProfile] = None,
+    on_progress: Optional[Callable[[float], None]] = None
 ) -> str:
-    """Burn subtitles into video using FFmpeg with ASS format for styling"""
+    """Burn subtitles into video using FFmpeg with ASS format for styling
+
+    on_progress gets the fraction encoded so far, when the duration is known.
+    """
     
     # Generate ASS subtitle file with styling
     ass_file_path = output_video_path.replace('.mp4', '.ass')
-    generate_ass_file(subtitles, ass_file_path)
+    generate_ass_file(subtitles, ass_file_path, media)
+    
+    encoder_args, filters = video_encoder_args(media, profile)
+    encoder_args.update(audio_encoder_args(media))
     
     try:
         # Use FFmpeg to burn subtitles
-        (
+        run_ffmpeg(
             ffmpeg
             .input(input_video_path)
             .output(
                 output_video_path,
-                vf=f"ass={ass_file_path}",
-                vcodec='libx264',
-                acodec='aac',
-                strict='experimental'
+                vf=",".join(filters + [f"ass={ass_file_path}"]),
+                strict='experimental',
+                movflags='+faststart',
+                **encoder_args
             )
-            .overwrite_output()
-            .run(capture_stdout=True, capture_stderr=True)
+            .overwrite_output(),
+            "burn",
+            duration=media.duration if media else None,
+            on_progress=on_progress
         )
         
-        # Clean up ASS file
+        return output_video_path
+    
+    except ffmpeg.Error as e:
+        print(f"FFmpeg error: {e.stderr.decode()}")
+        raise Exception(f"Failed to process video: {e.stderr.decode()}")
+    
+    finally:
+        # Clean up ASS file, also when the render was cancelled
         if os.path.exists(ass_file_path):
             os.remove(ass_file_path)
+
+
+
+def _apply_filters(stream, filters: list):
+    """Apply "name=a:b" filter strings from video_encoder_args to an ffmpeg-python stream"""
+    for spec in filters:
+        name, _, args = spec.partition('=')
+        stream = stream.filter(name, *args.split(':')) if args else stream.filter(name)
+    return stream
+
+
+def burn_subtitle_variants(
+    input_video_path: str,
+    variants: List[Tuple[List[SubtitleResponse], str, RenderProfile]],
+    media: Optional[MediaProfile] = None,
+    on_progress: Optional[Callable[[float], None]] = None
+) -> List[str]:
+    """Render several (subtitles, output path, profile) variants of one source in a single ffmpeg run
+
+    The source is decoded once and fanned out with the split filter, so N variants
+    cost one decode plus N encodes instead of N full passes.
+    """
+    
+    source = ffmpeg.input(input_video_path)
+    video_branches = source.video.filter_multi_output('split', len(variants))
+    has_audio = media is None or media.has_audio
+    audio_args = audio_encoder_args(media)
+    
+    outputs = []
+    ass_file_paths = []
+    for index, (subtitles, output_video_path, profile) in enumerate(variants):
+        encoder_args, filters = video_encoder_args(media, profile)
+        video = _apply_filters(video_branches[index], filters)
+        if subtitles:
+            ass_file_path = output_video_path.replace('.mp4', '.ass')
+            generate_ass_file(subtitles, ass_file_path, media)
+            ass_file_paths.append(ass_file_path)
+            video = video.filter('ass', ass_file_path)
         
-        return output_video_path
+        streams = [video, source.audio] if has_audio else [video]
+        encoder_args.update(audio_args if has_audio else {"an": None})
+        outputs.append(ffmpeg.output(
+            *streams,
+            output_video_path,
+            strict='experimental',
+            movflags='+faststart',
+            **encoder_args
+        ))
+    
+    try:
+        run_ffmpeg(ffmpeg.merge_outputs(*outputs).overwrite_output(), "burn_variants",
+                   duration=media.duration if media else None, on_progress=on_progress)
+        return [output_video_path for _, output_video_path, _ in variants]
     
     except ffmpeg.Error as e:
         print(f"FFmpeg error: {e.stderr.decode()}")
-        raise Exception(f"Failed to process video: {e.stderr.decode()}")
+        raise Exception(f"Failed to render variants: {e.stderr.decode()}")
+    
+    finally:
+        for ass_file_path in ass_file_paths:
+            if os.path.exists(ass_file_path):
+                os.remove(ass_file_path)
 
+
+def mux_soft_subtitles(
+    input_video_path: str,
+    subtitles: list[SubtitleResponse],
+    output_video_path: str
+) -> str:
+    """Add subtitles as a selectable text track, stream-copying audio and video
+    
+    The mux is written next to output_video_path and renamed over it, so responses
+    still reading the previous file finish with consistent bytes.
+    """
+    
+    staging = f"{output_video_path}.{uuid.uuid4().hex}"
+    srt_file_path = f"{staging}.srt"
+    staging_video_path = f"{staging}.tmp.mp4"
+    generate_srt_file(subtitles, srt_file_path)
+    
+    try:
+        # No re-encode: only the container is rewritten
+        run_ffmpeg(
+            ffmpeg
+            .output(
+                ffmpeg.input(input_video_path),
+                ffmpeg.input(srt_file_path),
+                staging_video_path,
+                c='copy',
+                movflags='+faststart',
+                **{'c:s': 'mov_text'}
+            )
+            .overwrite_output(),
+            "mux_subtitles"
+        )
+        os.replace(staging_video_path, output_video_path)
+        return output_video_path
+    
+    except ffmpeg.Error as e:
+        print(f"FFmpeg error: {e.stderr.decode()}")
+        raise Exception(f"Failed to mux subtitles: {e.stderr.decode()}")
+    
+    finally:
+        for path in (srt_file_path, staging_video_path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,124 @@
+import os
+import re
+from typing import Optional
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+RANGE_CHUNK_BYTES = 256 * 1024
+
+BYTES_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """Validator for a file on disk; changes whenever the file is rewritten"""
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def content_disposition(filename: str, attachment: bool = False) -> str:
+    """Content-Disposition value that survives latin-1 header encoding
+
+    Names that need quoting (non-ASCII, spaces, quotes) are sent RFC 5987-encoded,
+    the same way Starlette's FileResponse does it.
+    """
+    disposition = "attachment" if attachment else "inline"
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+def _parse_range(header: str, size: int) -> Optional[tuple]:
+    """(start, end) inclusive for a single byte range, or None if unsatisfiable
+
+    Multi-range requests aren't worth a multipart response for video; they get the
+    first range only when it parses, as browsers never send them for media.
+    """
+    match = BYTES_RANGE_RE.match(header.split(",")[0].strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if first == "":
+        if last == "":
+            return None
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _iter_file(f, start: int, length: int):
+    # A sync generator runs in the threadpool, so reads don't block the event loop
+    with f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = f.read(min(RANGE_CHUNK_BYTES, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def ranged_file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    filename: Optional[str] = None,
+    attachment: bool = False,
+    cache_control: str = "no-cache"
+) -> Response:
+    """Serve a file with ETag/If-None-Match revalidation and single-range 206 responses"""
+
+    # Headers come from the opened file, so they match the bytes streamed even if
+    # the path is replaced (e.g. by a newer preview mux) while the response runs
+    f = open(path, "rb")
+    stat = os.fstat(f.fileno())
+    size = stat.st_size
+    etag = file_etag(stat)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": cache_control,
+    }
+    if filename:
+        headers["Content-Disposition"] = content_disposition(filename, attachment)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        f.close()
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            f.close()
+            return Response(status_code=416, headers=headers)
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        if request.method == "HEAD":
+            f.close()
+            return Response(status_code=206, media_type=media_type, headers=headers)
+        return StreamingResponse(
+            _iter_file(f, start, end - start + 1),
+            status_code=206,
+            media_type=media_type,
+            headers=headers
+        )
+
+    headers["Content-Length"] = str(size)
+    if request.method == "HEAD":
+        f.close()
+        return Response(status_code=200, media_type=media_type, headers=headers)
+    return StreamingResponse(_iter_file(f, 0, size), media_type=media_type, headers=headers)
@@ -0,0 +1,5 @@
+"""End-to-end benchmarks for the upload, parse, transcribe, burn, preview and export paths
+
+Run from backend/:  python -m benchmarks --suite quick
+Compare two runs:   python -m benchmarks.compare base.json new.json
+"""
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# Bump when the result layout changes so compare.py can refuse mismatched files
+RESULTS_SCHEMA = 1
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _ffmpeg_version() -> str:
+    try:
+        output = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True).stdout
+        return output.splitlines()[0] if output else "unknown"
+    except OSError:
+        return "missing"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument("--suite", choices=["quick", "full"], default="quick")
+    parser.add_argument("--stages", default="upload,parse,transcribe,burn,preview,export,timeline",
+                        help="comma-separated subset of upload, parse, transcribe, burn, preview, export, timeline")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; times are medians")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--whisper-model", default="tiny")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the stub LLM sleeps per call")
+    args = parser.parse_args()
+
+    # Isolate the run: its own session store, uploads, outputs and caches, and no background work
+    workdir = tempfile.mkdtemp(prefix="video-editor-bench-")
+    os.environ.update({
+        "SESSION_STORE_URL": f"sqlite:///{os.path.join(workdir, 'sessions.db')}",
+        "TRANSCRIPT_CACHE_DIR": os.path.join(workdir, "cache", "transcripts"),
+        "WHISPER_PRELOAD_MODELS": "",
+        "AUTO_RENDER_PROFILE": "",
+        "TIMELINE_ASSETS_ON_UPLOAD": "0",
+        "TRACE_LOG": "0",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    from benchmarks.media import SUITES, synthetic_video
+    specs = SUITES[args.suite]
+    print(f"🎞️  Generating {len(specs)} synthetic videos...")
+    paths = {spec.name: synthetic_video(spec) for spec in specs}
+
+    # The app resolves uploads/ and outputs/ against the working directory at import
+    os.chdir(workdir)
+    from benchmarks.stages import STAGES, BenchContext, run_stages
+    from benchmarks.stubs import StubLLM
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    ctx = BenchContext(args.repeat, StubLLM(args.llm_latency), args.whisper_model)
+    started = time.time()
+    try:
+        run_stages(ctx, stages, specs, paths)
+    finally:
+        ctx.client.close()
+
+    commit = _git_commit()
+    report = {
+        "schema": RESULTS_SCHEMA,
+        "commit": commit,
+        "created_at": started,
+        "suite": args.suite,
+        "repeat": args.repeat,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "ffmpeg": _ffmpeg_version(),
+            "whisper_model": args.whisper_model,
+            "llm_latency_s": args.llm_latency,
+        },
+        "media": [spec._asdict() for spec in specs],
+        "results": ctx.results,
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{commit}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(started))}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📊 Results written to {output}")
+
+    return 1 if any("error" in result for result in ctx.results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Compare two benchmark result files and flag regressions
+
+python -m benchmarks.compare base.json new.json [--threshold 0.10] [--metric wall_s]
+Exits 1 when any case got slower (or bigger) than the threshold allows.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Tuple
+
+METRICS = ("wall_s", "cpu_s", "peak_rss_mb")
+
+
+def _load(path: str) -> Tuple[dict, Dict[str, dict]]:
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    cases = {
+        f"{result['stage']}/{result['case']}/{result['media']}": result
+        for result in report["results"]
+        if "skipped" not in result and "error" not in result
+    }
+    return report, cases
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--metric", choices=METRICS, action="append",
+                        help="metric(s) to check; defaults to wall_s")
+    args = parser.parse_args()
+    metrics = args.metric or ["wall_s"]
+
+    base_report, base = _load(args.base)
+    new_report, new = _load(args.new)
+    if base_report.get("schema") != new_report.get("schema"):
+        print("❌ Result files use different schemas; rerun the base benchmark")
+        return 2
+
+    print(f"base {base_report['commit']}  ->  new {new_report['commit']}  (threshold {args.threshold:.0%})")
+    regressions = 0
+    for key in sorted(base.keys() & new.keys()):
+        for metric in metrics:
+            before, after = base[key][metric], new[key][metric]
+            change = (after - before) / before if before else 0.0
+            flag = ""
+            if change > args.threshold:
+                flag = "  ⚠️ regression"
+                regressions += 1
+            elif change < -args.threshold:
+                flag = "  ✅ faster"
+            print(f"{key:<50} {metric:<12} {before:10.3f} -> {after:10.3f}  {change:+7.1%}{flag}")
+
+    for key in sorted(base.keys() - new.keys()):
+        print(f"{key:<50} missing from new run")
+    for key in sorted(new.keys() - base.keys()):
+        print(f"{key:<50} new case")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
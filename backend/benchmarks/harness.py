@@ -0,0 +1,134 @@
+import os
+import resource
+import statistics
+import threading
+import time
+from typing import Callable, List, Optional
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# How often the RSS sampler looks at this process and its children
+RSS_SAMPLE_SECONDS = 0.005
+
+
+def _statm_rss(pid: str) -> int:
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+
+def _child_pids() -> List[str]:
+    pids = []
+    for tid in os.listdir("/proc/self/task"):
+        try:
+            with open(f"/proc/self/task/{tid}/children") as f:
+                pids.extend(f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def tree_rss() -> Optional[int]:
+    """Resident bytes of this process plus its direct children (ffmpeg, Whisper workers)
+
+    None where /proc isn't available; callers fall back to getrusage's lifetime peak.
+    """
+    try:
+        total = _statm_rss("self")
+    except OSError:
+        return None
+    for pid in _child_pids():
+        try:
+            total += _statm_rss(pid)
+        except OSError:
+            # The child exited between listing and reading
+            pass
+    return total
+
+
+class RssSampler(threading.Thread):
+    """Tracks the peak of tree_rss() while a stage runs"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = tree_rss() or 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(RSS_SAMPLE_SECONDS):
+            rss = tree_rss()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+def _cpu_seconds() -> float:
+    """User + system time of this process and every child it has waited for"""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def _maxrss_bytes() -> int:
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    scale = 1 if os.uname().sysname == "Darwin" else 1024
+    return max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)) * scale
+
+
+def measure(fn: Callable[[], object]) -> dict:
+    """Run fn once and return its wall time, CPU time and peak RSS"""
+    sampler = RssSampler() if tree_rss() is not None else None
+    if sampler is not None:
+        sampler.start()
+    cpu_start = _cpu_seconds()
+    wall_start = time.perf_counter()
+    try:
+        fn()
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = _cpu_seconds() - cpu_start
+        peak = sampler.stop() if sampler is not None else _maxrss_bytes()
+    return {"wall_s": wall, "cpu_s": cpu, "peak_rss_mb": peak / (1024 * 1024)}
+
+
+def run_case(stage: str, case: str, media: Optional[str], fn: Callable[[], object], repeat: int,
+             units: float = 0.0, unit: Optional[str] = None, setup: Optional[Callable[[], None]] = None) -> dict:
+    """Measure a case repeat times; times are medians, peak RSS is the maximum
+
+    units is the amount of work one run does (bytes, media seconds, prompts...), so
+    throughput is units per wall-clock second.
+    """
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        runs.append(measure(fn))
+
+    wall = statistics.median(run["wall_s"] for run in runs)
+    result = {
+        "stage": stage,
+        "case": case,
+        "media": media,
+        "repeat": repeat,
+        "wall_s": wall,
+        "cpu_s": statistics.median(run["cpu_s"] for run in runs),
+        "peak_rss_mb": max(run["peak_rss_mb"] for run in runs),
+        "runs_wall_s": [run["wall_s"] for run in runs],
+        "units": units,
+        "unit": unit,
+        "throughput": units / wall if units and wall > 0 else None,
+    }
+    throughput = f"{result['throughput']:.2f} {unit}/s" if result["throughput"] else "-"
+    print(f"⏱️  {stage:<10} {case:<22} {media or '-':<14} "
+          f"wall {wall:8.3f}s  cpu {result['cpu_s']:8.3f}s  rss {result['peak_rss_mb']:8.1f}MB  {throughput}")
+    return result
+
+
+def skipped(stage: str, case: str, media: Optional[str], reason: str) -> dict:
+    print(f"⏭️  {stage:<10} {case:<22} {media or '-':<14} skipped: {reason}")
+    return {"stage": stage, "case": case, "media": media, "skipped": reason}
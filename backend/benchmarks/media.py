@@ -0,0 +1,50 @@
+import os
+from typing import Dict, List, NamedTuple
+import ffmpeg
+
+MEDIA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".media")
+
+
+class MediaSpec(NamedTuple):
+    name: str
+    seconds: float
+    width: int
+    height: int
+    fps: int = 30
+
+
+# quick runs in well under a minute; full covers longer, larger and portrait sources
+SUITES: Dict[str, List[MediaSpec]] = {
+    "quick": [
+        MediaSpec("short_360p", 10, 640, 360),
+    ],
+    "full": [
+        MediaSpec("short_360p", 10, 640, 360),
+        MediaSpec("medium_720p", 30, 1280, 720),
+        MediaSpec("long_1080p", 60, 1920, 1080),
+        MediaSpec("portrait_720p", 20, 720, 1280),
+    ],
+}
+
+
+def synthetic_video(spec: MediaSpec) -> str:
+    """testsrc2 picture plus a sine tone, encoded like a typical phone upload; reused across runs"""
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    path = os.path.join(MEDIA_DIR, f"{spec.name}_{spec.seconds:g}s_{spec.width}x{spec.height}.mp4")
+    if os.path.exists(path):
+        return path
+
+    video = ffmpeg.input(
+        f"testsrc2=size={spec.width}x{spec.height}:rate={spec.fps}:duration={spec.seconds}", f="lavfi"
+    )
+    audio = ffmpeg.input(f"sine=frequency=440:sample_rate=48000:duration={spec.seconds}", f="lavfi")
+    staging = path + ".part.mp4"
+    (
+        ffmpeg
+        .output(video, audio, staging, vcodec="libx264", preset="veryfast", pix_fmt="yuv420p",
+                g=spec.fps * 2, acodec="aac", audio_bitrate="128k", shortest=None, movflags="+faststart")
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    os.replace(staging, path)
+    return path
@@ -0,0 +1,288 @@
+import asyncio
+import os
+from typing import Callable, Dict, List
+
+import httpx
+
+from app.main import app
+from app.langgraph_flows import subtitle_flow
+from app.langgraph_flows.prompt_cache import PromptParseCache
+from app.models.subtitle import SubtitleResponse
+from app.services.media_probe import ensure_media_profile
+from app.services.render_profiles import get_render_profile
+from app.services.segment_renderer import clear_segment_cache
+from app.services.session_store import session_store
+from app.services.subtitle_generator import generate_srt_content
+from app.services.timeline_assets import asset_key, build_timeline_assets, clear_timeline_assets
+from app.services.transcription_service import auto_generate_subtitles, stream_audio_from_video, transcribe_audio_segments
+from app.services.video_processor import burn_subtitles_to_video
+from benchmarks.harness import run_case, skipped
+from benchmarks.media import MediaSpec
+from benchmarks.stubs import StubLLM
+
+# Prompts the rule parser understands, and ones it hands to the (stubbed) LLM
+RULE_PROMPTS = [
+    "add 'Hello world' at 2s, red, 30px",
+    "show 'Welcome' at top in blue for 3 seconds",
+    "add subtitle 'Chapter one' from 0:05 to 0:09",
+    "generate subtitles in yellow, 28px",
+]
+LLM_PROMPTS = [
+    "could you pop 'Nice shot' up around {n} seconds",
+    "I'd like the words 'See you' near second {n}, nothing fancy",
+    "somewhere about {n}s drop in 'Thanks for watching'",
+    "please caption the moment at {n} seconds with 'Boom'",
+]
+
+
+class AppClient:
+    """Drives the FastAPI app in-process through httpx's ASGI transport, with no network or server"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None
+        )
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        response = self.loop.run_until_complete(self.client.request(method, url, **kwargs))
+        response.raise_for_status()
+        return response
+
+    def close(self) -> None:
+        self.loop.run_until_complete(self.client.aclose())
+        self.loop.close()
+
+
+class BenchContext:
+    def __init__(self, repeat: int, llm: StubLLM, whisper_model: str):
+        self.repeat = repeat
+        self.llm = llm
+        self.whisper_model = whisper_model
+        self.client = AppClient()
+        self.results: List[dict] = []
+        # media name -> session used by the stages after upload
+        self.sessions: Dict[str, str] = {}
+
+    def record(self, result: dict) -> None:
+        self.results.append(result)
+
+    def session_for(self, spec: MediaSpec, path: str) -> str:
+        if spec.name not in self.sessions:
+            with open(path, "rb") as f:
+                response = self.client.request("POST", "/api/upload/stream", params={"filename": os.path.basename(path)},
+                                               content=f.read(), headers={"content-type": "video/mp4"})
+            self.sessions[spec.name] = response.json()["video_id"]
+        return self.sessions[spec.name]
+
+
+def sample_subtitles(seconds: float, every: float = 2.0) -> List[SubtitleResponse]:
+    """A caption every couple of seconds, alternating styles so the ASS file has several"""
+    subtitles = []
+    start = 0.0
+    index = 0
+    while start < seconds:
+        subtitles.append(SubtitleResponse(
+            text=f"Benchmark caption number {index}",
+            start_time=start,
+            end_time=min(seconds, start + every * 0.9),
+            font_size=24 if index % 2 else 32,
+            color="white" if index % 3 else "yellow",
+            position="bottom" if index % 4 else "top"
+        ))
+        start += every
+        index += 1
+    return subtitles
+
+
+def bench_upload(ctx: BenchContext, spec: MediaSpec, path: str) -> None:
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    with open(path, "rb") as f:
+        data = f.read()
+    filename = os.path.basename(path)
+    uploaded: List[str] = []
+
+    def forget_previous():
+        # Delete the last upload so the next one isn't served by content-hash dedup
+        while uploaded:
+            ctx.client.request("DELETE", f"/api/video/{uploaded.pop()}")
+
+    def multipart():
+        response = ctx.client.request("POST", "/api/upload", files={"file": (filename, data, "video/mp4")})
+        uploaded.append(response.json()["video_id"])
+
+    def stream():
+        response = ctx.client.request("POST", "/api/upload/stream", params={"filename": filename},
+                                      content=data, headers={"content-type": "video/mp4"})
+        uploaded.append(response.json()["video_id"])
+
+    ctx.record(run_case("upload", "multipart", spec.name, multipart, ctx.repeat, size_mb, "MB", setup=forget_previous))
+    ctx.record(run_case("upload", "stream", spec.name, stream, ctx.repeat, size_mb, "MB", setup=forget_previous))
+    forget_previous()
+
+    # Same bytes again: the dedup path keeps the first session's media and profile
+    stream()
+    ctx.record(run_case("upload", "stream_dedup", spec.name, stream, ctx.repeat, size_mb, "MB"))
+    forget_previous()
+
+
+def bench_parse(ctx: BenchContext, spec: MediaSpec, path: str) -> None:
+    duration = spec.seconds
+    counter = iter(range(10 ** 9))
+
+    def rules():
+        for prompt in RULE_PROMPTS:
+            subtitle_flow.parse_subtitle_prompt(prompt, duration)
+
+    def reset_prompt_cache():
+        subtitle_flow.prompt_cache = PromptParseCache()
+
+    def llm_cold():
+        n = next(counter)
+        for template in LLM_PROMPTS:
+            subtitle_flow.parse_subtitle_prompt(template.format(n=n % 9 + 1), duration)
+
+    def llm_cached():
+        for template in LLM_PROMPTS:
+            subtitle_flow.parse_subtitle_prompt(template.format(n=1), duration)
+
+    def batch():
+        prompts = [" and ".join(RULE_PROMPTS[:3])] + [template.format(n=2) for template in LLM_PROMPTS]
+        subtitle_flow.parse_subtitle_prompts(prompts, duration)
+
+    prompts = len(RULE_PROMPTS)
+    ctx.record(run_case("parse", "rules", spec.name, rules, ctx.repeat, prompts, "prompts"))
+    ctx.record(run_case("parse", "llm_cold", spec.name, llm_cold, ctx.repeat, len(LLM_PROMPTS), "prompts",
+                        setup=reset_prompt_cache))
+    llm_cached()
+    ctx.record(run_case("parse", "llm_cached", spec.name, llm_cached, ctx.repeat, len(LLM_PROMPTS), "prompts"))
+    ctx.record(run_case("parse", "batch", spec.name, batch, ctx.repeat, 3 + len(LLM_PROMPTS), "prompts",
+                        setup=reset_prompt_cache))
+
+
+def bench_transcribe(ctx: BenchContext, spec: MediaSpec, path: str) -> None:
+    try:
+        import whisper  # noqa: F401
+    except ImportError:
+        ctx.record(skipped("transcribe", "cold", spec.name, "openai-whisper is not installed"))
+        return
+
+    def cold():
+        # The cache-free core of auto_generate_subtitles: decode over a pipe and transcribe
+        transcribe_audio_segments(stream_audio_from_video(path), ctx.whisper_model, duration=spec.seconds)
+
+    def cached():
+        auto_generate_subtitles(path, model_name=ctx.whisper_model)
+
+    # Load the model outside the timed runs
+    cold()
+    ctx.record(run_case("transcribe", "cold", spec.name, cold, ctx.repeat, spec.seconds, "media_s"))
+    cached()
+    ctx.record(run_case("transcribe", "cached", spec.name, cached, ctx.repeat, spec.seconds, "media_s"))
+
+
+def bench_burn(ctx: BenchContext, spec: MediaSpec, path: str) -> None:
+    video_id = ctx.session_for(spec, path)
+    media = ensure_media_profile(session_store.get(video_id))
+    subtitles = sample_subtitles(spec.seconds)
+    output_path = os.path.join("outputs", f"bench_{spec.name}.mp4")
+
+    for profile_name in ("draft", "preview", "final"):
+        profile = get_render_profile(profile_name)
+        ctx.record(run_case(
+            "burn", profile_name, spec.name,
+            lambda: burn_subtitles_to_video(path, subtitles, output_path, media, profile),
+            ctx.repeat, spec.seconds, "media_s"
+        ))
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+
+def bench_preview(ctx: BenchContext, spec: MediaSpec, path: str) -> None:
+    video_id = ctx.session_for(spec, path)
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+
+    def full():
+        ctx.client.request("GET", f"/api/preview/{video_id}")
+
+    def first_megabyte():
+        ctx.client.request("GET", f"/api/preview/{video_id}", headers={"Range": "bytes=0-1048575"})
+
+    def vtt():
+        ctx.client.request("GET", f"/api/preview/{video_id}/subtitles.vtt")
+
+    ctx.record(run_case("preview", "full", spec.name, full, ctx.repeat, size_mb, "MB"))
+    ctx.record(run_case("preview", "range_1mb", spec.name, first_megabyte, ctx.repeat, 1, "requests"))
+    ctx.record(run_case("preview", "subtitles_vtt", spec.name, vtt, ctx.repeat, 1, "requests"))
+
+
+def bench_export(ctx: BenchContext, spec: MediaSpec, path: str) -> None:
+    video_id = ctx.session_for(spec, path)
+    subtitles = sample_subtitles(spec.seconds)
+    ctx.client.request("POST", f"/api/subtitles/{video_id}/import", params={"replace": "true"},
+                       files={"file": ("bench.srt", generate_srt_content(subtitles).encode(), "application/x-subrip")})
+
+    def invalidate():
+        # A new revision and no cached segments: the next export renders from scratch
+        clear_segment_cache(video_id)
+        session_store.update(video_id, lambda stored: setattr(stored, "revision", stored.revision + 1))
+
+    def touch_one_caption():
+        # One edited caption: only the segments it overlaps are re-encoded
+        def mutate(stored):
+            stored.edits[-1].subtitles[0].text += "!"
+            stored.revision += 1
+        session_store.update(video_id, mutate)
+
+    def export(profile: str) -> Callable[[], None]:
+        return lambda: ctx.client.request("GET", f"/api/export/{video_id}", params={"profile": profile})
+
+    for profile in ("draft", "final"):
+        ctx.record(run_case("export", f"{profile}_cold", spec.name, export(profile), ctx.repeat,
+                            spec.seconds, "media_s", setup=invalidate))
+        ctx.record(run_case("export", f"{profile}_one_edit", spec.name, export(profile), ctx.repeat,
+                            spec.seconds, "media_s", setup=touch_one_caption))
+        ctx.record(run_case("export", f"{profile}_cached", spec.name, export(profile), ctx.repeat,
+                            spec.seconds, "media_s"))
+
+
+def bench_timeline(ctx: BenchContext, spec: MediaSpec, path: str) -> None:
+    video_id = ctx.session_for(spec, path)
+    session = session_store.get(video_id)
+    key = asset_key(session.content_hash, video_id)
+
+    def build():
+        # Sprite and waveform from one decode of the source
+        build_timeline_assets(key, path, session.media)
+
+    def overview():
+        ctx.client.request("GET", f"/api/timeline/{video_id}/overview")
+
+    ctx.record(run_case("timeline", "build", spec.name, build, ctx.repeat, spec.seconds, "media_s",
+                        setup=lambda: clear_timeline_assets(key)))
+    ctx.record(run_case("timeline", "overview", spec.name, overview, ctx.repeat, 1, "requests"))
+
+
+STAGES: Dict[str, Callable[[BenchContext, MediaSpec, str], None]] = {
+    "upload": bench_upload,
+    "parse": bench_parse,
+    "transcribe": bench_transcribe,
+    "burn": bench_burn,
+    "preview": bench_preview,
+    "export": bench_export,
+    "timeline": bench_timeline,
+}
+
+
+def run_stages(ctx: BenchContext, stages: List[str], media: List[MediaSpec], paths: Dict[str, str],
+               parse_once: bool = True) -> None:
+    """Run each stage over each media file; parsing doesn't depend on the media, so it runs once"""
+    subtitle_flow.set_llm(ctx.llm)
+    for stage in stages:
+        specs = media[:1] if stage == "parse" and parse_once else media
+        for spec in specs:
+            try:
+                STAGES[stage](ctx, spec, paths[spec.name])
+            except Exception as e:
+                print(f"❌ {stage} on {spec.name} failed: {str(e)}")
+                ctx.record({"stage": stage, "case": None, "media": spec.name, "error": str(e)})
@@ -0,0 +1,53 @@
+import json
+import re
+import time
+
+QUOTED_RE = re.compile(r"'([^']+)'|\"([^\"]+)\"")
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+class StubResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class StubLLM:
+    """Answers extraction prompts locally so parse benchmarks don't depend on the network
+
+    Picks quoted text and the first number out of the prompt; latency simulates the
+    round trip so the cache and batching paths can be compared against it.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = messages[-1].content
+        is_batch = "numbered list of commands" in messages[0].content
+
+        edits = []
+        commands = prompt.splitlines() if is_batch else [prompt]
+        for number, command in enumerate(commands, start=1):
+            quoted = QUOTED_RE.search(command)
+            numbers = NUMBER_RE.findall(command.split(".", 1)[-1] if is_batch else command)
+            start = float(numbers[0]) if numbers else 0.0
+            edits.append({
+                "command": number,
+                "text": next(group for group in quoted.groups() if group) if quoted else None,
+                "auto_generate": quoted is None,
+                "start_time": start,
+                "end_time": start + 5,
+                "font_size": 24,
+                "color": "white",
+                "position": "bottom",
+            })
+
+        if is_batch:
+            return StubResponse(json.dumps({"edits": edits}))
+        edit = edits[0]
+        edit.pop("command")
+        return StubResponse(json.dumps(edit))
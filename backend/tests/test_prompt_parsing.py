@@ -0,0 +1,70 @@
+import pytest
+
+from app.langgraph_flows import subtitle_flow
+from app.langgraph_flows.prompt_cache import PromptParseCache
+from app.langgraph_flows.rule_parser import parse_prompt_with_rules
+from app.langgraph_flows.subtitle_flow import parse_subtitle_prompt, set_llm
+from benchmarks.stubs import StubLLM
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    """A local LLM and an empty prompt cache, both restored after the test"""
+    monkeypatch.setattr(subtitle_flow, "_llm", None)
+    monkeypatch.setattr(subtitle_flow, "prompt_cache", PromptParseCache())
+    stub = StubLLM()
+    set_llm(stub)
+    return stub
+
+
+def test_rules_parse_a_fully_specified_prompt(stub_llm):
+    params = parse_subtitle_prompt("add 'Hello' at 5s, 26px, red, top", 60)
+
+    assert params == {
+        "text": "Hello",
+        "auto_generate": False,
+        "start_time": 5.0,
+        "end_time": 10.0,
+        "font_size": 26,
+        "color": "red",
+        "position": "top",
+    }
+    assert stub_llm.calls == 0
+
+
+def test_rules_ignore_times_inside_quoted_text(stub_llm):
+    params = parse_subtitle_prompt("add 'Meet me at 5s' at 10s", 60)
+
+    assert params["text"] == "Meet me at 5s"
+    assert (params["start_time"], params["end_time"]) == (10.0, 15.0)
+    assert stub_llm.calls == 0
+
+
+@pytest.mark.parametrize("prompt", [
+    "add 'Hello' at 5s and make it bigger",
+    "add 'Hello' at 5s in dark red",
+])
+def test_rules_defer_to_the_llm_on_words_they_dont_understand(stub_llm, prompt):
+    assert parse_prompt_with_rules(prompt, 60) is None
+
+    params = parse_subtitle_prompt(prompt, 60)
+
+    assert params["text"] == "Hello"
+    assert stub_llm.calls == 1
+
+
+def test_prompt_cache_answers_a_repeated_llm_prompt(stub_llm):
+    first = parse_subtitle_prompt("add 'Hello' at 5s and make it bigger", 60)
+    # Case, spacing and trailing punctuation outside the quotes don't matter
+    second = parse_subtitle_prompt("Add 'Hello' at 5s  and make it bigger!", 60)
+
+    assert second == first
+    assert stub_llm.calls == 1
+    assert subtitle_flow.prompt_cache.stats()["exact_hits"] == 1
+
+
+def test_prompt_cache_is_keyed_by_duration_bucket(stub_llm):
+    parse_subtitle_prompt("add 'Hello' at 5s and make it bigger", 60)
+    parse_subtitle_prompt("add 'Hello' at 5s and make it bigger", 600)
+
+    assert stub_llm.calls == 2
@@ -0,0 +1,60 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.utils.range_response import ranged_file_response
+
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(DATA)
+    app = FastAPI()
+
+    @app.api_route("/clip", methods=["GET", "HEAD"])
+    async def clip(request: Request):
+        return ranged_file_response(request, str(path), media_type="video/mp4", filename="clip.mp4")
+
+    return TestClient(app)
+
+
+def test_range_request_returns_the_slice(client):
+    response = client.get("/clip", headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 10-19/{len(DATA)}"
+    assert response.content == DATA[10:20]
+
+
+@pytest.mark.parametrize("headers, status, length", [
+    ([], 200, len(DATA)),
+    ([(b"range", b"bytes=10-19")], 206, 10),
+])
+def test_head_has_headers_but_no_body(tmp_path, headers, status, length):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(DATA)
+    # HTTP clients drop HEAD bodies themselves, so check the response object directly
+    request = Request({"type": "http", "method": "HEAD", "headers": headers})
+
+    response = ranged_file_response(request, str(path), media_type="video/mp4")
+
+    assert response.status_code == status
+    assert response.headers["content-length"] == str(length)
+    assert not isinstance(response, StreamingResponse)
+    assert response.body == b""
+
+
+def test_matching_etag_is_not_modified(client):
+    etag = client.head("/clip").headers["etag"]
+
+    assert client.get("/clip", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_unsatisfiable_range(client):
+    response = client.get("/clip", headers={"Range": f"bytes={len(DATA)}-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DATA)}"
@@ -0,0 +1,121 @@
+import io
+
+import pytest
+
+from app.api.subtitles import _read_subtitles
+from app.models.subtitle import SubtitleResponse
+from app.services.subtitle_generator import generate_srt_content, generate_vtt_content, write_ass_file
+from app.services.timeline import build_timeline
+
+SUBTITLES = [
+    SubtitleResponse(text="Hello & welcome", start_time=0.5, end_time=2.25, font_size=24, color="yellow",
+                     position="top"),
+    SubtitleResponse(text="Two\nlines", start_time=3.0, end_time=5.0, font_size=36, color="red",
+                     position="center"),
+    SubtitleResponse(text="The end", start_time=61.125, end_time=3725.5, font_size=24, color="white",
+                     position="bottom"),
+]
+
+
+def read(data: bytes, filename: str):
+    """Parse a file's bytes the way the import endpoint does"""
+    return _read_subtitles(io.BytesIO(data), filename, None, 24, "white", "bottom")
+
+
+def cues(subtitles):
+    return [(s.text, s.start_time, s.end_time) for s in subtitles]
+
+
+def styles(subtitles):
+    return [(s.font_size, s.color, s.position) for s in subtitles]
+
+
+@pytest.mark.parametrize("bom", [b"", b"\xef\xbb\xbf"])
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_srt_round_trip(bom, newline):
+    data = bom + generate_srt_content(SUBTITLES).replace("\n", newline).encode()
+
+    subtitle_format, parsed = read(data, "clip.srt")
+
+    assert subtitle_format == "srt"
+    assert cues(parsed) == cues(SUBTITLES)
+    # SRT carries no styling, so the import defaults apply
+    assert styles(parsed) == [(24, "white", "bottom")] * 3
+
+
+@pytest.mark.parametrize("bom", [b"", b"\xef\xbb\xbf"])
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_vtt_round_trip(bom, newline):
+    data = bom + generate_vtt_content(SUBTITLES).replace("\n", newline).encode()
+
+    # Detected from the header even without the extension
+    subtitle_format, parsed = read(data, "clip")
+
+    assert subtitle_format == "vtt"
+    assert cues(parsed) == cues(SUBTITLES)
+    # Color and line position survive; WebVTT can't carry font size
+    assert [(s.color, s.position) for s in parsed] == [(s.color, s.position) for s in SUBTITLES]
+
+
+@pytest.mark.parametrize("bom", [b"", b"\xef\xbb\xbf"])
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_ass_round_trip(tmp_path, bom, newline):
+    path = write_ass_file(build_timeline(SUBTITLES), str(tmp_path / "clip.ass"))
+    with open(path, "rb") as f:
+        data = bom + f.read().replace(b"\n", newline.encode())
+
+    subtitle_format, parsed = read(data, "clip.ass")
+
+    assert subtitle_format == "ass"
+    # ASS times are in centiseconds
+    assert [s.text for s in parsed] == [s.text for s in SUBTITLES]
+    assert [(s.start_time, s.end_time) for s in parsed] == [
+        (pytest.approx(s.start_time, abs=0.01), pytest.approx(s.end_time, abs=0.01)) for s in SUBTITLES
+    ]
+    assert styles(parsed) == styles(SUBTITLES)
+
+
+def test_vtt_cue_settings_set_position():
+    data = (
+        "WEBVTT\n\n"
+        "NOTE settings other than line are ignored\n\n"
+        "00:01.000 --> 00:02.000 align:start line:0\nfirst\n\n"
+        "00:02.000 --> 00:03.000 position:10% line:-1\nsecond\n\n"
+        "00:03.000 --> 00:04.000 line:45%,center size:80%\nthird\n\n"
+        "00:04.000 --> 00:05.000 align:end\n<font color=\"#ff0000\">fourth</font>\n"
+    ).encode()
+
+    _, parsed = read(data, "clip.vtt")
+
+    assert [s.text for s in parsed] == ["first", "second", "third", "fourth"]
+    assert [s.position for s in parsed] == ["top", "bottom", "center", "bottom"]
+    assert parsed[3].color == "red"
+
+
+def test_srt_alignment_marker_and_tags():
+    data = "1\n00:00:01,000 --> 00:00:02,500\n{\\an8}<i>Up</i> <b>here</b>\n".encode()
+
+    _, parsed = read(data, "clip.srt")
+
+    assert cues(parsed) == [("Up here", 1.0, 2.5)]
+    assert parsed[0].position == "top"
+
+
+def test_ass_override_tags_win_over_the_style():
+    data = (
+        "[Script Info]\nPlayResY: 720\n\n"
+        "[V4+ Styles]\n"
+        "Format: Name, Fontname, Fontsize, PrimaryColour, Alignment\n"
+        "Style: Default,Arial,40,&H00FFFFFF,2\n\n"
+        "[Events]\n"
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+        "Dialogue: 0,0:00:01.00,0:00:02.00,Default,,0,0,0,,Plain, with a comma\n"
+        "Dialogue: 0,0:00:02.00,0:00:03.00,Default,,0,0,0,,{\\an8\\fs60\\c&H0000FF&\\b1}Loud\\Nred\n"
+        "Dialogue: 0,0:00:03.00,0:00:04.00,Default,,0,0,0,,{\\a6}Legacy{\\i1} top\\hleft\n"
+    ).encode()
+
+    _, parsed = read(data, "clip.ass")
+
+    assert [s.text for s in parsed] == ["Plain, with a comma", "Loud\nred", "Legacy top left"]
+    # Sizes are scaled from the script's 720 lines to the 1080-line reference
+    assert styles(parsed) == [(60, "white", "bottom"), (90, "red", "top"), (60, "white", "top")]
@@ -4,6 +4,7 @@ import { sendChatMessage } from '../services/api';
 function ChatInterface({ videoId, onSubtitleAdded }) {
   const [prompt, setPrompt] = useState('');
   const [loading, setLoading] = useState(false);
+  const [stage, setStage] = useState(null);
   const [error, setError] = useState(null);
   const [messages, setMessages] = useState([]);
 
@@ -18,7 +19,7 @@ function ChatInterface({ videoId, onSubtitleAdded }) {
     setMessages([...messages, { type: 'user', text: prompt }]);
 
     try {
-      const result = await sendChatMessage(videoId, prompt);
+      const result = await sendChatMessage(videoId, prompt, (job) => setStage(job.stage));
       
       // Add bot response
       setMessages(prev => [...prev, { 
@@ -34,6 +35,7 @@ function ChatInterface({ videoId, onSubtitleAdded }) {
       setMessages(prev => [...prev, { type: 'error', text: 'Error: ' + err.message }]);
     } finally {
       setLoading(false);
+      setStage(null);
     }
   };
 
@@ -71,7 +73,7 @@ function ChatInterface({ videoId, onSubtitleAdded }) {
           disabled={loading || !videoId}
         />
         <button type="submit" disabled={loading || !videoId}>
-          {loading ? 'Processing...' : 'Send'}
+          {loading ? `${stage ? stage : 'Processing'}...` : 'Send'}
         </button>
       </form>
 
@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import { getPreviewUrl } from '../services/api';
+import { getPreviewUrl, getSubtitlesUrl } from '../services/api';
 
 function VideoPreview({ videoId }) {
   const [videoUrl, setVideoUrl] = useState(null);
@@ -29,7 +29,10 @@ function VideoPreview({ videoId }) {
         controls
         width="100%"
         src={videoUrl}
+        crossOrigin="anonymous"
       >
+        {/* Subtitles play as a soft track; only export burns them in */}
+        <track kind="subtitles" src={getSubtitlesUrl(videoId)} srcLang="en" label="Subtitles" default />
         Your browser does not support the video tag.
       </video>
     </div>
@@ -3,32 +3,54 @@ import axios from 'axios';
 const API_BASE_URL = 'http://localhost:8000/api';
 
 export const uploadVideo = async (file) => {
-  const formData = new FormData();
-  formData.append('file', file);
-  
-  const response = await axios.post(`${API_BASE_URL}/upload`, formData, {
+  // Raw body upload: the server writes it straight to disk without multipart spooling
+  const response = await axios.post(`${API_BASE_URL}/upload/stream`, file, {
+    params: { filename: file.name },
     headers: {
-      'Content-Type': 'multipart/form-data',
+      'Content-Type': file.type || 'video/mp4',
     },
   });
   
   return response.data;
 };
 
-export const sendChatMessage = async (videoId, prompt) => {
+const JOB_POLL_INTERVAL_MS = 1000;
+
+export const getJob = async (jobId) => {
+  const response = await axios.get(`${API_BASE_URL}/jobs/${jobId}`);
+  return response.data;
+};
+
+export const waitForJob = async (jobId, onProgress) => {
+  // Poll until the background job finishes, then hand back its result
+  for (;;) {
+    const job = await getJob(jobId);
+    if (onProgress) onProgress(job);
+    if (job.status === 'completed') return job.result;
+    if (job.status === 'failed') throw new Error(job.error);
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+};
+
+export const sendChatMessage = async (videoId, prompt, onProgress) => {
   const response = await axios.post(`${API_BASE_URL}/chat`, {
     video_id: videoId,
     prompt: prompt,
   });
   
-  return response.data;
+  return waitForJob(response.data.job_id, onProgress);
 };
 
 export const getPreviewUrl = (videoId) => {
   return `${API_BASE_URL}/preview/${videoId}`;
 };
 
-export const getExportUrl = (videoId) => {
-  return `${API_BASE_URL}/export/${videoId}`;
+export const getSubtitlesUrl = (videoId) => {
+  return `${API_BASE_URL}/preview/${videoId}/subtitles.vtt`;
+};
+
+// profile: 'draft', 'preview' or 'final' (speed/quality trade-off of the burn-in)
+export const getExportUrl = (videoId, profile = 'final') => {
+  return `${API_BASE_URL}/export/${videoId}?profile=${profile}`;
 };
 